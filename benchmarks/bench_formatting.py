@@ -0,0 +1,83 @@
+"""格式化基准：比较树视图每一行显示类型、修改时间和大小的开销。
+
+"原实现"复刻了之前的写法：每次查询类型都重新建立扩展名字典，修改时间为显示文本和
+工具提示各创建一次 datetime 并调用 strftime。"现实现"使用 filetree.formatting。
+两者对同一批条目的输出必须完全一致。
+
+用法：python benchmarks/bench_formatting.py [--rows N] [--repeat N]
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filetree.formatting import FILE_TYPES, file_type, format_mtime, format_size  # noqa: E402
+
+
+def old_get_file_type(filename):
+    ext = os.path.splitext(filename)[1].lower()
+    types = dict(FILE_TYPES)  # 原实现在每次调用时构造同样的字典字面量
+    return types.get(ext, "文件")
+
+
+def old_format_row(name, size, mtime):
+    file_type_text = old_get_file_type(name)
+    text = datetime.datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M:%S")
+    tooltip = datetime.datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M:%S")
+    return file_type_text, text, tooltip, format_size(size)
+
+
+def new_format_row(name, size, mtime):
+    return file_type(name), format_mtime(mtime), format_mtime(mtime), format_size(size)
+
+
+def make_rows(count, seed=0):
+    """生成模拟的条目：常见扩展名，修改时间集中在若干次批量写入附近。"""
+    rng = random.Random(seed)
+    exts = list(FILE_TYPES) + ["", ".bak", ".TXT", ".JPG"]
+    now = time.time()
+    bursts = [now - rng.uniform(0, 365 * 86400) for _ in range(max(1, count // 200))]
+    rows = []
+    for i in range(count):
+        name = f"item{i}{rng.choice(exts)}"
+        mtime = rng.choice(bursts) + rng.uniform(0, 120)
+        rows.append((name, rng.randrange(1 << 32), mtime))
+    return rows
+
+
+def bench(format_row, rows, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for name, size, mtime in rows:
+            format_row(name, size, mtime)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000, help="条目数，默认 200000")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数，取最快的一次，默认 3")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    for name, size, mtime in rows:
+        if old_format_row(name, size, mtime) != new_format_row(name, size, mtime):
+            sys.exit(f"输出不一致: {name} {size} {mtime}")
+
+    old = bench(old_format_row, rows, args.repeat)
+    new = bench(new_format_row, rows, args.repeat)
+    print(f"{args.rows} 行，每行格式化类型、修改时间（文本和工具提示）和大小")
+    print(f"{'':>6} {'总耗时':>8} {'每行':>9}")
+    print(f"{'原实现':>6} {old:>7.3f}s {old / args.rows * 1e6:>7.2f}µs")
+    print(f"{'现实现':>6} {new:>7.3f}s {new / args.rows * 1e6:>7.2f}µs  ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""并行扫描基准：在人为加入延迟的文件系统上比较不同线程数的扫描耗时。
+
+网络文件系统（NFS/SMB）上每次列目录和 stat 都是一次网络往返。这里把 os.scandir
+和 DirEntry.stat 包装成先等待固定延迟再访问本地磁盘，用来模拟这种高延迟环境，
+并确认多线程扫描得到的目录树与单线程完全相同。
+
+用法：python benchmarks/bench_parallel_walk.py [--latency 毫秒] [--dirs N] [--files N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filetree import scanner  # noqa: E402
+from filetree.scanner import ScanTree, iter_entries, walk  # noqa: E402
+from filetree.text_tree import build_text_lines, iter_text_lines  # noqa: E402
+
+
+class _SlowEntry:
+    """DirEntry 的包装：stat() 前等待一次往返延迟。"""
+
+    def __init__(self, entry, latency):
+        self._entry = entry
+        self._latency = latency
+        self.name = entry.name
+        self.path = entry.path
+
+    def is_dir(self, *, follow_symlinks=True):
+        return self._entry.is_dir(follow_symlinks=follow_symlinks)
+
+    def is_file(self, *, follow_symlinks=True):
+        return self._entry.is_file(follow_symlinks=follow_symlinks)
+
+    def is_symlink(self):
+        return self._entry.is_symlink()
+
+    def stat(self, *, follow_symlinks=True):
+        time.sleep(self._latency)
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+
+class _SlowScandir:
+    """os.scandir 的包装：打开目录前等待一次往返延迟。"""
+
+    def __init__(self, path, latency):
+        time.sleep(latency)
+        self._it = _real_scandir(path)
+        self._latency = latency
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._it.close()
+
+    def __iter__(self):
+        for entry in self._it:
+            yield _SlowEntry(entry, self._latency)
+
+
+_real_scandir = os.scandir
+
+
+@contextmanager
+def delayed_filesystem(latency):
+    with mock.patch.object(scanner.os, "scandir", lambda path: _SlowScandir(path, latency)):
+        yield
+
+
+def make_tree(root, dirs, files, fanout=10):
+    """生成 dirs 个目录（每层最多 fanout 个子目录），每个目录 files 个文件。"""
+    paths = [root]
+    for i in range(1, dirs):
+        parent = paths[(i - 1) // fanout]
+        path = os.path.join(parent, f"dir{i:05d}")
+        os.mkdir(path)
+        paths.append(path)
+    for path in paths:
+        for j in range(files):
+            with open(os.path.join(path, f"file{j:03d}.txt"), "wb") as f:
+                f.write(b"x" * j)
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=2.0, help="每次访问的延迟（毫秒），默认 2")
+    parser.add_argument("--dirs", type=int, default=100, help="目录数，默认 100")
+    parser.add_argument("--files", type=int, default=10, help="每个目录的文件数，默认 10")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="要比较的线程数，默认 1 2 4 8 16")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root, args.dirs, args.files)
+        expected = build_text_lines(walk(ScanTree(root)))
+        print(f"{args.dirs} 个目录，{args.dirs * args.files} 个文件，每次访问延迟 {args.latency} ms")
+        print(f"{'线程数':>6} {'walk':>9} {'加速':>6} {'iter_entries':>13} {'加速':>6}")
+
+        base_walk = base_iter = None
+        with delayed_filesystem(args.latency / 1000):
+            for workers in args.workers:
+                walk_time, tree = timed(lambda: walk(ScanTree(root), workers=workers))
+                iter_time, lines = timed(lambda: list(iter_text_lines(
+                    tree.name(0), iter_entries(root, workers=workers))))
+                if build_text_lines(tree) != expected or lines != expected:
+                    sys.exit(f"{workers} 个线程的扫描结果与单线程不一致")
+                base_walk = base_walk or walk_time
+                base_iter = base_iter or iter_time
+                print(f"{workers:>6} {walk_time:>8.2f}s {base_walk / walk_time:>5.1f}x"
+                      f" {iter_time:>12.2f}s {base_iter / iter_time:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""基准测试套件：在合成目录树上测量各阶段的耗时和内存峰值，结果以 JSON 输出。
+
+测量的阶段：
+
+    generate       生成合成目录树（只运行一次，供参考）
+    scan           walk 扫描为快照，单线程和 --workers 指定的线程数各一项
+    text           生成完整的文本目录树
+    treemap        在快照上计算 1600×1000 的占用图布局，每次都重新计算
+    duplicates     在快照上查找重复文件（合成目录树的文件内容全为零，同大小的文件都会读取完整内容）
+    model          FileTreeModel 载入快照并为每一行取出各列的显示文本
+    sort_keys      载入快照并为每个文件夹按名称自然排序（计算排序键）
+    resort         依次按每一列升序、降序重新排序全部文件夹，共 8 次，不含排序键的计算
+    gui_populate   主窗口打开文件夹，直到后台扫描结束、文本输出追加完毕
+    gui_expand     在树视图中展开全部文件夹
+
+每个阶段重复 --repeat 次，记录每次的耗时并取最快的一次；另外在 tracemalloc 下单独
+运行一次，记录 Python 分配的内存峰值。界面相关的阶段使用 offscreen 平台，不需要显示器；
+没有安装 PySide6 时跳过并在结果中注明。--baseline 与之前保存的结果逐项比较。
+
+用法：python benchmarks/bench_suite.py [--depth N] [--fanout N] [--files N] [--output 结果.json]
+"""
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from filetree.duplicates import find_duplicates  # noqa: E402
+from filetree.scanner import ScanTree, walk  # noqa: E402
+from filetree.text_tree import iter_tree_lines  # noqa: E402
+from filetree.treemap import TreemapLayout  # noqa: E402
+from synthetic_tree import add_spec_arguments, spec_from_args, synthetic_tree  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RESULT_VERSION = 1
+
+
+def measure(func, repeat):
+    """运行 func repeat 次计时，再在 tracemalloc 下运行一次，返回结果字典。"""
+    runs = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(runs), "runs": runs, "peak_bytes": peak}
+
+
+def scan(root, workers=1):
+    return walk(ScanTree(root), workers=workers)
+
+
+def load_gui():
+    """导入主程序并创建 QApplication；没有 PySide6 时返回 (None, 原因)。"""
+    try:
+        from PySide6.QtWidgets import QApplication
+    except ImportError as e:
+        return None, f"无法导入 PySide6: {e}"
+    spec = importlib.util.spec_from_file_location("file_tree_visualizer",
+                                                  os.path.join(REPO, "file-tree-visualizer.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    app = QApplication.instance() or QApplication([])
+    return (module, app), None
+
+
+def process_events_until(app, done, timeout=600.0):
+    deadline = time.monotonic() + timeout
+    while not done():
+        if time.monotonic() > deadline:
+            raise TimeoutError("等待界面完成超时")
+        app.processEvents()
+        time.sleep(0.001)
+
+
+def new_window(module):
+    """创建不使用持久化缓存、不监视文件变化的主窗口，避免测量受上一次运行影响。"""
+    window = module.FileExplorerApp()
+    window.cache_enabled = False
+    window.watch_enabled = False
+    return window
+
+
+def populate_model(model, tree):
+    """载入快照并逐行取出每一列的显示文本，相当于把所有行都绘制一遍。"""
+    from PySide6.QtCore import QModelIndex
+
+    model.set_tree(tree)
+    columns = model.columnCount()
+    pending = [QModelIndex()]
+    rows = 0
+    while pending:
+        parent = pending.pop()
+        for row in range(model.rowCount(parent)):
+            for column in range(columns):
+                model.index(row, column, parent).data()
+            pending.append(model.index(row, 0, parent))
+            rows += 1
+    return rows
+
+
+def sort_all(model, tree, orders):
+    """依次按 orders 中的 (列, 顺序) 排序，每次都为所有已读取的文件夹算出排序结果，相当于全部展开时切换排序。"""
+    firsts = [tree.first_child[i] for i in range(len(tree)) if tree.is_dir(i) and tree.child_count[i] > 0]
+    for column, order in orders:
+        model.sort(column, order)
+        for child in firsts:
+            model.index_for_node(child)
+
+
+def bench_sort(model, tree, repeat, results):
+    from PySide6.QtCore import Qt
+
+    def sort_keys():
+        model.set_tree(tree)
+        sort_all(model, tree, [(0, Qt.AscendingOrder)])
+
+    results["sort_keys"] = measure(sort_keys, repeat)
+    orders = [(column, order) for column in range(model.columnCount())
+              for order in (Qt.AscendingOrder, Qt.DescendingOrder)]
+    results["resort"] = measure(lambda: sort_all(model, tree, orders), repeat)
+    results["resort"]["resorts"] = len(orders)
+
+
+def bench_gui(root, tree, repeat, results):
+    loaded, reason = load_gui()
+    if loaded is None:
+        for name in ("model", "sort_keys", "resort", "gui_populate", "gui_expand"):
+            results[name] = {"skipped": reason}
+        return
+    module, app = loaded
+    window = new_window(module)
+    results["model"] = measure(lambda: populate_model(window.tree_model, tree), repeat)
+    results["model"]["rows"] = populate_model(window.tree_model, tree)
+    bench_sort(window.tree_model, tree, repeat, results)
+
+    def populate():
+        window.process_selected_directory(root)
+        process_events_until(app, lambda: window.scan_thread is None and window.text_lines is None)
+
+    results["gui_populate"] = measure(populate, repeat)
+
+    def expand():
+        window.tree_view.collapseAll()
+        window.tree_view.expandAll()
+        app.processEvents()
+
+    results["gui_expand"] = measure(expand, repeat)
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+
+
+def environment():
+    info = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+    try:
+        info["commit"] = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO, capture_output=True, text=True,
+                                        check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        info["commit"] = None
+    try:
+        import PySide6
+        info["pyside6"] = PySide6.__version__
+    except ImportError:
+        info["pyside6"] = None
+    return info
+
+
+def max_rss_bytes():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024  # Linux 上单位为 KB
+
+
+def run(args):
+    spec = spec_from_args(args)
+    results = {}
+    start = time.perf_counter()
+    with synthetic_tree(spec, args.tmpdir) as (root, stats):
+        results["generate"] = {"seconds": time.perf_counter() - start}
+        results["scan"] = measure(lambda: scan(root), args.repeat)
+        if args.workers > 1:
+            results[f"scan_{args.workers}_workers"] = measure(lambda: scan(root, args.workers), args.repeat)
+        tree = scan(root)
+        results["text"] = measure(lambda: sum(1 for _ in iter_tree_lines(tree)), args.repeat)
+        results["text"]["lines"] = sum(1 for _ in iter_tree_lines(tree))
+        results["treemap"] = measure(lambda: TreemapLayout(tree).tiles(0, 1600, 1000), args.repeat)
+        results["treemap"]["tiles"] = len(TreemapLayout(tree).tiles(0, 1600, 1000))
+        results["duplicates"] = measure(lambda: find_duplicates(tree, workers=args.workers), args.repeat)
+        results["duplicates"]["groups"] = len(find_duplicates(tree, workers=args.workers)[0])
+        if args.no_gui:
+            for name in ("model", "sort_keys", "resort", "gui_populate", "gui_expand"):
+                results[name] = {"skipped": "--no-gui"}
+        else:
+            bench_gui(root, tree, args.repeat, results)
+        stats = asdict(stats)
+        stats["entries"] = tree.entry_count()
+        stats["list_errors"] = len(tree.list_errors)
+    return {
+        "version": RESULT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": environment(),
+        "spec": asdict(spec),
+        "tree": stats,
+        "repeat": args.repeat,
+        "results": results,
+        "max_rss_bytes": max_rss_bytes(),
+    }
+
+
+def print_summary(report, baseline=None, file=sys.stderr):
+    """把各阶段的耗时和内存峰值打印为表格；给出 baseline 时附上与之前结果的比值。"""
+    tree = report["tree"]
+    print(f"{tree['dirs']} 个文件夹，{tree['files']} 个文件，{tree['denied']} 个不可读"
+          f"{'' if tree['denied_effective'] else '（当前用户不受权限限制）'}", file=file)
+    if baseline and baseline.get("spec") != report["spec"]:
+        print("注意: 基线使用了不同的目录树参数，比值仅供参考", file=file)
+    old_results = baseline["results"] if baseline else {}
+    for name, result in report["results"].items():
+        if "skipped" in result:
+            print(f"{name:>16}  跳过: {result['skipped']}", file=file)
+            continue
+        line = f"{name:>16} {result['seconds']:>9.3f}s"
+        if "peak_bytes" in result:
+            line += f" {result['peak_bytes'] / 2 ** 20:>9.1f} MB"
+        old = old_results.get(name, {})
+        if old.get("seconds"):
+            line += f"  耗时为基线的 {result['seconds'] / old['seconds']:.2f} 倍"
+        print(line, file=file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_spec_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3, help="每个阶段的重复次数，取最快的一次，默认 3")
+    parser.add_argument("--workers", type=int, default=8, help="多线程扫描的线程数，设为 1 时不测量，默认 8")
+    parser.add_argument("--no-gui", action="store_true", help="跳过需要 PySide6 的阶段")
+    parser.add_argument("--tmpdir", default=None, help="在此文件夹中生成目录树，默认使用系统临时目录")
+    parser.add_argument("--output", "-o", default=None, help="把 JSON 结果写入文件，默认写到标准输出")
+    parser.add_argument("--baseline", default=None, help="之前保存的 JSON 结果，用于比较耗时")
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat 至少为 1")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    report = run(args)
+    print_summary(report, baseline)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
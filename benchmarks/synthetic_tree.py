@@ -0,0 +1,157 @@
+"""可复现的合成目录树：按给定的层数、分支数和文件数生成，用于基准测试。
+
+相同的参数和随机种子总是生成同样的名称和大小。名称中混有中日韩文字、重音字母和
+接近文件系统上限的长名称；文件以稀疏方式设置大小，不实际写入数据；部分文件夹可以
+设为不可读，用来覆盖"访问受限"的路径（以 root 运行时权限不起作用，见 denied_effective）。
+
+用法：python benchmarks/synthetic_tree.py 目标文件夹 [--depth N] [--fanout N] [--files N] ...
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import stat
+import tempfile
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+_CJK = "文件目录数据测试报告项目资料图片视频音乐备份配置日志缓存临时下载文档源码模块工具"
+_KANA = "ファイルデータテストきろくあいうえおかきくけこ"
+_HANGUL = "파일데이터테스트보고서"
+_LATIN = "abcdefghijklmnopqrstuvwxyzéèüößñ"
+_EXTENSIONS = (".txt", ".py", ".json", ".jpg", ".png", ".md", ".log", ".csv", ".zip", ".mp4", "", ".tar.gz")
+_NAME_LIMIT = 255  # 大多数文件系统上名称的最大字节数
+
+
+@dataclass
+class TreeSpec:
+    depth: int = 4  # 根目录之下的文件夹层数
+    fanout: int = 5  # 每个文件夹的子文件夹数
+    files: int = 20  # 每个文件夹的文件数
+    unicode_ratio: float = 0.3  # 使用中日韩等非 ASCII 名称的比例
+    long_ratio: float = 0.02  # 使用接近名称长度上限的长名称的比例
+    denied: int = 3  # 设为不可读的文件夹数
+    max_size: int = 1 << 20  # 文件大小的上限（字节）
+    seed: int = 0
+
+
+@dataclass
+class TreeStats:
+    dirs: int = 0  # 不含根目录
+    files: int = 0
+    bytes: int = 0
+    denied: int = 0
+    denied_effective: bool = False  # 当前用户是否确实无法读取这些文件夹
+
+
+def _name(rng, spec, index):
+    """生成第 index 个同级条目的名称，序号保证同级不重名。"""
+    if rng.random() < spec.long_ratio:
+        alphabet = rng.choice((_CJK, _LATIN))
+        stem = "".join(rng.choice(alphabet) for _ in range(120))
+    elif rng.random() < spec.unicode_ratio:
+        alphabet = rng.choice((_CJK, _CJK, _KANA, _HANGUL, _LATIN))
+        stem = "".join(rng.choice(alphabet) for _ in range(rng.randint(2, 12)))
+    else:
+        stem = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz_") for _ in range(rng.randint(3, 16)))
+    suffix = f"_{index}"
+    # 按字节截断长名称，给序号和扩展名留出空间
+    budget = _NAME_LIMIT - 16
+    encoded = stem.encode("utf-8")
+    if len(encoded) > budget:
+        stem = encoded[:budget].decode("utf-8", "ignore")
+    return stem + suffix
+
+
+def generate(root, spec):
+    """在已存在的空文件夹 root 下生成合成目录树，返回 TreeStats。"""
+    rng = random.Random(spec.seed)
+    stats = TreeStats()
+    folders = []  # 不含根目录，按层排列
+    level = [root]
+    for depth in range(spec.depth + 1):
+        next_level = []
+        for folder in level:
+            for i in range(spec.files):
+                path = os.path.join(folder, _name(rng, spec, i) + rng.choice(_EXTENSIONS))
+                # 大小呈长尾分布：多数文件只有几 KB，少数接近上限
+                size = min(int(rng.paretovariate(1.2) * 1024) - 1024, spec.max_size)
+                with open(path, "wb") as f:
+                    f.truncate(size)
+                stats.files += 1
+                stats.bytes += size
+            if depth < spec.depth:
+                for i in range(spec.fanout):
+                    path = os.path.join(folder, _name(rng, spec, spec.files + i))
+                    os.mkdir(path)
+                    next_level.append(path)
+        folders.extend(next_level)
+        level = next_level
+    stats.dirs = len(folders)
+
+    # 从较深的一半文件夹中挑选不可读的文件夹，其上层仍可正常扫描
+    denied = rng.sample(folders[len(folders) // 2:], min(spec.denied, len(folders) - len(folders) // 2))
+    for path in denied:
+        os.chmod(path, 0)
+    stats.denied = len(denied)
+    stats.denied_effective = bool(denied) and not os.access(denied[0], os.R_OK)
+    return stats
+
+
+def restore_permissions(root):
+    """恢复 generate 设为不可读的文件夹的权限，以便删除。"""
+    # os.walk 自上而下，先恢复子文件夹的权限再进入
+    for folder, dirs, _ in os.walk(root):
+        for name in dirs:
+            path = os.path.join(folder, name)
+            if not os.lstat(path).st_mode & stat.S_IRWXU:
+                os.chmod(path, 0o755)
+
+
+@contextmanager
+def synthetic_tree(spec, parent=None):
+    """在临时文件夹中生成目录树，产出 (根目录, TreeStats)，退出时删除。"""
+    root = tempfile.mkdtemp(prefix="ftv-bench-", dir=parent)
+    try:
+        yield root, generate(root, spec)
+    finally:
+        restore_permissions(root)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def add_spec_arguments(parser):
+    """把 TreeSpec 的各项添加为命令行参数。"""
+    defaults = TreeSpec()
+    parser.add_argument("--depth", type=int, default=defaults.depth, help=f"文件夹层数，默认 {defaults.depth}")
+    parser.add_argument("--fanout", type=int, default=defaults.fanout,
+                        help=f"每个文件夹的子文件夹数，默认 {defaults.fanout}")
+    parser.add_argument("--files", type=int, default=defaults.files,
+                        help=f"每个文件夹的文件数，默认 {defaults.files}")
+    parser.add_argument("--unicode-ratio", type=float, default=defaults.unicode_ratio,
+                        help=f"非 ASCII 名称的比例，默认 {defaults.unicode_ratio}")
+    parser.add_argument("--long-ratio", type=float, default=defaults.long_ratio,
+                        help=f"长名称的比例，默认 {defaults.long_ratio}")
+    parser.add_argument("--denied", type=int, default=defaults.denied,
+                        help=f"不可读的文件夹数，默认 {defaults.denied}")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="随机种子，默认 0")
+
+
+def spec_from_args(args):
+    return TreeSpec(depth=args.depth, fanout=args.fanout, files=args.files, unicode_ratio=args.unicode_ratio,
+                    long_ratio=args.long_ratio, denied=args.denied, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", help="要在其中生成目录树的空文件夹，不存在时自动创建")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    os.makedirs(args.root, exist_ok=True)
+    if os.listdir(args.root):
+        parser.error(f"文件夹不为空: {args.root}")
+    print(json.dumps(asdict(generate(args.root, spec_from_args(args))), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,1032 @@
 import os
 import sys
-import datetime
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    # 命令行模式：在导入 GUI 相关库之前处理，不加载 PySide6 和 pyperclip
+    from filetree.cli import main
+
+    sys.exit(main(sys.argv[1:]))
+
 import pyperclip
-from PySide6.QtWidgets import (QApplication, QMainWindow, QTreeWidget, QTreeWidgetItem, QTextEdit,
+from PySide6.QtWidgets import (QApplication, QMainWindow, QTreeView, QPlainTextEdit,
                                QPushButton, QHBoxLayout, QVBoxLayout, QWidget, QStatusBar, QFileDialog,
-                               QMenu, QToolBar, QLabel, QSplitter, QFrame, QSizePolicy, QHeaderView)
-from PySide6.QtCore import Qt, QMimeData, QUrl, QSize, QTimer, QTimer
-from PySide6.QtGui import QDragEnterEvent, QDropEvent, QIcon, QAction, QColor, QFont, QPalette, QPixmap, QPainter
+                               QMenu, QToolBar, QLabel, QSplitter, QFrame, QSizePolicy, QHeaderView,
+                               QDialog, QDialogButtonBox, QCheckBox, QFormLayout, QSpinBox, QLineEdit,
+                               QComboBox, QTreeWidget, QTreeWidgetItem, QToolTip)
+from PySide6.QtCore import (Qt, QMimeData, QUrl, QSize, QTimer, QTimer, QObject, QThread, Signal, QEvent, QRectF,
+                            QRunnable, QThreadPool, QAbstractItemModel, QModelIndex, QBuffer, QByteArray, QFileSystemWatcher)
+from PySide6.QtGui import (QDragEnterEvent, QDropEvent, QIcon, QAction, QColor, QFont, QPalette, QPixmap, QPainter,
+                           QImageReader, QTextCursor, QBrush)
+import itertools
+from array import array
 import platform
+import sqlite3
+import threading
+import time
+import zlib
+
+from filetree.scanner import SKIP_REASONS, ScanTree, walk, list_directory, relist_directory, find_node
+from filetree.text_tree import iter_tree_lines, more_entries_text
+from filetree.cache import ScanCache, default_cache_path
+from filetree.collation import dir_count, natural_order, use_system_collation
+from filetree.ignore import IgnoreRules
+from filetree.formatting import file_type, format_mtime, format_size
+from filetree.duplicates import (Cancelled as DuplicatesCancelled, find_duplicates, group_label,
+                                  iter_duplicate_lines, summary_text)
+from filetree.export import write_export
+from filetree.instrumentation import Profiler, ScanStats
+from filetree.treemap import TILE_DIR, TILE_FILE, TILE_REST, TreemapLayout, tile_at
+from filetree.snapshot import (ADDED, CHANGE_LABELS, SUFFIX as SNAPSHOT_SUFFIX, Snapshot, diff_snapshots,
+                               iter_diff_lines)
+from filetree.name_index import (MODE_GLOB, MODE_REGEX, MODE_SUBSTRING, NameIndex, compile_query,
+                                 filter_mask)
+
+
+class ScanWorker(QObject):
+    """在后台线程中扫描目录，按时间分批通知界面哪些目录已经读取完毕。"""
+    batch_ready = Signal(object, list)  # (快照, 已读取的目录索引)
+    finished = Signal(object)  # 快照
+
+    BATCH_INTERVAL = 0.05  # 两批通知之间的最短间隔（秒）
+
+    def __init__(self, tree, workers=1, name_index=None, profiler=None, starts=(0,)):
+        super().__init__()
+        self.tree = tree
+        self.workers = workers  # 同时读取目录的线程数
+        self.starts = starts  # 要读取的目录：默认为根目录，文件变化后只读取新出现的子目录
+        self.name_index = name_index  # 随扫描进度建立的名称索引
+        self.profiler = profiler  # 可选的 Profiler，分析扫描线程
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """请求停止扫描，可在任意线程调用。"""
+        self._cancel_event.set()
+
+    def run(self):
+        """执行扫描，在工作线程中运行。"""
+        pending = []
+        last_emit = time.monotonic()
+        stats = self.tree.stats
+        if self.profiler is not None:
+            self.profiler.enable()
+
+        def update_index():
+            if self.name_index is None:
+                return
+            if stats is None:
+                self.name_index.update()
+            else:
+                with stats.phase("index"):
+                    self.name_index.update()
+
+        def on_listed(index):
+            nonlocal last_emit
+            pending.append(index)
+            now = time.monotonic()
+            if now - last_emit >= self.BATCH_INTERVAL:
+                update_index()
+                self.batch_ready.emit(self.tree, pending[:])
+                pending.clear()
+                last_emit = now
+
+        start = time.perf_counter()
+        for index in self.starts:
+            walk(self.tree, on_listed, self._cancel_event.is_set, start=index, workers=self.workers)
+            if self.tree.cancelled:
+                break
+        if self.tree.cache is not None:
+            self.tree.cache.flush()
+        update_index()
+        if stats is not None:
+            stats.add_time("scan", time.perf_counter() - start)
+        if self.profiler is not None:
+            self.profiler.disable()
+        if pending:
+            self.batch_ready.emit(self.tree, pending)
+        self.finished.emit(self.tree)
+
+
+class PrefetchSignals(QObject):
+    finished = Signal(object, list)  # (快照, 已读取的目录索引)
+
+
+class PrefetchTask(QRunnable):
+    """按需加载模式下，在线程池中提前读取下一层目录。"""
+
+    def __init__(self, tree, indices, is_cancelled):
+        super().__init__()
+        self.tree = tree
+        self.indices = indices
+        self.is_cancelled = is_cancelled
+        self.signals = PrefetchSignals()
+
+    def run(self):
+        done = []
+        for index in self.indices:
+            if self.is_cancelled():
+                break
+            if list_directory(self.tree, index, self.is_cancelled) is None:
+                break
+            done.append(index)
+        self.signals.finished.emit(self.tree, done)
+
+
+class ExportSignals(QObject):
+    finished = Signal(str, str)  # (文件路径, 错误信息，成功时为空)
+
+
+class ExportTask(QRunnable):
+    """在线程池中把扫描快照写入文件，导出超大目录树时界面保持响应。"""
+
+    def __init__(self, path, write):
+        super().__init__()
+        self.path = path
+        self.write = write  # write(文件路径)，逐行写出
+        self.signals = ExportSignals()
+
+    def run(self):
+        try:
+            self.write(self.path)
+        except OSError as e:
+            self.signals.finished.emit(self.path, str(e))
+            return
+        self.signals.finished.emit(self.path, "")
+
+
+class CompareSignals(QObject):
+    finished = Signal(object, str)  # ((旧快照, 当前快照, 变化列表), 错误信息)；失败时结果为 None
+
+
+class CompareTask(QRunnable):
+    """在线程池中读取快照文件，与当前扫描结果逐项对比。"""
+
+    def __init__(self, path, tree):
+        super().__init__()
+        self.path = path
+        self.tree = tree
+        self.signals = CompareSignals()
+
+    def run(self):
+        try:
+            old = Snapshot.load(self.path)
+        except (OSError, ValueError) as e:
+            self.signals.finished.emit(None, str(e))
+            return
+        new = Snapshot.from_tree(self.tree)
+        self.signals.finished.emit((old, new, list(diff_snapshots(old, new))), "")
+
+
+class DuplicateSignals(QObject):
+    progress = Signal(str)  # 状态栏中显示的进度
+    finished = Signal(object)  # (分组, 无法读取的文件)；被取消时为 None
+
+
+class DuplicateTask(QRunnable):
+    """在线程池中查找重复文件，读取和计算哈希由 find_duplicates 自己的线程池完成。"""
+
+    def __init__(self, tree, workers, is_cancelled):
+        super().__init__()
+        self.tree = tree
+        self.workers = workers
+        self._cancel_event = threading.Event()
+        self.is_cancelled = lambda: self._cancel_event.is_set() or is_cancelled()
+        self.signals = DuplicateSignals()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def run(self):
+        def progress(label, done, total):
+            self.signals.progress.emit(f"正在查找重复文件：{label} {done}/{total}…")
+
+        try:
+            result = find_duplicates(self.tree, workers=self.workers, is_cancelled=self.is_cancelled,
+                                     progress=progress)
+        except DuplicatesCancelled:
+            result = None
+        self.signals.finished.emit(result)
+
+
+class FileTreeModel(QAbstractItemModel):
+    """基于扫描快照的树模型。
+
+    模型本身不保存任何逐项对象，显示文本、工具提示、颜色和图标都在 data() 中
+    按需计算，只有真正绘制到屏幕上的行才会付出格式化的代价。
+
+    索引的内部 id 用最低位区分两种行：普通节点为 node << 1；附加在目录下方的提示行为
+    (node << 1) | 1，目录读取失败时是唯一的"访问受限"行，目录因数量上限未读完时是
+    排在最后的"… 还有 N 项"行。
+
+    排序只在内存中进行：按名称升序时行号就是子节点在快照中的顺序；其他排序方式
+    在目录第一次被访问时计算一次行号与节点的对应关系并缓存，不会重新读取磁盘。
+
+    筛选时 visible 标记需要显示的节点，各目录只显示被标记的子节点，同样在第一次被访问时
+    计算并缓存；筛选期间不显示提示行，也不再按需读取目录。
+
+    与快照对比后，changes 记录新增或改变的节点，changed_dirs 记录其下有变化（包括删除）
+    的文件夹，这些行以淡色背景标出。
+
+    子项很多的文件夹每次只显示 PAGE_ROWS 行，其余由末尾的提示行代替，双击后再显示一页。
+    视图每次布局都要为所有已展开的行调用 index() 和 hasChildren()，几十万行的文件夹
+    因此不会一次性交给视图；排序和数据都不受影响，只是视图中的行数有上限。
+    """
+    HEADERS = ["名称", "类型", "修改时间", "大小"]
+    INDEX_ROLE = Qt.UserRole + 1  # 节点在扫描快照中的索引
+    PAGE_ROWS = 10000  # 每个文件夹一次显示的子项行数
+
+    directory_loaded = Signal(int)  # 按需加载模式下某个目录被读取并显示
+
+    def __init__(self, owner):
+        super().__init__(owner)
+        self.owner = owner  # 提供配色、字体和图标的主窗口
+        self.tree = None
+        self.published = set()  # 子项已经通知给视图的目录
+        self.lazy = False
+        self.sort_column = 0
+        self.sort_order = Qt.AscendingOrder
+        self.orders = {}  # 目录 -> (行号对应的节点, 子节点偏移对应的行号)，与扫描顺序相同时为 None
+        # 按名称、按类型排序的结果只取决于名称，计算一次后切换排序方式时沿用
+        self.name_orders = {}  # 目录 -> 按名称自然排序的子节点，与扫描顺序相同时为 None
+        self.type_orders = {}  # 目录 -> 按类型、再按名称排序的子节点
+        self.visible = None  # 筛选结果：bytearray，非零表示显示该节点；None 表示不筛选
+        self.pages = {}  # 目录 -> 显示的子项行数，只记录显示超过一页的目录
+        self.changes = {}  # 节点 -> 对比快照得到的变化类型
+        self.changed_dirs = set()  # 其下有变化的文件夹
+        self.colors = {}
+        self.icons = {}
+        self.root_font = None
+        self.more_font = None
+
+    def apply_theme(self):
+        """根据主窗口的当前主题准备颜色和图标，所有行共用。"""
+        owner = self.owner
+        self.colors = {
+            "folder": QColor(owner.folder_icon_color),
+            "file": QColor(owner.file_icon_color),
+            "error": QColor(owner.error_color),
+        }
+        # 对比快照的背景色：半透明，不影响文字颜色和选中效果
+        for name, color, alpha in (("added", owner.added_color, 70), ("changed", owner.changed_color, 70),
+                                   ("changed_dir", owner.changed_color, 28)):
+            self.colors[name] = QColor(color)
+            self.colors[name].setAlpha(alpha)
+        self.icons = {
+            "folder": owner.create_custom_icon("folder", owner.folder_icon_color),
+            "file": owner.create_custom_icon("file", owner.file_icon_color),
+            "warning": owner.create_custom_icon("warning", owner.error_color),
+        }
+        self.root_font = QFont(owner.tree_font)
+        self.root_font.setBold(True)
+        self.more_font = QFont(owner.tree_font)
+        self.more_font.setItalic(True)
+
+    def restyle(self):
+        """主题改变后更新颜色和图标，并通知视图重绘已显示的行。"""
+        self.apply_theme()
+        if self.tree is not None:
+            roles = [Qt.ForegroundRole, Qt.DecorationRole, Qt.FontRole]
+            self.dataChanged.emit(self.index(0, 0), self.index(0, len(self.HEADERS) - 1), roles)
+
+    def set_tree(self, tree, lazy=False):
+        """切换到新的扫描快照，已经读取的目录立即可见。"""
+        self.beginResetModel()
+        self.tree = tree
+        self.lazy = lazy
+        self.published = set()
+        self.orders = {}
+        self.name_orders = {}
+        self.type_orders = {}
+        self.visible = None
+        self.pages = {}
+        self.changes = {}
+        self.changed_dirs = set()
+        if tree is not None and not lazy:
+            # 重新显示已有快照时，所有已读取的目录都可以直接展开
+            self.published.update(i for i in range(len(tree))
+                                  if tree.is_dir(i) and tree.is_listed(i))
+        elif tree is not None and tree.is_listed(0):
+            self.published.add(0)
+        self.endResetModel()
+
+    def set_filter(self, visible):
+        """只显示 visible 中标记的节点，None 表示取消筛选。"""
+        self.beginResetModel()
+        self.visible = visible
+        self.orders = {}
+        self.endResetModel()
+
+    def set_changes(self, changes, changed_dirs):
+        """标出对比快照得到的变化，传入空集合即清除。视图需要随后重绘。"""
+        self.changes = changes
+        self.changed_dirs = changed_dirs
+
+    def finish_scan(self):
+        """后台扫描结束后，因取消或数量上限而未读取的目录改为展开时读取。"""
+        self.lazy = True
+
+    def publish(self, node):
+        """把已读取目录的子项通知给视图。父目录必须先于子目录发布。"""
+        if node in self.published or not self.tree.is_listed(node):
+            return
+        if self.visible is not None:
+            # 筛选结果是固定的快照，新读取的条目在重新筛选后才显示
+            self.published.add(node)
+            return
+        rows = self._child_rows(node, True)
+        if node != 0 and self.tree.parents[node] not in self.published:
+            # 父目录尚未显示，等父目录发布时一并可见
+            self.published.add(node)
+            return
+        parent = self.index_for_node(node)
+        if node != 0 and not parent.isValid():
+            # 所在的行还在未显示的页中，翻到该页时随整页一起显示
+            self.published.add(node)
+            return
+        if rows:
+            self.beginInsertRows(parent, 0, rows - 1)
+            self.published.add(node)
+            self.endInsertRows()
+        else:
+            self.published.add(node)
+        # 目录行本身的数量或错误信息也随之更新
+        self.node_changed(node)
+
+    def refresh_directory(self, node):
+        """重新读取目录 node 并就地更新视图，保留展开、选中和滚动状态。
+
+        返回需要继续读取的新子目录列表。
+        """
+        tree = self.tree
+        published = node in self.published
+        if published:
+            self.layoutAboutToBeChanged.emit()
+            old_indexes = self.persistentIndexList()
+
+        moved, removed, added_dirs = relist_directory(tree, node)
+        caches = (self.orders, self.name_orders, self.type_orders)
+        for cache in caches:
+            cache.pop(node, None)  # 子节点编号已改变
+        for old, new in moved.items():
+            if old in self.published:
+                self.published.discard(old)
+                self.published.add(new)
+            for cache in caches:
+                if old in cache:
+                    # 沿用的子目录保留原有子节点，排序结果仍然有效
+                    cache[new] = cache.pop(old)
+            if old in self.pages:
+                self.pages[new] = self.pages.pop(old)
+        self.published.difference_update(removed)
+        for old in removed:
+            for cache in caches:
+                cache.pop(old, None)
+            self.pages.pop(old, None)
+        if self.changes or self.changed_dirs:
+            # 对比标记跟随节点的新编号，已删除的节点不再标出
+            changes = {old: self.changes.pop(old) for old in moved if old in self.changes}
+            for old in removed:
+                self.changes.pop(old, None)
+            self.changes.update((moved[old], change) for old, change in changes.items())
+            changed_dirs = self.changed_dirs.intersection(moved)
+            self.changed_dirs.difference_update(changed_dirs)
+            self.changed_dirs.difference_update(removed)
+            self.changed_dirs.update(moved[old] for old in changed_dirs)
+
+        if published:
+            removed = set(removed)
+            new_indexes = []
+            for index in old_indexes:
+                internal = index.internalId()
+                target = internal >> 1
+                if internal & 1:
+                    # 提示行：只有当前目录的提示行可能消失或换位置
+                    new_indexes.append(index if target != node else
+                                       self._extra_index(node, index.column()))
+                elif target in moved:
+                    new_indexes.append(self.index_for_node(moved[target], index.column()))
+                elif self._is_removed(target, removed):
+                    new_indexes.append(QModelIndex())
+                else:
+                    new_indexes.append(index)
+            self.changePersistentIndexList(old_indexes, new_indexes)
+            self.layoutChanged.emit()
+        self.node_changed(node)
+        return added_dirs
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """按列排序，只重新排列内存中的行，不会重新扫描。"""
+        self.sort_column = column
+        self.sort_order = order
+        self.resort()
+
+    def resort(self):
+        """丢弃缓存的排序结果并通知视图，用于汇总大小等排序依据发生变化之后。"""
+        if self.tree is None:
+            self.orders = {}
+            return
+        self.layoutAboutToBeChanged.emit()
+        old_indexes = self.persistentIndexList()
+        self.orders = {}
+        new_indexes = []
+        for index in old_indexes:
+            internal = index.internalId()
+            if internal & 1:
+                new_indexes.append(index)  # 提示行的位置不随排序改变
+            else:
+                new_indexes.append(self.index_for_node(internal >> 1, index.column()))
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    def sorts_by_value(self):
+        """当前是否按修改时间或大小排序，这些值会随扫描和文件变化而改变。"""
+        return self.sort_column in (2, 3)
+
+    def _order(self, node):
+        """返回目录 node 在当前排序下的 (行号对应的节点, 子节点偏移对应的行号)，与扫描顺序相同时返回 None。"""
+        try:
+            return self.orders[node]
+        except KeyError:
+            pass
+        tree = self.tree
+        children = tree.children(node)
+        descending = self.sort_order == Qt.DescendingOrder
+        names = self._name_order(node)
+        if self.sort_column in (0, 1):
+            # 名称和类型排序时文件夹始终在前，两组分别排序
+            dirs = dir_count(tree, node)
+            nodes = names if self.sort_column == 0 else self._type_order(node, names, dirs)
+            if nodes is None:
+                if not descending and self.visible is None:
+                    self.orders[node] = None
+                    return None
+                nodes = array('i', children)
+            if descending:
+                nodes = nodes[dirs - 1::-1] + nodes[:dirs - 1:-1] if dirs else nodes[::-1]
+        else:
+            # 数值相同的条目保持名称顺序
+            values = tree.mtimes if self.sort_column == 2 else tree.sizes
+            nodes = sorted(children if names is None else names, key=values.__getitem__, reverse=descending)
+        visible = self.visible
+        if visible is not None:
+            # 筛选之后新增的节点不在标记范围内，一律隐藏
+            size = len(visible)
+            nodes = [child for child in nodes if child < size and visible[child]]
+        order = array('i', nodes)
+        rows = array('i', [-1]) * len(children)
+        for row, child in enumerate(order):
+            rows[child - children.start] = row
+        self.orders[node] = order, rows
+        return order, rows
+
+    def _name_order(self, node):
+        """目录 node 的子节点按名称自然排序的结果，与扫描顺序相同时为 None。"""
+        try:
+            return self.name_orders[node]
+        except KeyError:
+            order = self.name_orders[node] = natural_order(self.tree, node)
+            return order
+
+    def _type_order(self, node, names, dirs):
+        """目录 node 的子节点按类型排序的结果：文件夹在前，同类型的文件按名称排列。"""
+        order = self.type_orders.get(node)
+        if order is None:
+            tree = self.tree
+            nodes = array('i', tree.children(node) if names is None else names)
+            order = nodes[:dirs]
+            order.extend(sorted(nodes[dirs:], key=lambda child: file_type(tree.name(child))))
+            self.type_orders[node] = order
+        return order
+
+    def _page_rows(self, node):
+        """目录 node 在视图中显示的子项行数，不含提示行。"""
+        return min(self.tree.child_count[node], self.pages.get(node, self.PAGE_ROWS))
+
+    def has_next_page(self, node):
+        """目录 node 是否还有已读取、但尚未显示的子项。"""
+        return self.visible is None and self._page_rows(node) < self.tree.child_count[node]
+
+    def show_next_page(self, node):
+        """在目录 node 下多显示一页子项，返回显示的行数。"""
+        self.show_rows(node, self._page_rows(node) + self.PAGE_ROWS)
+        return self._page_rows(node)
+
+    def show_rows(self, node, count):
+        """让目录 node 至少显示 count 行子项（按整页计），新行一次性通知视图。"""
+        shown = self._page_rows(node)
+        if count <= shown or self.visible is not None:
+            return
+        pages = (count + self.PAGE_ROWS - 1) // self.PAGE_ROWS
+        parent = self.index_for_node(node)
+        published = node in self.published and parent.isValid()
+        if published:
+            self.layoutAboutToBeChanged.emit()
+            old_indexes = self.persistentIndexList()
+        self.pages[node] = pages * self.PAGE_ROWS
+        if published:
+            extra = (node << 1) | 1
+            # 已有的行位置不变；提示行（通常是刚双击的当前行）改为第一个新显示的行
+            new_indexes = [self.index(shown, index.column(), parent) if index.internalId() == extra else index
+                           for index in old_indexes]
+            self.changePersistentIndexList(old_indexes, new_indexes)
+            self.layoutChanged.emit()
+
+    def show_node(self, node):
+        """节点所在的行尚未显示时，让所在的文件夹显示到该行所在的页。"""
+        if node == 0 or self.visible is not None:
+            return
+        row = self._row_of(node)
+        parent = self.tree.parents[node]
+        if row >= self._page_rows(parent):
+            self.show_rows(parent, row + 1)
+
+    def _row_of(self, node):
+        """节点在父目录中按当前排序和筛选的行号，被筛选隐藏时为 -1。"""
+        parent = self.tree.parents[node]
+        row = node - self.tree.first_child[parent]
+        order = self._order(parent)
+        if order is not None:
+            row = order[1][row]
+        return row
+
+    def _child_at(self, node, row):
+        """目录 node 第 row 行对应的子节点。"""
+        order = self._order(node)
+        if order is None:
+            return self.tree.first_child[node] + row
+        return order[0][row]
+
+    def _is_removed(self, node, removed):
+        """节点本身或其祖先是否已被删除。"""
+        parents = self.tree.parents
+        while node > 0:
+            if node in removed:
+                return True
+            node = parents[node]
+        return False
+
+    def node_changed(self, node):
+        """通知视图某个节点所在行需要重绘。"""
+        if node != 0 and self.tree.parents[node] not in self.published:
+            return
+        first = self.index_for_node(node, 0)
+        if first.isValid():
+            self.dataChanged.emit(first, self.index_for_node(node, 3))
+
+    def _child_rows(self, node, published):
+        """目录在视图中的行数：读取失败的目录显示一行错误提示，未读完的目录末尾多一行提示。"""
+        tree = self.tree
+        if self.visible is not None:
+            return len(self._order(node)[0]) if tree.first_child[node] >= 0 else 0
+        if not published or node in tree.errors:
+            return 0
+        if node in tree.list_errors:
+            return 1
+        shown = self._page_rows(node)
+        return shown + (1 if node in tree.omitted or shown < tree.child_count[node] else 0)
+
+    def _extra_index(self, node, column=0):
+        """目录 node 下方提示行的索引，没有提示行时返回无效索引。"""
+        if self.visible is not None:
+            return QModelIndex()
+        if node in self.tree.list_errors:
+            return self.createIndex(0, column, (node << 1) | 1)
+        shown = self._page_rows(node)
+        if node in self.tree.omitted or shown < self.tree.child_count[node]:
+            return self.createIndex(shown, column, (node << 1) | 1)
+        return QModelIndex()
+
+    def more_node(self, index):
+        """若 index 是"… 还有 N 项"提示行，返回所属目录，否则返回 None。"""
+        if not index.isValid() or not index.internalId() & 1:
+            return None
+        node = index.internalId() >> 1
+        if node in self.tree.list_errors:
+            return None
+        return node if node in self.tree.omitted or self.has_next_page(node) else None
+
+    def node_of(self, index):
+        """返回索引对应的节点；错误提示行和无效索引返回 None。"""
+        if not index.isValid():
+            return None
+        internal = index.internalId()
+        if internal & 1:
+            return None
+        return internal >> 1
+
+    def index_for_node(self, node, column=0):
+        """根据节点构造模型索引，同一目录的子节点连续存放，行号可直接算出。
+
+        筛选时被隐藏的节点返回无效索引。
+        """
+        if node == 0:
+            return self.createIndex(0, column, 0)
+        row = self._row_of(node)
+        if row < 0 or (self.visible is None and row >= self._page_rows(self.tree.parents[node])):
+            return QModelIndex()  # 被筛选隐藏，或在尚未显示的页中
+        return self.createIndex(row, column, node << 1)
+
+    def index(self, row, column, parent=QModelIndex()):
+        if self.tree is None or column < 0 or column >= len(self.HEADERS) or row < 0:
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, 0) if row == 0 else QModelIndex()
+        node = self.node_of(parent)
+        if node is None or row >= self.rowCount(parent):
+            return QModelIndex()
+        if self.visible is None and (node in self.tree.list_errors or row >= self._page_rows(node)):
+            return self.createIndex(row, column, (node << 1) | 1)
+        return self.createIndex(row, column, self._child_at(node, row) << 1)
+
+    def parent(self, index=QModelIndex()):
+        if not index.isValid():
+            return QModelIndex()
+        internal = index.internalId()
+        node = internal >> 1
+        if internal & 1:
+            return self.index_for_node(node)  # 提示行的父项就是它所属的目录
+        if node == 0:
+            return QModelIndex()
+        return self.index_for_node(self.tree.parents[node])
+
+    def rowCount(self, parent=QModelIndex()):
+        if self.tree is None:
+            return 0
+        if not parent.isValid():
+            return 1
+        if parent.column() > 0:
+            return 0
+        node = self.node_of(parent)
+        if node is None or not self.tree.is_dir(node):
+            return 0
+        return self._child_rows(node, node in self.published)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return self.tree is not None
+        node = self.node_of(parent)
+        if node is None or parent.column() > 0 or not self.tree.is_dir(node):
+            return False
+        if node not in self.published and self.visible is None:
+            return node not in self.tree.errors  # 内容未知时先显示展开箭头
+        return self.rowCount(parent) > 0
+
+    def canFetchMore(self, parent):
+        # 按需加载模式或后台扫描结束后，未读取的目录在展开时读取
+        node = self.node_of(parent)
+        return (self.lazy and self.visible is None and node is not None and self.tree.is_dir(node)
+                and node not in self.published)
+
+    def fetchMore(self, parent):
+        """按需加载：展开目录时才读取它的内容。"""
+        node = self.node_of(parent)
+        if node is None:
+            return
+        if not self.tree.is_listed(node):
+            list_directory(self.tree, node)
+        self.publish(node)
+        self.directory_loaded.emit(node)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        internal = index.internalId()
+        node = internal >> 1
+        column = index.column()
+        tree = self.tree
+
+        if internal & 1 and node not in tree.list_errors:
+            # 尚未显示的页和因数量上限未读取的条目
+            hidden = tree.child_count[node] - self._page_rows(node)
+            if role == Qt.DisplayRole and column == 0:
+                text = more_entries_text(hidden + tree.omitted.get(node, 0))
+                if hidden:
+                    text += f"，双击显示后 {min(hidden, self.PAGE_ROWS)} 项"
+                return text
+            if role == Qt.ToolTipRole and column == 0:
+                return "双击显示下一页" if hidden else "双击读取该文件夹的全部条目"
+            if role == Qt.FontRole and column == 0:
+                return self.more_font
+            return None
+        if internal & 1:
+            # 目录读取失败时的提示行
+            error_msg, detail = tree.list_errors[node]
+            if role == Qt.DisplayRole:
+                return "访问受限" if column == 0 else (error_msg if column == 1 else None)
+            if role == Qt.ForegroundRole and column == 0:
+                return self.colors["error"]
+            if role == Qt.ToolTipRole and column == 0:
+                return f"错误信息: {detail}"
+            if role == Qt.DecorationRole and column == 0:
+                return self.icons["warning"]
+            return None
+
+        if role == self.INDEX_ROLE:
+            return node
+        if role == Qt.UserRole:
+            return tree.path(node) if column == 0 else None
+
+        is_dir = tree.is_dir(node)
+        error = tree.errors.get(node)
+        if role == Qt.DisplayRole:
+            return self._display_text(node, column, is_dir, error)
+        if role == Qt.ToolTipRole:
+            return self._tool_tip(node, column, is_dir, error)
+        if role == Qt.ForegroundRole and column == 0:
+            if error is not None:
+                return self.colors["error"]
+            return self.colors["folder" if is_dir else "file"]
+        if role == Qt.DecorationRole:
+            if column == 0:
+                return self.icons["folder" if is_dir else "file"]
+            if column == 1 and error is not None:
+                return self.icons["warning"]
+            if column == 3 and error is None and node in tree.list_errors and node != 0:
+                return self.icons["warning"]
+            return None
+        if role == Qt.BackgroundRole and (self.changes or self.changed_dirs):
+            change = self.changes.get(node)
+            if change is not None:
+                return self.colors["added" if change == ADDED else "changed"]
+            if node in self.changed_dirs:
+                return self.colors["changed_dir"]
+            return None
+        if role == Qt.FontRole and column == 0 and node == 0:
+            return self.root_font
+        return None
+
+    def _display_text(self, node, column, is_dir, error):
+        tree = self.tree
+        if column == 0:
+            return tree.name(node)
+        if node == 0 and column != 3:
+            return None  # 根目录只显示汇总大小
+        if error is not None:
+            if column == 1:
+                return "已跳过" if error[0] in SKIP_REASONS else "访问受限"
+            return error[0] if column == 3 else None
+        if column == 1:
+            return "文件夹" if is_dir else file_type(tree.name(node))
+        if column == 2:
+            return format_mtime(tree.mtimes[node])
+        if is_dir:
+            list_error = tree.list_errors.get(node)
+            if list_error is not None:
+                return list_error[0]
+            if not tree.is_listed(node):
+                return None
+        # 文件夹显示其下所有文件的总大小
+        return format_size(tree.sizes[node])
+
+    def _tool_tip(self, node, column, is_dir, error):
+        tree = self.tree
+        if column == 0:
+            change = self.changes.get(node)
+            if change is not None:
+                return f"{tree.path(node)}\n对比快照: {CHANGE_LABELS[change]}"
+            if node in self.changed_dirs:
+                return f"{tree.path(node)}\n对比快照: 其下有变化"
+            return tree.path(node)
+        if node == 0 and column != 3:
+            return None
+        if error is not None:
+            return f"错误: {error[1]}" if column == 1 else None
+        if column == 1:
+            return None if is_dir else file_type(tree.name(node))
+        if column == 2:
+            return self._display_text(node, column, is_dir, error)
+        size = tree.sizes[node]
+        if is_dir:
+            list_error = tree.list_errors.get(node)
+            if list_error is not None:
+                return f"错误: {list_error[1]}"
+            if not tree.is_listed(node):
+                return None
+            return (f"共 {tree.file_counts[node]} 个文件，{size} 字节 ({format_size(size)})\n"
+                    f"最近修改: {format_mtime(tree.max_mtimes[node])}")
+        if node in tree.shared:
+            return f"{size} 字节 ({format_size(size)})\n硬链接：与先列出的同一文件只计入一次文件夹大小"
+        return f"{size} 字节 ({format_size(size)})"
+
+
+class TreemapView(QWidget):
+    """占用图：按汇总大小把扫描快照画成嵌套的矩形，布局由 TreemapLayout 计算并缓存。
+
+    整幅图先画到 QPixmap 上，重绘时直接贴图并叠加选中框，只有尺寸、缩放层级或快照
+    内容改变后才重新布局。单击矩形在树视图中定位；双击文件夹放大到该文件夹，右键返回上一级。
+    """
+    node_selected = Signal(int)  # 单击的节点；"其余 N 项"为其所在的文件夹
+
+    def __init__(self, owner):
+        super().__init__(owner)
+        self.owner = owner  # 提供配色和字体的主窗口
+        self.tree = None
+        self.tree_layout = None
+        self.root_path = None  # 放大到的文件夹，None 为根目录；按路径保存，刷新后节点编号改变也能找回
+        self.current = None  # 树视图中选中的节点
+        self.pixmap = None  # 当前尺寸和层级下画好的整幅图，失效时为 None
+        self.tiles = []
+        self.tile_of = None  # 节点 -> 矩形，绘制选中框时按需建立
+        self.colors = {}
+        self.file_colors = []
+        self.setMinimumSize(160, 160)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.setToolTip("单击在树视图中定位，双击文件夹放大，右键返回上一级")
+
+    def apply_theme(self):
+        """根据主窗口的当前主题准备颜色，并重画。"""
+        owner = self.owner
+        self.colors = {name: QColor(color) for name, color in owner.treemap_colors.items()}
+        self.file_colors = [QColor(color) for color in owner.treemap_file_colors]
+        self.font_height = self.fontMetrics().height()
+        self.refresh()
+
+    def set_tree(self, tree):
+        """显示新的扫描快照，回到根目录。"""
+        self.tree = tree
+        self.tree_layout = None if tree is None else TreemapLayout(tree, header=self.font_height + 2)
+        self.root_path = None
+        self.current = None
+        self.refresh()
+
+    def refresh(self):
+        """快照内容改变后重新布局，在下一次绘制时进行。"""
+        if self.tree_layout is not None:
+            self.tree_layout.invalidate()
+        self.pixmap = None
+        self.update()
+
+    def set_current(self, node):
+        """标出树视图中选中的节点，不在图中的节点标出其所在的文件夹。"""
+        self.current = node
+        self.update()
+
+    def root_node(self):
+        """放大到的文件夹的节点。"""
+        root = find_node(self.tree, self.root_path) if self.root_path else 0
+        if root is None:
+            self.root_path = None  # 放大的文件夹已被删除
+            root = 0
+        return root
+
+    def zoom_to(self, node):
+        """放大到文件夹 node，0 为根目录。"""
+        self.root_path = self.tree.path(node) if node else None
+        self.pixmap = None
+        self.update()
+
+    def resizeEvent(self, event):
+        self.pixmap = None
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        if self.tree is None:
+            painter.fillRect(self.rect(), self.colors["background"])
+            return
+        if self.pixmap is None:
+            self.render_pixmap()
+        painter.drawPixmap(0, 0, self.pixmap)
+        tile = self.current_tile()
+        if tile is not None:
+            painter.setPen(self.colors["current"])
+            x, y, w, h = tile[:4]
+            painter.drawRect(QRectF(x + 0.5, y + 0.5, max(w - 1, 1), max(h - 1, 1)))
+
+    def render_pixmap(self):
+        """按当前尺寸和层级布局并画出整幅图。"""
+        start = time.perf_counter()
+        tree = self.tree
+        self.tiles = self.tree_layout.tiles(self.root_node(), self.width(), self.height())
+        self.tile_of = None
+        dpr = self.devicePixelRatioF()
+        self.pixmap = QPixmap(int(self.width() * dpr), int(self.height() * dpr))
+        self.pixmap.setDevicePixelRatio(dpr)
+        self.pixmap.fill(self.colors["background"])
+        painter = QPainter(self.pixmap)
+        colors = self.colors
+        dir_colors = (colors["dir"], colors["dir_alt"])
+        file_colors = self.file_colors
+        rest_brush = QBrush(colors["border"], Qt.BDiagPattern)
+        has_header = self.tree_layout.has_header
+        metrics = self.fontMetrics()
+        labels = []
+        for x, y, w, h, node, depth, kind, count in self.tiles:
+            if kind == TILE_DIR:
+                painter.fillRect(QRectF(x, y, w, h), colors["border"])
+                if w > 2 and h > 2:
+                    painter.fillRect(QRectF(x + 1, y + 1, w - 2, h - 2), dir_colors[depth % 2])
+                if has_header(w, h):
+                    name = tree.path(node) if depth == 0 else tree.name(node)
+                    text = f"{name}  {format_size(tree.sizes[node])}"
+                    labels.append((x + 4, y + 1, w - 8, text, colors["text"]))
+            elif kind == TILE_FILE:
+                name = tree.name(node)
+                ext = os.path.splitext(name)[1].lower()
+                color = file_colors[zlib.crc32(ext.encode("utf-8", "surrogateescape")) % len(file_colors)]
+                if w > 2 and h > 2:
+                    painter.fillRect(QRectF(x + 0.5, y + 0.5, w - 1, h - 1), color)
+                else:
+                    painter.fillRect(QRectF(x, y, w, h), color)
+                if w >= 48 and h >= self.font_height + 4:
+                    labels.append((x + 3, y + 1, w - 6, name, colors["file_text"]))
+            else:
+                painter.fillRect(QRectF(x, y, w, h), rest_brush)
+        for x, y, w, text, color in labels:
+            painter.setPen(color)
+            painter.drawText(QRectF(x, y, w, self.font_height), Qt.AlignLeft | Qt.AlignVCenter,
+                             metrics.elidedText(text, Qt.ElideMiddle, int(w)))
+        painter.end()
+        if tree.stats is not None:
+            tree.stats.add_time("treemap", time.perf_counter() - start)
+
+    def current_tile(self):
+        """选中节点或其最近的、画在图中的上层文件夹的矩形。"""
+        node = self.current
+        if node is None or self.pixmap is None or node >= len(self.tree):
+            return None
+        if self.tile_of is None:
+            self.tile_of = {tile[4]: tile for tile in self.tiles if tile[6] != TILE_REST}
+        parents = self.tree.parents
+        while node >= 0 and node not in self.tile_of:
+            node = parents[node]
+        return self.tile_of.get(node)
+
+    def tile_at(self, pos):
+        """位置 pos 处最内层的矩形，尚未绘制时返回 None。"""
+        if self.tree is None or self.pixmap is None:
+            return None
+        return tile_at(self.tiles, pos.x(), pos.y())
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.RightButton:
+            root = self.root_node()
+            if root:
+                self.zoom_to(self.tree.parents[root])
+            return
+        tile = self.tile_at(event.position())
+        if tile is not None and event.button() == Qt.LeftButton:
+            self.node_selected.emit(tile[4])
+
+    def mouseDoubleClickEvent(self, event):
+        tile = self.tile_at(event.position())
+        if tile is None or event.button() != Qt.LeftButton:
+            return
+        # 放大到光标处最内层的文件夹：文件取其所在的文件夹，"其余 N 项"本身记录的就是文件夹
+        node = self.tree.parents[tile[4]] if tile[6] == TILE_FILE else tile[4]
+        if node != self.root_node():
+            self.zoom_to(node)
+
+    def event(self, event):
+        if event.type() == QEvent.ToolTip:
+            tile = self.tile_at(event.pos())
+            if tile is None:
+                QToolTip.hideText()
+            else:
+                QToolTip.showText(event.globalPos(), self.tile_text(tile), self)
+            return True
+        return super().event(event)
+
+    def tile_text(self, tile):
+        """悬停提示：相对路径和大小。"""
+        tree = self.tree
+        node, kind, count = tile[4], tile[6], tile[7]
+        path = tree.rel_path(node) or tree.path(node)
+        if kind == TILE_REST:
+            return f"{path} 中其余 {count} 项，共 {format_size(self.tree_layout.rest_size(node, count))}"
+        return f"{path}\n{format_size(tree.sizes[node])}"
 
 
 class FileExplorerApp(QMainWindow):
+    WATCH_DEBOUNCE_MS = 500  # 文件变化停止多久后刷新（毫秒）
+    WATCH_MAX_DELAY = 3.0  # 持续变化时最多推迟多久（秒）
+    MAX_WATCHED_DIRS = 4096  # 最多交给系统监视的目录数，其余目录改为轮询
+    POLL_INTERVAL_MS = 5000  # 轮询修改时间的间隔（毫秒）
+    POLL_BATCH = 2000  # 每次轮询最多检查的目录数
+    SCAN_WORKERS = 8  # 后台扫描同时读取的目录数，网络文件夹上可显著缩短等待
+    MAX_CHILDREN = 10000  # 默认每个文件夹最多读取的条目数，其余双击提示行后读取
+    MAX_ENTRIES = 1000000  # 默认一次扫描最多读取的条目数，其余文件夹展开时读取
+    TEXT_CHUNK_LINES = 2000  # 每次向文本框插入的行数
+    TEXT_CHUNK_SECONDS = 0.02  # 每轮追加文本的最长时间，超出后把控制权交还事件循环
+    FILTER_DELAY_MS = 150  # 停止输入多久后筛选（毫秒）
+    FILTER_MAX_MATCHES = 2000  # 筛选时最多显示的匹配项数，全部展开的代价与显示的行数成正比
+    FILTER_MODES = (("包含", MODE_SUBSTRING), ("通配符", MODE_GLOB), ("正则", MODE_REGEX))
+    # 导出对话框中的文件类型 -> 导出格式
+    EXPORT_FORMATS = (("文本目录树 (*.txt)", "text"), ("JSON (*.json)", "json"),
+                      ("NDJSON，每行一个条目 (*.ndjson)", "ndjson"), ("CSV 表格 (*.csv)", "csv"))
+    EXPORT_EXTENSIONS = {".txt": "text", ".json": "json", ".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv"}
+    DIFF_MAX_LINES = 20000  # 对比结果对话框中最多显示的行数
+    DUPLICATE_MAX_GROUPS = 5000  # 重复文件对话框中最多列出的组数
+    HASH_WORKERS = 4  # 查找重复文件时同时读取的文件数
+    TREEMAP_REFRESH_MS = 1000  # 扫描期间重画占用图的间隔（毫秒）
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("文件树管理器 - 目录结构可视化工具 | 资速达 www.zisuda.com")
@@ -19,11 +1035,43 @@ class FileExplorerApp(QMainWindow):
 
         # 状态变量
         self.current_path = None
+        self.scan_tree = None  # 最近一次扫描得到的目录快照
+        self.name_index = None  # 快照的名称索引，供筛选使用
+        self.export_task = None  # 正在后台读取快照的任务：导出、保存快照或对比快照
+        self.diff_dialog = None  # 显示对比结果的对话框，关闭时清除树视图中的标记
+        self.duplicates_dialog = None  # 显示重复文件的对话框
+        self.scan_thread = None  # 后台扫描线程
+        self.scan_worker = None
+        self.lazy_mode = False  # 按需加载：只读取根目录，展开时再读取子目录
+        self.watch_enabled = True  # 监视文件变化，只刷新发生变化的目录
+        self.cache_enabled = True  # 使用持久化扫描缓存，未变化的目录无需重新读取
+        self.scan_cache = None  # 首次使用时打开
+        self.ignore_patterns = []  # 用户指定的排除模式，语法同 .gitignore
+        self.use_gitignore = False  # 是否遵循各级目录中的 .gitignore
+        self.one_filesystem = False  # 不进入其他文件系统的挂载点
+        # 扫描范围上限，None 表示不限制；无论打开哪个文件夹，内存和等待时间都有上界
+        self.scan_max_depth = None
+        self.scan_max_children = self.MAX_CHILDREN
+        self.scan_max_entries = self.MAX_ENTRIES
+        # 性能诊断：开启后统计每次打开文件夹的系统调用次数和各阶段耗时，可选用 cProfile 分析
+        self.diagnostics_enabled = False
+        self.profile_enabled = False
+        self.pending_stats = None  # 正在进行的一次打开文件夹的统计，文本输出完成后结束
+        self.scan_stats = None  # 最近一次完成的统计
+        self.profiler = None
+        self.diagnostics_started = 0.0
+        self.dirty_dirs = set()  # 等待刷新的目录路径
+        self.dirty_since = 0.0
+        self.poll_dirs = []  # 无法监视的目录：[路径, 上次的修改时间]
+        self.poll_pos = 0
         self.theme_mode = "dark"  # 默认使用暗色模式
 
         # 定义初始颜色变量
         self.tool_button_text_color = "#CDD6F4"  # 默认深色模式文字颜色
 
+        # 图标缓存：(图标类型, 颜色, 尺寸, 设备像素比) -> QIcon，切换主题时清空
+        self.icon_cache = {}
+
         # 设置应用字体 - 提高清晰度和可读性
         self.setup_fonts()
 
@@ -56,6 +1104,8 @@ class FileExplorerApp(QMainWindow):
 
     def setup_theme(self):
         """设置暗色或亮色主题，使用现代化配色。"""
+        # 配色即将改变，旧颜色的图标不再需要
+        self.icon_cache.clear()
         if self.theme_mode == "dark":
             self.setStyleSheet("""
                 QMainWindow, QDialog, QFileDialog {
@@ -66,7 +1116,7 @@ class FileExplorerApp(QMainWindow):
                     background-color: #313244;
                     width: 1px;
                 }
-                QTreeWidget, QTextEdit {
+                QTreeView, QPlainTextEdit {
                     background-color: #1E1E2E;
                     color: #CDD6F4;
                     border: 1px solid #313244;
@@ -75,11 +1125,11 @@ class FileExplorerApp(QMainWindow):
                     selection-background-color: #45475A;
                     selection-color: #FFFFFF;
                 }
-                QTreeWidget::item:hover {
+                QTreeView::item:hover {
                     background-color: #313244;
                     border-radius: 4px;
                 }
-                QTreeWidget::item:selected {
+                QTreeView::item:selected {
                     background-color: #45475A;
                     border-radius: 4px;
                 }
@@ -195,8 +1245,16 @@ class FileExplorerApp(QMainWindow):
             self.file_icon_color = "#A6E3A1"  # 文件使用绿色
             self.copy_icon_color = "#89B4FA"  # 复制按钮使用蓝色
             self.error_color = "#F38BA8"  # 错误使用红色
+            self.added_color = "#A6E3A1"  # 对比快照：新增的条目
+            self.changed_color = "#F9E2AF"  # 对比快照：改变的条目及其所在的文件夹
             self.header_text_color = "#CDD6F4"  # 深色模式下的标题文字颜色
             self.tool_button_text_color = "#CDD6F4"  # 深色模式下工具按钮文字颜色
+            # 占用图：文件夹按层交替两种底色，文件按扩展名取色
+            self.treemap_colors = {"background": "#181825", "border": "#45475A", "dir": "#313244",
+                                   "dir_alt": "#292A3C", "text": "#CDD6F4", "file_text": "#1E1E2E",
+                                   "current": "#F5E0DC"}
+            self.treemap_file_colors = ("#89B4FA", "#A6E3A1", "#F9E2AF", "#FAB387", "#CBA6F7",
+                                        "#94E2D5", "#F5C2E7", "#74C7EC", "#EBA0AC", "#B4BEFE")
             self.dark_mode = True
         else:
             self.setStyleSheet("""
@@ -208,7 +1266,7 @@ class FileExplorerApp(QMainWindow):
                     background-color: #9CA0B0;
                     width: 1px;
                 }
-                QTreeWidget, QTextEdit {
+                QTreeView, QPlainTextEdit {
                     background-color: #FFFFFF;
                     color: #4C4F69;
                     border: 1px solid #DCE0E8;
@@ -217,11 +1275,11 @@ class FileExplorerApp(QMainWindow):
                     selection-background-color: #CCCFD9;
                     selection-color: #4C4F69;
                 }
-                QTreeWidget::item:hover {
+                QTreeView::item:hover {
                     background-color: #EFF1F5;
                     border-radius: 4px;
                 }
-                QTreeWidget::item:selected {
+                QTreeView::item:selected {
                     background-color: #CCCFD9;
                     border-radius: 4px;
                 }
@@ -344,25 +1402,50 @@ class FileExplorerApp(QMainWindow):
             self.file_icon_color = "#40A02B"  # 文件使用深绿色
             self.copy_icon_color = "#1E66F5"  # 复制按钮使用深蓝色
             self.error_color = "#D20F39"  # 错误使用深红色
+            self.added_color = "#40A02B"  # 对比快照：新增的条目
+            self.changed_color = "#DF8E1D"  # 对比快照：改变的条目及其所在的文件夹
             self.header_text_color = "#4C4F69"  # 亮色模式下的标题文字颜色
             self.tool_button_text_color = "#FFFFFF"  # 亮色模式下工具按钮文字颜色
+            self.treemap_colors = {"background": "#E6E9EF", "border": "#ACB0BE", "dir": "#DCE0E8",
+                                   "dir_alt": "#CCD0DA", "text": "#4C4F69", "file_text": "#1E1E2E",
+                                   "current": "#D20F39"}
+            self.treemap_file_colors = ("#7DA2F7", "#7CC46A", "#E8B15A", "#FE9A5B", "#B287F3",
+                                        "#5CBFC3", "#F0A3DC", "#6AC3D4", "#EE8A94", "#A3B1FB")
             self.dark_mode = False
 
     def toggle_theme(self):
         """切换暗色和亮色主题。"""
         self.theme_mode = "light" if self.theme_mode == "dark" else "dark"
         self.setup_theme()
-        # 刷新文件树样式
-        if self.current_path:
-            self.generate_file_tree(self.current_path)
+        # 刷新文件树样式：颜色和图标在绘制时由模型提供，只需重绘，
+        # 不重新扫描磁盘也不重建模型，展开状态和滚动位置保持不变
+        self.tree_model.restyle()
+        self.tree_view.viewport().update()
+        self.treemap.apply_theme()
         self.show_message("已切换为" + ("亮色" if self.theme_mode == "light" else "暗色") + "主题")
 
         # 更新工具栏按钮图标
         self.update_toolbar_icons()
         self.update()  # 刷新 UI
 
-    def create_custom_icon(self, icon_type, color_hex):
-        """创建自定义颜色的图标"""
+    def create_custom_icon(self, icon_type, color_hex, size=24):
+        """获取自定义颜色的图标，相同参数的图标只渲染一次并在所有位置共用"""
+        dpr = self.devicePixelRatioF()
+        key = (icon_type, color_hex, size, dpr)
+        icon = self.icon_cache.get(key)
+        if icon is None:
+            stats = self.pending_stats
+            if stats is None:
+                icon = self.render_custom_icon(icon_type, color_hex, size, dpr)
+            else:
+                with stats.phase("icons"):
+                    icon = self.render_custom_icon(icon_type, color_hex, size, dpr)
+                stats.count("icons")
+            self.icon_cache[key] = icon
+        return icon
+
+    def render_custom_icon(self, icon_type, color_hex, size, dpr):
+        """把SVG渲染为指定尺寸和设备像素比的图标"""
         # 为不同类型的图标创建不同的SVG内容
         svg_content = ""
         if icon_type == "folder-open":
@@ -402,6 +1485,60 @@ class FileExplorerApp(QMainWindow):
                 <path fill="{color_hex}" d="M16 1H4c-1.1 0-2 .9-2 2v14h2V3h12V1zm3 4H8c-1.1 0-2 .9-2 2v14c0 1.1.9 2 2 2h11c1.1 0 2-.9 2-2V7c0-1.1-.9-2-2-2zm0 16H8V7h11v14z"/>
             </svg>
             """
+        elif icon_type == "lazy":
+            svg_content = f"""
+            <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24">
+                <path fill="{color_hex}" d="M12 5.83L15.17 9l1.41-1.41L12 3 7.41 7.59 8.83 9 12 5.83zm0 12.34L8.83 15l-1.41 1.41L12 21l4.59-4.59L15.17 15 12 18.17z"/>
+            </svg>
+            """
+        elif icon_type == "watch":
+            svg_content = f"""
+            <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24">
+                <path fill="{color_hex}" d="M12 4.5C7 4.5 2.73 7.61 1 12c1.73 4.39 6 7.5 11 7.5s9.27-3.11 11-7.5c-1.73-4.39-6-7.5-11-7.5zM12 17c-2.76 0-5-2.24-5-5s2.24-5 5-5 5 2.24 5 5-2.24 5-5 5zm0-8c-1.66 0-3 1.34-3 3s1.34 3 3 3 3-1.34 3-3-1.34-3-3-3z"/>
+            </svg>
+            """
+        elif icon_type == "ignore":
+            svg_content = f"""
+            <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24">
+                <path fill="{color_hex}" d="M10 18h4v-2h-4v2zM3 6v2h18V6H3zm3 7h12v-2H6v2z"/>
+            </svg>
+            """
+        elif icon_type == "cache":
+            svg_content = f"""
+            <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24">
+                <path fill="{color_hex}" d="M2 20h20v-4H2v4zm2-3h2v2H4v-2zM2 4v4h20V4H2zm4 3H4V5h2v2zm-4 7h20v-4H2v4zm2-3h2v2H4v-2z"/>
+            </svg>
+            """
+        elif icon_type == "cancel":
+            svg_content = f"""
+            <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24">
+                <path fill="{color_hex}" d="M19 6.41L17.59 5 12 10.59 6.41 5 5 6.41 10.59 12 5 17.59 6.41 19 12 13.41 17.59 19 19 17.59 13.41 12z"/>
+            </svg>
+            """
+        elif icon_type == "save":
+            svg_content = f"""
+            <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24">
+                <path fill="{color_hex}" d="M17 3H5c-1.11 0-2 .9-2 2v14c0 1.1.89 2 2 2h14c1.1 0 2-.9 2-2V7l-4-4zm-5 16c-1.66 0-3-1.34-3-3s1.34-3 3-3 3 1.34 3 3-1.34 3-3 3zm3-10H5V5h10v4z"/>
+            </svg>
+            """
+        elif icon_type == "compare":
+            svg_content = f"""
+            <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24">
+                <path fill="{color_hex}" d="M9.01 14H2v2h7.01v3L13 15l-3.99-4v3zm5.98-1v-3H22V8h-7.01V5L11 9l3.99 4z"/>
+            </svg>
+            """
+        elif icon_type == "treemap":
+            svg_content = f"""
+            <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24">
+                <path fill="{color_hex}" d="M3 13h8V3H3v10zm0 8h8v-6H3v6zm10 0h8V11h-8v10zm0-18v6h8V3h-8z"/>
+            </svg>
+            """
+        elif icon_type == "duplicates":
+            svg_content = f"""
+            <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24">
+                <path fill="{color_hex}" d="M16 1H4c-1.1 0-2 .9-2 2v14h2V3h12V1zm-1 4l6 6v10c0 1.1-.9 2-2 2H7.99C6.89 23 6 22.1 6 21l.01-14c0-1.1.89-2 1.99-2h7zm-1 7h5.5L14 6.5V12z"/>
+            </svg>
+            """
         elif icon_type == "warning":
             svg_content = f"""
             <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24">
@@ -415,9 +1552,14 @@ class FileExplorerApp(QMainWindow):
             </svg>
             """
 
-        # 将SVG转换为QPixmap
-        pixmap = QPixmap()
-        pixmap.loadFromData(bytes(svg_content, 'utf-8'))
+        # 将SVG按目标像素尺寸转换为QPixmap，高分屏下保持清晰
+        buffer = QBuffer()
+        buffer.setData(QByteArray(bytes(svg_content, 'utf-8')))
+        reader = QImageReader(buffer, b"svg")
+        pixel_size = round(size * dpr)
+        reader.setScaledSize(QSize(pixel_size, pixel_size))
+        pixmap = QPixmap.fromImage(reader.read())
+        pixmap.setDevicePixelRatio(dpr)
 
         # 创建QIcon
         return QIcon(pixmap)
@@ -436,6 +1578,33 @@ class FileExplorerApp(QMainWindow):
             elif action_text == "切换主题":
                 action.setIcon(self.create_custom_icon("theme",
                                                        self.tool_button_text_color))
+            elif action_text == "按需加载":
+                action.setIcon(self.create_custom_icon("lazy",
+                                                       self.tool_button_text_color))
+            elif action_text == "监视变化":
+                action.setIcon(self.create_custom_icon("watch",
+                                                       self.tool_button_text_color))
+            elif action_text == "扫描设置":
+                action.setIcon(self.create_custom_icon("ignore",
+                                                       self.tool_button_text_color))
+            elif action_text == "扫描缓存":
+                action.setIcon(self.create_custom_icon("cache",
+                                                       self.tool_button_text_color))
+            elif action_text == "取消扫描":
+                action.setIcon(self.create_custom_icon("cancel",
+                                                       self.tool_button_text_color))
+            elif action_text == "保存快照":
+                action.setIcon(self.create_custom_icon("save",
+                                                       self.tool_button_text_color))
+            elif action_text == "对比快照":
+                action.setIcon(self.create_custom_icon("compare",
+                                                       self.tool_button_text_color))
+            elif action_text == "查找重复":
+                action.setIcon(self.create_custom_icon("duplicates",
+                                                       self.tool_button_text_color))
+            elif action_text == "占用图":
+                action.setIcon(self.create_custom_icon("treemap",
+                                                       self.tool_button_text_color))
 
     def setup_ui(self):
         """设置用户界面。"""
@@ -458,6 +1627,60 @@ class FileExplorerApp(QMainWindow):
         refresh_action.setStatusTip("刷新当前文件夹视图")
         self.toolbar.addAction(refresh_action)
 
+        self.cancel_action = QAction("取消扫描", self)
+        self.cancel_action.triggered.connect(self.cancel_scan)
+        self.cancel_action.setStatusTip("停止正在进行的目录扫描")
+        self.cancel_action.setEnabled(False)
+        self.toolbar.addAction(self.cancel_action)
+
+        lazy_action = QAction("按需加载", self)
+        lazy_action.setCheckable(True)
+        lazy_action.toggled.connect(self.set_lazy_mode)
+        lazy_action.setStatusTip("只读取根目录，展开文件夹时再读取其内容，适合超大目录")
+        self.toolbar.addAction(lazy_action)
+
+        watch_action = QAction("监视变化", self)
+        watch_action.setCheckable(True)
+        watch_action.setChecked(self.watch_enabled)
+        watch_action.toggled.connect(self.set_watch_enabled)
+        watch_action.setStatusTip("文件变化时只重新读取发生变化的文件夹")
+        self.toolbar.addAction(watch_action)
+
+        cache_action = QAction("扫描缓存", self)
+        cache_action.setCheckable(True)
+        cache_action.setChecked(self.cache_enabled)
+        cache_action.toggled.connect(self.set_cache_enabled)
+        cache_action.setStatusTip("重新打开文件夹时复用未变化目录的缓存结果；点击刷新会跳过缓存重新读取")
+        self.toolbar.addAction(cache_action)
+
+        ignore_action = QAction("扫描设置", self)
+        ignore_action.triggered.connect(self.edit_scan_settings)
+        ignore_action.setStatusTip("设置忽略规则（如 node_modules）以及扫描的层数和条目上限")
+        self.toolbar.addAction(ignore_action)
+
+        self.toolbar.addSeparator()
+
+        snapshot_action = QAction("保存快照", self)
+        snapshot_action.triggered.connect(self.save_snapshot)
+        snapshot_action.setStatusTip("把当前的扫描结果保存为快照文件，之后可与新的扫描结果对比")
+        self.toolbar.addAction(snapshot_action)
+
+        compare_action = QAction("对比快照", self)
+        compare_action.triggered.connect(self.compare_snapshot)
+        compare_action.setStatusTip("与之前保存的快照对比，标出新增、删除、修改和大小变化的条目")
+        self.toolbar.addAction(compare_action)
+
+        duplicates_action = QAction("查找重复", self)
+        duplicates_action.triggered.connect(self.find_duplicate_files)
+        duplicates_action.setStatusTip("按大小和内容查找重复文件，列出可以释放的空间；查找过程中再次点击可取消")
+        self.toolbar.addAction(duplicates_action)
+
+        self.treemap_action = QAction("占用图", self)
+        self.treemap_action.setCheckable(True)
+        self.treemap_action.setChecked(True)
+        self.treemap_action.setStatusTip("显示或隐藏按大小绘制的磁盘占用图")
+        self.toolbar.addAction(self.treemap_action)
+
         self.toolbar.addSeparator()
 
         theme_action = QAction("切换主题", self)
@@ -497,28 +1720,71 @@ class FileExplorerApp(QMainWindow):
         tree_header.setStyleSheet("font-weight: bold; font-size: 13px; margin-bottom: 5px;")
         tree_layout.addWidget(tree_header)
 
-        self.tree_widget = QTreeWidget()
-        self.tree_widget.setFont(self.tree_font)
-        self.tree_widget.setHeaderLabels(["名称", "类型", "修改时间", "大小"])
+        # 筛选框：只显示名称匹配的条目及其所在的文件夹，在名称索引上搜索，不访问磁盘
+        filter_layout = QHBoxLayout()
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("筛选名称…")
+        self.filter_edit.setClearButtonEnabled(True)
+        self.filter_edit.textChanged.connect(self.schedule_filter)
+        filter_layout.addWidget(self.filter_edit)
+        self.filter_mode_box = QComboBox()
+        for label, mode in self.FILTER_MODES:
+            self.filter_mode_box.addItem(label, mode)
+        self.filter_mode_box.setToolTip("包含：名称含有输入的文字；通配符：* 和 ? 匹配整个名称；正则：正则表达式")
+        self.filter_mode_box.currentIndexChanged.connect(self.schedule_filter)
+        filter_layout.addWidget(self.filter_mode_box)
+        tree_layout.addLayout(filter_layout)
+
+        # 树视图直接从扫描快照取数据，不为每个文件创建控件项
+        self.tree_model = FileTreeModel(self)
+        self.tree_model.apply_theme()
+        self.tree_model.directory_loaded.connect(self.on_directory_loaded)
+
+        self.tree_view = QTreeView()
+        self.tree_view.setFont(self.tree_font)
+        self.tree_view.setUniformRowHeights(True)  # 行高一致，超大目录滚动时无需逐行测量
+        self.tree_view.setModel(self.tree_model)
+        # 点击表头排序，由模型在内存中完成；默认按名称自然排序
+        self.tree_view.header().setSortIndicator(0, Qt.AscendingOrder)
+        self.tree_view.setSortingEnabled(True)
 
         # 设置列宽度，但允许名称列自动调整
-        header = self.tree_widget.header()
+        header = self.tree_view.header()
         header.setSectionResizeMode(0, QHeaderView.Stretch)  # 名称列自动伸缩填充可用空间
         header.setSectionResizeMode(1, QHeaderView.Fixed)  # 类型列固定宽度
         header.setSectionResizeMode(2, QHeaderView.Fixed)  # 时间列固定宽度
         header.setSectionResizeMode(3, QHeaderView.Fixed)  # 大小列固定宽度
 
         # 设置初始列宽
-        self.tree_widget.setColumnWidth(1, 100)
-        self.tree_widget.setColumnWidth(2, 200)  # 确保时间列足够显示完整时间
-        self.tree_widget.setColumnWidth(3, 100)
+        self.tree_view.setColumnWidth(1, 100)
+        self.tree_view.setColumnWidth(2, 200)  # 确保时间列足够显示完整时间
+        self.tree_view.setColumnWidth(3, 100)
 
         # 设置工具提示，当名称被截断时显示全名
-        self.tree_widget.setItemsExpandable(True)
-        self.tree_widget.setContextMenuPolicy(Qt.CustomContextMenu)
-        self.tree_widget.customContextMenuRequested.connect(self.show_context_menu)
-        self.tree_widget.itemClicked.connect(self.on_tree_item_clicked)  # 点击项目时更新状态栏
-        tree_layout.addWidget(self.tree_widget)
+        self.tree_view.setItemsExpandable(True)
+        self.tree_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.tree_view.customContextMenuRequested.connect(self.show_context_menu)
+        self.tree_view.clicked.connect(self.on_tree_item_clicked)  # 点击项目时更新状态栏
+        self.tree_view.activated.connect(self.on_tree_item_activated)  # 双击提示行读取剩余条目
+        tree_layout.addWidget(self.tree_view)
+
+        # 中间：磁盘占用图，从扫描快照的汇总大小绘制，不读取磁盘
+        treemap_frame = QFrame()
+        treemap_layout = QVBoxLayout(treemap_frame)
+        treemap_layout.setContentsMargins(0, 0, 0, 0)
+
+        treemap_header = QLabel("空间占用")
+        treemap_header.setProperty("labelType", "header")
+        treemap_header.setStyleSheet("font-weight: bold; font-size: 13px; margin-bottom: 5px;")
+        treemap_layout.addWidget(treemap_header)
+
+        self.treemap = TreemapView(self)
+        self.treemap.apply_theme()
+        self.treemap.node_selected.connect(self.on_treemap_clicked)
+        self.tree_view.selectionModel().currentChanged.connect(
+            lambda current: self.treemap.set_current(self.tree_model.node_of(current)))
+        treemap_layout.addWidget(self.treemap)
+        self.treemap_action.toggled.connect(treemap_frame.setVisible)
 
         # 右侧：文本输出和复制按钮
         text_frame = QFrame()
@@ -530,8 +1796,11 @@ class FileExplorerApp(QMainWindow):
         text_header.setStyleSheet("font-weight: bold; font-size: 13px; margin-bottom: 5px;")
         text_layout.addWidget(text_header)
 
-        self.text_edit = QTextEdit()
+        # QPlainTextEdit 按段落增量布局，几十万行也不会整体重排
+        self.text_edit = QPlainTextEdit()
         self.text_edit.setReadOnly(True)
+        self.text_edit.setUndoRedoEnabled(False)
+        self.text_edit.setLineWrapMode(QPlainTextEdit.NoWrap)
         text_layout.addWidget(self.text_edit)
 
         copy_layout = QHBoxLayout()
@@ -541,12 +1810,18 @@ class FileExplorerApp(QMainWindow):
         self.copy_button.clicked.connect(self.copy_to_clipboard)
         copy_layout.addWidget(self.copy_button)
 
+        self.export_button = QPushButton("导出为文件")
+        self.export_button.setEnabled(False)
+        self.export_button.clicked.connect(self.export_tree)
+        copy_layout.addWidget(self.export_button)
+
         text_layout.addLayout(copy_layout)
 
         # 将框架添加到分割器
         splitter.addWidget(tree_frame)
+        splitter.addWidget(treemap_frame)
         splitter.addWidget(text_frame)
-        splitter.setSizes([int(self.width() * 0.6), int(self.width() * 0.4)])  # 初始分割比例
+        splitter.setSizes([int(self.width() * 0.45), int(self.width() * 0.3), int(self.width() * 0.25)])  # 初始分割比例
 
         main_layout.addWidget(splitter)
 
@@ -555,24 +1830,366 @@ class FileExplorerApp(QMainWindow):
         self.setStatusBar(self.status_bar)
         self.status_bar.showMessage("准备就绪，请选择文件夹或拖放文件夹到应用窗口")
 
+        # 状态栏右侧的扫描计数
+        self.scan_status_label = QLabel()
+        self.status_bar.addPermanentWidget(self.scan_status_label)
+
+        # 开启性能诊断后显示最近一次的摘要，点击查看详情
+        self.diagnostics_button = QPushButton()
+        self.diagnostics_button.setFlat(True)
+        self.diagnostics_button.setToolTip("查看各阶段耗时和系统调用次数，可导出为 JSON")
+        self.diagnostics_button.clicked.connect(self.show_diagnostics)
+        self.diagnostics_button.hide()
+        self.status_bar.addPermanentWidget(self.diagnostics_button)
+
+        # 文件变化监视：系统通知 + 无法监视时的修改时间轮询，变化经防抖后统一处理
+        self.fs_watcher = QFileSystemWatcher(self)
+        self.fs_watcher.directoryChanged.connect(self.on_directory_changed)
+        self.change_timer = QTimer(self)
+        self.change_timer.setSingleShot(True)
+        self.change_timer.setInterval(self.WATCH_DEBOUNCE_MS)
+        self.change_timer.timeout.connect(self.apply_directory_changes)
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(self.POLL_INTERVAL_MS)
+        self.poll_timer.timeout.connect(self.poll_directories)
+
+        # 按需加载模式下，展开目录后延迟刷新文本输出，合并连续的展开操作
+        self.text_update_timer = QTimer(self)
+        self.text_update_timer.setSingleShot(True)
+        self.text_update_timer.setInterval(200)
+        self.text_update_timer.timeout.connect(lambda: self.generate_file_tree_text(self.scan_tree))
+
+        # 筛选防抖：连续输入时只在停顿后筛选一次
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(self.FILTER_DELAY_MS)
+        self.filter_timer.timeout.connect(self.apply_filter)
+
+        # 扫描期间占用图随汇总大小定期重画，而不是每批目录都重新布局
+        self.treemap_timer = QTimer(self)
+        self.treemap_timer.setSingleShot(True)
+        self.treemap_timer.setInterval(self.TREEMAP_REFRESH_MS)
+        self.treemap_timer.timeout.connect(self.treemap.refresh)
+
+        # 文本输出由生成器逐行产生，在事件循环空闲时分批追加到文本框
+        self.text_lines = None
+        self.text_append_timer = QTimer(self)
+        self.text_append_timer.setInterval(0)
+        self.text_append_timer.timeout.connect(self.append_text_chunk)
+
         # 初始化工具栏图标
         self.update_toolbar_icons()
 
-    def on_tree_item_clicked(self, item, column):
+    def on_tree_item_clicked(self, index):
         """处理树视图项目点击事件，更新状态栏信息"""
-        if item:
-            path = item.data(0, Qt.UserRole)
+        if index.isValid():
+            path = index.siblingAtColumn(0).data(Qt.UserRole)
             if path:
                 self.status_bar.showMessage(f"已选择: {path}")
 
+    def on_treemap_clicked(self, node):
+        """在树视图中选中占用图中单击的条目。"""
+        self.reveal_node(node)
+        self.status_bar.showMessage(f"已选择: {self.scan_tree.path(node)}")
+
+    def on_tree_item_activated(self, index):
+        """双击"… 还有 N 项"提示行时显示下一页；已读取的条目都已显示时读取该文件夹的全部条目。"""
+        node = self.tree_model.more_node(index)
+        if node is None:
+            return
+        if self.tree_model.has_next_page(node):
+            shown = self.tree_model.show_next_page(node)
+            self.show_message(f"已显示 {self.scan_tree.name(node)} 的 {shown}/{self.scan_tree.child_count[node]} 项")
+        else:
+            self.load_remaining_entries(node)
+
+    def load_remaining_entries(self, node):
+        """取消文件夹 node 的条目数上限并重新读取，新出现的子文件夹在展开时读取。"""
+        tree = self.scan_tree
+        if self.scan_thread is not None:
+            self.show_message("请等待扫描完成后再读取剩余条目")
+            return
+        if self.export_task is not None:
+            self.show_message("请等待导出完成后再读取剩余条目")
+            return
+        tree.full_dirs.add(node)
+        self.tree_model.refresh_directory(node)
+        if self.tree_model.sorts_by_value():
+            self.tree_model.resort()
+        self.refresh_filter()
+        self.treemap.refresh()
+        self.update_scan_status(tree)
+        self.text_update_timer.start()
+        self.show_message(f"已读取 {tree.name(node)} 的全部 {tree.child_count[node]} 项")
+
+    def set_lazy_mode(self, enabled):
+        """切换按需加载模式，并按新模式重新打开当前文件夹。"""
+        self.lazy_mode = enabled
+        self.show_message("已开启按需加载" if enabled else "已关闭按需加载")
+        if self.current_path:
+            self.process_selected_directory(self.current_path)
+
+    def on_directory_loaded(self, index):
+        """按需加载模式下某个目录被展开读取后，在后台预读下一层。"""
+        tree = self.scan_tree
+        if self.is_watchable(tree, index):
+            self.watch_directories(tree, [index])
+        self.prefetch_children(tree, index)
+        self.tree_view.viewport().update()
+        self.treemap.refresh()
+        self.update_scan_status(tree)
+        self.text_update_timer.start()
+
+    def prefetch_children(self, tree, index):
+        """在线程池中预读指定目录下尚未读取的子目录。"""
+        indices = [child for child in tree.children(index)
+                   if tree.is_dir(child) and not tree.is_listed(child)]
+        if not indices:
+            return
+        task = PrefetchTask(tree, indices, lambda: tree is not self.scan_tree)
+        task.signals.finished.connect(self.on_prefetch_finished)
+        QThreadPool.globalInstance().start(task)
+
+    def on_prefetch_finished(self, tree, indices):
+        """预读完成后更新这些目录行及上层目录的汇总大小，内容等展开时再填充。"""
+        if tree is not self.scan_tree:
+            return
+        for index in indices:
+            self.tree_model.node_changed(index)
+        self.tree_view.viewport().update()
+        self.treemap.refresh()
+        self.refresh_filter()
+        self.update_scan_status(tree)
+        self.check_scan_cache()
+
+    def set_watch_enabled(self, enabled):
+        """开启或关闭文件变化监视。"""
+        self.watch_enabled = enabled
+        self.reset_watches()
+        tree = self.scan_tree
+        if enabled and tree is not None and self.scan_thread is None:
+            self.watch_directories(tree, [i for i in range(len(tree)) if self.is_watchable(tree, i)])
+        self.show_message("已开启变化监视" if enabled else "已关闭变化监视")
+
+    def is_watchable(self, tree, index):
+        """只有成功读取过内容的目录才需要监视。"""
+        return tree.is_dir(index) and tree.first_child[index] >= 0 and index not in tree.list_errors
+
+    def watch_directories(self, tree, indices):
+        """监视这些目录的变化；超出监视上限或系统不支持时改为定时比较修改时间。"""
+        if not self.watch_enabled or not indices:
+            return
+        mtimes = {tree.path(i): tree.mtimes[i] for i in indices}
+        paths = list(mtimes)
+        room = max(0, self.MAX_WATCHED_DIRS - len(self.fs_watcher.directories()))
+        failed = self.fs_watcher.addPaths(paths[:room]) if room else []
+        for path in list(failed) + paths[room:]:
+            self.poll_dirs.append([path, mtimes[path]])
+        if self.poll_dirs and not self.poll_timer.isActive():
+            self.poll_timer.start()
+
+    def reset_watches(self):
+        """停止监视之前打开的文件夹。"""
+        watched = self.fs_watcher.directories()
+        if watched:
+            self.fs_watcher.removePaths(watched)
+        self.poll_dirs = []
+        self.poll_pos = 0
+        self.dirty_dirs.clear()
+        self.poll_timer.stop()
+        self.change_timer.stop()
+
+    def on_directory_changed(self, path):
+        """记录发生变化的目录，稍后合并处理。"""
+        self.dirty_dirs.add(path)
+        self.schedule_directory_changes()
+
+    def schedule_directory_changes(self):
+        """防抖：变化停止一段时间后再统一刷新，git checkout 之类的批量变化只处理一次。"""
+        now = time.monotonic()
+        if not self.change_timer.isActive():
+            self.dirty_since = now
+            self.change_timer.start()
+        elif now - self.dirty_since < self.WATCH_MAX_DELAY:
+            # 持续有变化时不断推迟，但最多推迟 WATCH_MAX_DELAY 秒
+            self.change_timer.start()
+
+    def poll_directories(self):
+        """无法监视的目录：轮流比较修改时间，每次只检查一部分。"""
+        if not self.poll_dirs:
+            self.poll_timer.stop()
+            return
+        count = min(self.POLL_BATCH, len(self.poll_dirs))
+        for _ in range(count):
+            self.poll_pos %= len(self.poll_dirs)
+            entry = self.poll_dirs[self.poll_pos]
+            try:
+                mtime = os.stat(entry[0]).st_mtime
+            except OSError:
+                # 目录已被删除，父目录的变化会反映这一点
+                del self.poll_dirs[self.poll_pos]
+                if not self.poll_dirs:
+                    break
+                continue
+            if mtime != entry[1]:
+                entry[1] = mtime
+                self.dirty_dirs.add(entry[0])
+            self.poll_pos += 1
+        if self.dirty_dirs:
+            self.schedule_directory_changes()
+
+    def apply_directory_changes(self):
+        """只重新读取发生变化的目录，就地更新树视图和文本输出。"""
+        tree = self.scan_tree
+        if tree is None:
+            self.dirty_dirs.clear()
+            return
+        if self.scan_thread is not None or self.export_task is not None:
+            self.change_timer.start()  # 扫描或导出仍在进行，稍后再处理
+            return
+
+        # 先处理上层目录，下层目录的节点编号可能因此改变，所以按路径重新查找
+        paths = sorted(self.dirty_dirs, key=lambda p: p.count(os.sep))
+        self.dirty_dirs.clear()
+        updated = 0
+        added_dirs = []
+        for path in paths:
+            index = find_node(tree, path)
+            if index is None or not tree.is_listed(index):
+                continue
+            added = self.tree_model.refresh_directory(index)
+            updated += 1
+            if not self.lazy_mode:  # 按需加载时新目录在展开时再读取
+                added_dirs.extend(added)
+
+        if updated:
+            if self.tree_model.sorts_by_value():
+                self.tree_model.resort()
+            self.refresh_filter()
+            self.treemap.refresh()
+            if not added_dirs:
+                self.generate_file_tree_text(tree)  # 否则等新目录读取完再生成
+            self.update_scan_status(tree)
+            self.show_message(f"检测到文件变化，已更新 {updated} 个文件夹")
+        if added_dirs:
+            # 新出现的目录可能很大，与完整扫描一样在后台线程中读取并分批显示
+            self.start_scan(tree, added_dirs)
+
+    def set_cache_enabled(self, enabled):
+        """开启或关闭持久化扫描缓存，对之后打开的文件夹生效。"""
+        self.cache_enabled = enabled
+        self.show_message("已开启扫描缓存" if enabled else "已关闭扫描缓存")
+
+    def edit_scan_settings(self):
+        """编辑忽略规则和扫描上限，确定后按新设置重新打开当前文件夹。"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("扫描设置")
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(QLabel("忽略规则：每行一个模式，语法同 .gitignore，例如 node_modules/、*.log、build/**/*.o"))
+        patterns_edit = QPlainTextEdit("\n".join(self.ignore_patterns))
+        layout.addWidget(patterns_edit)
+        gitignore_box = QCheckBox("同时遵循各文件夹中的 .gitignore（并忽略 .git 文件夹）")
+        gitignore_box.setChecked(self.use_gitignore)
+        layout.addWidget(gitignore_box)
+
+        # 上限为 0 表示不限制
+        limits = QFormLayout()
+        limit_boxes = []
+        for label, value, maximum in (("最多显示层数", self.scan_max_depth, 1000),
+                                      ("每个文件夹最多条目数", self.scan_max_children, 10 ** 8),
+                                      ("总条目上限", self.scan_max_entries, 10 ** 9)):
+            box = QSpinBox()
+            box.setRange(0, maximum)
+            box.setSpecialValueText("不限制")
+            box.setValue(value or 0)
+            limits.addRow(label, box)
+            limit_boxes.append(box)
+        layout.addLayout(limits)
+        layout.addWidget(QLabel("超出上限的部分不会被读取，展开文件夹或双击\"… 还有 N 项\"时再读取"))
+        one_filesystem_box = QCheckBox("不进入其他文件系统（如 /proc、网络磁盘等挂载点）")
+        one_filesystem_box.setChecked(self.one_filesystem)
+        layout.addWidget(one_filesystem_box)
+
+        diagnostics_box = QCheckBox("性能诊断：统计每次打开文件夹的系统调用次数和各阶段耗时")
+        diagnostics_box.setChecked(self.diagnostics_enabled)
+        layout.addWidget(diagnostics_box)
+        profile_box = QCheckBox("同时用 cProfile 分析（扫描改为单线程，结果保存为 .prof 文件）")
+        profile_box.setChecked(self.profile_enabled)
+        layout.addWidget(profile_box)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+        dialog.resize(480, 320)
+        if dialog.exec() != QDialog.Accepted:
+            return
+
+        patterns = [line.strip() for line in patterns_edit.toPlainText().splitlines() if line.strip()]
+        try:
+            IgnoreRules(patterns, gitignore_box.isChecked())
+        except ValueError as e:
+            self.show_error(str(e))
+            return
+        self.ignore_patterns = patterns
+        self.use_gitignore = gitignore_box.isChecked()
+        self.scan_max_depth, self.scan_max_children, self.scan_max_entries = (
+            box.value() or None for box in limit_boxes)
+        self.one_filesystem = one_filesystem_box.isChecked()
+        self.profile_enabled = profile_box.isChecked()
+        self.diagnostics_enabled = diagnostics_box.isChecked() or self.profile_enabled
+        self.diagnostics_button.setVisible(self.diagnostics_enabled and self.scan_stats is not None)
+        self.show_message("扫描设置已更新")
+        if self.current_path:
+            self.process_selected_directory(self.current_path)
+
+    def make_ignore_rules(self):
+        """根据当前设置创建忽略规则，没有任何规则时返回 None。"""
+        if not self.ignore_patterns and not self.use_gitignore:
+            return None
+        return IgnoreRules(self.ignore_patterns, self.use_gitignore)
+
+    def get_scan_cache(self):
+        """返回扫描缓存，首次使用时打开；无法打开时自动关闭缓存功能。"""
+        if not self.cache_enabled:
+            return None
+        if self.scan_cache is None:
+            try:
+                self.scan_cache = ScanCache()
+            except (OSError, sqlite3.Error) as e:
+                self.cache_enabled = False
+                self.show_error(f"无法打开扫描缓存: {e}")
+        return self.scan_cache
+
+    def check_scan_cache(self):
+        """扫描缓存读写失败后关闭缓存功能；扫描本身已直接读取目录，结果不受影响。"""
+        cache = self.scan_cache
+        if cache is None or cache.error is None:
+            return
+        self.scan_cache = None
+        self.cache_enabled = False
+        cache.close()
+        self.show_error(f"扫描缓存读写失败，已停用: {cache.error}")
+
     def refresh_current_directory(self):
         """刷新当前目录视图"""
         if self.current_path and os.path.exists(self.current_path):
-            self.process_selected_directory(self.current_path)
+            # 刷新时跳过缓存，确保显示磁盘上的最新内容
+            self.process_selected_directory(self.current_path, use_cache=False)
             self.show_message("已刷新文件夹视图")
         else:
             self.show_error("没有当前文件夹可刷新")
 
+    def closeEvent(self, event):
+        """关闭窗口前停止后台扫描线程，并把缓存写入磁盘。"""
+        self.stop_scan()
+        if isinstance(self.export_task, DuplicateTask):
+            self.export_task.cancel()  # 不必等待读取完剩余的文件
+        if self.scan_cache is not None:
+            self.scan_cache.close()
+            self.scan_cache = None
+        super().closeEvent(event)
+
     def dragEnterEvent(self, event: QDragEnterEvent):
         """处理拖入事件以支持拖放。"""
         if event.mimeData().hasUrls():
@@ -590,10 +2207,10 @@ class FileExplorerApp(QMainWindow):
 
     def show_context_menu(self, position):
         """显示右键上下文菜单。"""
-        item = self.tree_widget.itemAt(position)
-        if item:
-            path = item.data(0, Qt.UserRole)
-            name = item.text(0)
+        index = self.tree_view.indexAt(position).siblingAtColumn(0)
+        path = index.data(Qt.UserRole)
+        if path:
+            name = index.data(Qt.DisplayRole)
 
             menu = QMenu(self)
 
@@ -625,7 +2242,7 @@ class FileExplorerApp(QMainWindow):
                 copy_rel_action.triggered.connect(lambda: self.copy_item_info(rel_path))
                 copy_rel_action.setIcon(self.create_custom_icon("copy", self.copy_icon_color))
 
-            menu.exec_(self.tree_widget.mapToGlobal(position))
+            menu.exec_(self.tree_view.mapToGlobal(position))
 
     def normalize_path(self, path):
         """统一路径分隔符，根据操作系统使用正确的分隔符"""
@@ -662,228 +2279,669 @@ class FileExplorerApp(QMainWindow):
         if path:
             self.process_selected_directory(path)
 
-    def process_selected_directory(self, path):
+    def process_selected_directory(self, path, use_cache=True):
         """处理选中的文件夹。"""
+        self.stop_scan()
+        self.reset_watches()
+        self.start_diagnostics(path)
         self.current_path = path
         # 标准化路径
         normalized_path = self.normalize_path(path)
         self.status_bar.showMessage(f"当前路径: {normalized_path}")
-        self.generate_file_tree(path)
-        self.generate_file_tree_text(path)
-        self.copy_button.setEnabled(True)
-
-    def generate_file_tree(self, root_path):
-        """生成文件树视图。"""
-        self.tree_widget.clear()
-        if not os.path.exists(root_path):
+        if not os.path.exists(path):
+            self.scan_tree = None
+            self.name_index = None
+            self.tree_model.set_tree(None)
+            self.treemap.set_tree(None)
+            self.clear_text_output()
+            self.text_edit.setPlainText("路径不存在")
             self.show_error("路径不存在")
             return
 
-        # 创建根项
-        root_name = os.path.basename(root_path)
-        if not root_name:  # 处理根目录情况
-            root_name = root_path
-
-        root_item = QTreeWidgetItem(self.tree_widget, [root_name])
-        root_item.setData(0, Qt.UserRole, root_path)
+        # 只遍历一次文件系统，树视图和文本输出都从同一份快照渲染
+        self.scan_tree = ScanTree(path)
+        self.name_index = NameIndex(self.scan_tree)
+        self.scan_tree.cache = self.get_scan_cache()
+        self.scan_tree.use_cache = use_cache
+        self.scan_tree.ignore = self.make_ignore_rules()
+        self.scan_tree.max_depth = self.scan_max_depth
+        self.scan_tree.max_children = self.scan_max_children
+        self.scan_tree.max_entries = self.scan_max_entries
+        self.scan_tree.one_filesystem = self.one_filesystem
+        self.scan_tree.stats = self.pending_stats
+        self.clear_text_output()
+        self.set_text_actions_enabled(False)
+        if self.lazy_mode:
+            # 按需加载：只读取根目录，其余目录在展开时读取
+            list_directory(self.scan_tree, 0)
+            self.generate_file_tree(self.scan_tree)
+            self.generate_file_tree_text(self.scan_tree)
+            self.set_text_actions_enabled(True)
+            self.update_scan_status(self.scan_tree)
+            if self.is_watchable(self.scan_tree, 0):
+                self.watch_directories(self.scan_tree, [0])
+            self.prefetch_children(self.scan_tree, 0)
+            self.refresh_filter()
+            return
+        self.generate_file_tree(self.scan_tree)
+        self.start_scan(self.scan_tree)
+
+    def start_scan(self, tree, starts=(0,)):
+        """在后台线程中扫描 starts 中的目录（默认为根目录），扫描结果分批填充到树视图。"""
+        self.scan_thread = QThread(self)
+        # cProfile 只能看到扫描线程自身的调用，分析时不再把目录分给线程池读取
+        workers = 1 if self.profiler is not None else self.SCAN_WORKERS
+        self.scan_worker = ScanWorker(tree, workers, self.name_index, self.profiler, starts)
+        self.scan_worker.moveToThread(self.scan_thread)
+        self.scan_thread.started.connect(self.scan_worker.run)
+        self.scan_worker.batch_ready.connect(self.on_scan_batch)
+        self.scan_worker.finished.connect(self.on_scan_finished)
+        self.scan_thread.finished.connect(self.scan_worker.deleteLater)
+        self.scan_thread.finished.connect(self.scan_thread.deleteLater)
+
+        self.cancel_action.setEnabled(True)
+        self.update_scan_status(tree)
+        self.scan_thread.start()
+
+    def stop_scan(self):
+        """停止正在进行的扫描并等待后台线程退出。"""
+        if self.scan_thread is None:
+            return
+        self.scan_worker.cancel()
+        self.scan_thread.quit()
+        self.scan_thread.wait()
+        self.scan_thread = None
+        self.scan_worker = None
+        self.cancel_action.setEnabled(False)
+
+    def cancel_scan(self):
+        """响应工具栏的取消按钮，已读取的部分会保留在视图中。"""
+        if self.scan_worker is not None:
+            self.scan_worker.cancel()
+            self.show_message("正在取消扫描...")
+
+    def on_scan_batch(self, tree, indices):
+        """后台线程读取完一批目录后，把对应的树节点排入填充队列。"""
+        if tree is not self.scan_tree:
+            return  # 已被新的扫描取代
+        start = time.perf_counter()
+        for index in indices:
+            self.tree_model.publish(index)
+        if tree.stats is not None:
+            tree.stats.add_time("publish", time.perf_counter() - start)
+        self.tree_view.viewport().update()  # 上层目录的汇总大小随扫描增长
+        if not self.treemap_timer.isActive():
+            self.treemap_timer.start()
+        self.update_scan_status(tree)
+
+    def on_scan_finished(self, tree):
+        """扫描结束（完成或取消）后生成文本输出。"""
+        if tree is not self.scan_tree:
+            return
+        starts = self.scan_worker.starts if self.scan_worker is not None else (0,)
+        if self.scan_thread is not None:
+            self.scan_thread.quit()
+            self.scan_thread.wait()
+            self.scan_thread = None
+            self.scan_worker = None
+        self.cancel_action.setEnabled(False)
+        if starts != (0,):
+            self.on_new_dirs_scanned(tree, starts)
+            return
+        self.tree_model.finish_scan()
+        self.update_scan_status(tree)
+        if self.tree_model.sorts_by_value():
+            self.tree_model.resort()  # 汇总大小已确定，按最终结果重新排序
+        self.refresh_filter()
+        self.treemap_timer.stop()
+        self.treemap.refresh()
+
+        self.generate_file_tree_text(tree)
+        self.set_text_actions_enabled(True)
+        self.watch_directories(tree, [i for i in range(len(tree)) if self.is_watchable(tree, i)])
+        self.check_scan_cache()
+        if tree.cancelled:
+            self.show_message("扫描已取消，仅显示已读取的部分，其余文件夹展开时读取")
+        elif tree.truncated:
+            self.show_message("已达到扫描上限，其余文件夹展开时读取")
+        elif tree.cached_dirs:
+            self.show_message(f"扫描完成，{tree.cached_dirs} 个未变化的文件夹直接使用了缓存")
+
+    def on_new_dirs_scanned(self, tree, starts):
+        """文件变化后新出现的目录读取完毕，更新汇总、文本输出并开始监视这些目录。"""
+        self.update_scan_status(tree)
+        if self.tree_model.sorts_by_value():
+            self.tree_model.resort()
+        self.refresh_filter()
+        self.treemap_timer.stop()
+        self.treemap.refresh()
+        self.generate_file_tree_text(tree)
+        new_dirs = []
+        pending = list(starts)
+        while pending:
+            index = pending.pop()
+            new_dirs.append(index)
+            pending.extend(child for child in tree.children(index) if tree.is_dir(child))
+        self.watch_directories(tree, [i for i in new_dirs if self.is_watchable(tree, i)])
+        self.check_scan_cache()
+
+    def update_scan_status(self, tree):
+        """在状态栏右侧显示已扫描的条目数和字节数。"""
+        if self.scan_thread is not None:
+            prefix = "正在扫描"
+        else:
+            prefix = "已加载" if self.lazy_mode else "共"
+        self.scan_status_label.setText(
+            f"{prefix} {tree.entry_count()} 项 · {self.format_size(tree.bytes_scanned)}")
+
+    def generate_file_tree(self, tree):
+        """让树视图显示扫描快照，尚未扫描到的目录会在读取完成后陆续出现。"""
+        start = time.perf_counter()
+        self.tree_model.set_tree(tree, self.lazy_mode)
+        self.tree_view.expand(self.tree_model.index(0, 0))
+        self.treemap.set_tree(tree)
+        if tree.stats is not None:
+            tree.stats.add_time("publish", time.perf_counter() - start)
 
-        # 设置使用自定义图标
-        folder_icon = self.create_custom_icon("folder", self.folder_icon_color)
-        root_item.setIcon(0, folder_icon)
-        root_item.setForeground(0, QColor(self.folder_icon_color))
-        root_item.setExpanded(True)
+        # 调整列宽以适应内容
+        self.tree_view.header().setStretchLastSection(False)
+        # 最后重新确认第一列是伸缩的
+        self.tree_view.header().setSectionResizeMode(0, QHeaderView.Stretch)
 
-        # 设置工具提示显示完整路径
-        root_item.setToolTip(0, root_path)
+    def schedule_filter(self):
+        """筛选条件改变后稍等片刻再筛选，合并连续的按键。"""
+        self.filter_timer.start()
 
-        # 设置为加粗，以突出显示
-        bold_font = self.tree_font
-        bold_font.setBold(True)
-        root_item.setFont(0, bold_font)
+    def refresh_filter(self):
+        """快照内容改变后，若正在筛选则按新内容重新筛选。"""
+        if self.filter_edit.text():
+            self.filter_timer.start()
 
-        self.add_directory_contents(root_path, root_item)
+    def apply_filter(self):
+        """只显示名称与筛选框匹配的条目及其所有上层文件夹。"""
+        tree = self.scan_tree
+        if tree is None:
+            return
+        query = self.filter_edit.text()
+        view = self.tree_view
+        current = self.tree_model.node_of(view.currentIndex())
+        if not query:
+            if self.tree_model.visible is None:
+                return
+            self.tree_model.set_filter(None)
+            view.expand(self.tree_model.index(0, 0))
+            if current is not None:
+                # 在完整的树中展开选中项所在的文件夹，便于定位
+                self.reveal_node(current)
+        else:
+            try:
+                pattern = compile_query(query, self.filter_mode_box.currentData())
+            except ValueError as e:
+                self.show_error(str(e))
+                return
+            self.name_index.update()
+            matches, complete = self.name_index.search(pattern, self.FILTER_MAX_MATCHES)
+            self.tree_model.set_filter(filter_mask(tree, matches))
+            view.expandAll()
+            if not matches:
+                self.show_message("没有匹配的条目")
+            elif complete:
+                self.show_message(f"找到 {len(matches)} 个匹配项")
+            else:
+                self.show_message(f"匹配项过多，只显示前 {len(matches)} 个")
+            if current is not None:
+                index = self.tree_model.index_for_node(current)
+                if index.isValid():
+                    view.setCurrentIndex(index)
+
+    def reveal_node(self, node):
+        """逐级展开节点所在的文件夹（必要时读取和翻页），然后选中并滚动到该节点。"""
+        model = self.tree_model
+        parents = self.scan_tree.parents
+        ancestors = []
+        parent = parents[node]
+        while parent >= 0:
+            ancestors.append(parent)
+            parent = parents[parent]
+        for ancestor in reversed(ancestors):
+            model.show_node(ancestor)
+            index = model.index_for_node(ancestor)
+            if model.canFetchMore(index):
+                model.fetchMore(index)
+            if ancestor not in model.published:
+                return  # 上层文件夹还没有显示（仍在扫描）
+            self.tree_view.expand(index)
+        model.show_node(node)
+        index = model.index_for_node(node)
+        self.tree_view.setCurrentIndex(index)
+        self.tree_view.scrollTo(index)
+
+    def generate_file_tree_text(self, tree):
+        """根据扫描快照生成文件树的文本输出，分批追加到文本框，不会长时间阻塞界面。"""
+        self.clear_text_output()
+        self.text_lines = iter_tree_lines(tree, mark_unlisted=not self.lazy_mode)
+        self.append_text_chunk()
+        if self.text_lines is not None:
+            self.text_append_timer.start()
+
+    def clear_text_output(self):
+        """停止尚未完成的文本输出并清空文本框。"""
+        self.text_lines = None
+        self.text_append_timer.stop()
+        self.text_edit.clear()
+
+    def append_text_chunk(self):
+        """从行生成器取出一批行追加到文本末尾，每次最多占用 TEXT_CHUNK_SECONDS。"""
+        lines = self.text_lines
+        if lines is None:
+            self.text_append_timer.stop()
+            return
+        stats = self.pending_stats
+        if stats is not None:
+            with stats.phase("text"):
+                self._append_text_lines(lines)
+            if self.text_lines is None and self.scan_thread is None:
+                self.finish_diagnostics()  # 文本输出完成，本次打开文件夹结束
+        else:
+            self._append_text_lines(lines)
+
+    def _append_text_lines(self, lines):
+        """append_text_chunk 的主体：追加一批行，全部追加完毕时清除行生成器。"""
+        document = self.text_edit.document()
+        deadline = time.monotonic() + self.TEXT_CHUNK_SECONDS
+        while time.monotonic() < deadline:
+            chunk = list(itertools.islice(lines, self.TEXT_CHUNK_LINES))
+            if chunk:
+                # 直接在文档末尾插入，不像 appendPlainText 那样把视图滚动到底部
+                cursor = QTextCursor(document)
+                cursor.movePosition(QTextCursor.End)
+                if not document.isEmpty():
+                    cursor.insertText("\n")
+                cursor.insertText("\n".join(chunk))
+            if len(chunk) < self.TEXT_CHUNK_LINES:
+                self.text_lines = None
+                self.text_append_timer.stop()
+                return
+
+    def set_text_actions_enabled(self, enabled):
+        """启用或禁用复制、导出按钮。"""
+        self.copy_button.setEnabled(enabled)
+        self.export_button.setEnabled(enabled)
 
-        # 调整列宽以适应内容
-        self.tree_widget.header().setStretchLastSection(False)
-        # 最后重新确认第一列是伸缩的
-        self.tree_widget.header().setSectionResizeMode(0, QHeaderView.Stretch)
-
-    def format_access_error(self, error, path):
-        """格式化访问错误信息，提供更清晰的提示"""
-        if isinstance(error, PermissionError):
-            # 针对权限错误提供更明确的提示
-            if platform.system() == "Windows":
-                return "需要管理员权限访问"
+    def copy_to_clipboard(self):
+        """将文本输出复制到剪贴板。"""
+        if self.scan_tree is None:
+            self.show_error("没有可复制的文件树内容")
+            return
+        # 直接从快照生成，不必等待文本框追加完毕
+        pyperclip.copy("\n".join(iter_tree_lines(self.scan_tree, mark_unlisted=not self.lazy_mode)))
+        self.show_message("文件树结构已复制到剪贴板")
+
+    def export_tree(self):
+        """导出为文本目录树、JSON、NDJSON 或 CSV，在后台逐行写入文件，内存占用不随条目数增长。"""
+        tree = self.scan_tree
+        if tree is None:
+            self.show_error("没有可导出的文件树内容")
+            return
+        if self.export_task is not None:
+            self.show_message("正在导出，请稍候")
+            return
+        path, selected = QFileDialog.getSaveFileName(
+            self, "导出目录树", f"{tree.name(0)}.txt", ";;".join(label for label, _ in self.EXPORT_FORMATS))
+        if not path:
+            return
+        # 以输入的扩展名为准，没有可识别的扩展名时按所选的文件类型
+        fmt = self.EXPORT_EXTENSIONS.get(os.path.splitext(path)[1].lower()) or dict(self.EXPORT_FORMATS).get(
+            selected, "text")
+        mark_unlisted = not self.lazy_mode
+
+        def write(path):
+            if fmt == "text":
+                with open(path, "w", encoding="utf-8", errors="surrogateescape") as f:
+                    f.writelines(f"{line}\n" for line in iter_tree_lines(tree, mark_unlisted=mark_unlisted))
             else:
-                return "需要权限访问 (sudo)"
-        elif isinstance(error, FileNotFoundError):
-            return "文件或目录不存在"
+                with open(path, "w", encoding="utf-8", errors="surrogateescape", newline="") as f:
+                    write_export(tree, f, fmt)
+
+        self.export_task = ExportTask(path, write)
+        self.export_task.signals.finished.connect(self.on_export_finished)
+        QThreadPool.globalInstance().start(self.export_task)
+        self.status_bar.showMessage(f"正在导出到 {path}…")
+
+    def on_export_finished(self, path, error):
+        """导出结束后提示结果，并处理导出期间推迟的文件变化。"""
+        self.export_task = None
+        if error:
+            self.show_error(f"导出失败: {error}")
         else:
-            # 其他类型的错误保持简洁
-            return f"访问受限: {type(error).__name__}"
+            self.show_message(f"已导出到 {path}")
+        if self.dirty_dirs:
+            self.schedule_directory_changes()
+
+    def snapshot_busy_message(self):
+        """扫描或后台任务进行中时返回提示文字，此时不能读取快照。"""
+        if self.scan_tree is None:
+            return "没有可用的扫描结果"
+        if self.scan_thread is not None:
+            return "请等待扫描完成"
+        if self.export_task is not None:
+            return "正在导出、对比或查找重复文件，请稍候"
+        return None
+
+    def save_snapshot(self):
+        """把当前扫描结果保存为快照文件，在后台写入。"""
+        message = self.snapshot_busy_message()
+        if message:
+            self.show_message(message)
+            return
+        tree = self.scan_tree
+        path, _ = QFileDialog.getSaveFileName(
+            self, "保存快照", f"{tree.name(0)}{SNAPSHOT_SUFFIX}", f"快照文件 (*{SNAPSHOT_SUFFIX})")
+        if not path:
+            return
+        self.export_task = ExportTask(path, lambda path: Snapshot.from_tree(tree).save(path))
+        self.export_task.signals.finished.connect(self.on_export_finished)
+        QThreadPool.globalInstance().start(self.export_task)
+        self.status_bar.showMessage(f"正在保存快照到 {path}…")
+
+    def compare_snapshot(self):
+        """选择之前保存的快照，在后台与当前扫描结果对比。"""
+        message = self.snapshot_busy_message()
+        if message:
+            self.show_message(message)
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "对比快照", "", f"快照文件 (*{SNAPSHOT_SUFFIX});;所有文件 (*)")
+        if not path:
+            return
+        if self.diff_dialog is not None:
+            self.diff_dialog.close()
+        self.export_task = CompareTask(path, self.scan_tree)
+        self.export_task.signals.finished.connect(self.on_compare_finished)
+        QThreadPool.globalInstance().start(self.export_task)
+        self.status_bar.showMessage(f"正在对比 {path}…")
+
+    def on_compare_finished(self, result, error):
+        """在树视图中标出变化，并在对话框中列出全部变化。"""
+        task = self.export_task
+        self.export_task = None
+        if self.dirty_dirs:
+            self.schedule_directory_changes()
+        if error:
+            self.show_error(f"无法读取快照: {error}")
+            return
+        old, new, changes = result
+        if task.tree is not self.scan_tree:
+            old.close()  # 对比期间打开了其他文件夹
+            return
 
-    def add_directory_contents(self, directory_path, parent_item):
-        """将文件夹内容添加到树视图。"""
-        try:
-            entries = os.listdir(directory_path)
-
-            # 分离并排序目录和文件
-            dirs = [(e, os.path.join(directory_path, e)) for e in entries if
-                    os.path.isdir(os.path.join(directory_path, e)) and not e.startswith('.')]
-            files = [(e, os.path.join(directory_path, e)) for e in entries if
-                     os.path.isfile(os.path.join(directory_path, e)) and not e.startswith('.')]
-            dirs.sort(key=lambda x: x[0].lower())
-            files.sort(key=lambda x: x[0].lower())
-
-            # 添加文件夹
-            for name, path in dirs:
-                item = QTreeWidgetItem(parent_item, [name])
-                item.setData(0, Qt.UserRole, path)
+        # 删除的条目不在当前的树中，标出其最近的仍然存在的上层文件夹
+        parents = self.scan_tree.parents
+        marked = {}
+        changed_dirs = set()
+        for change, i, j in changes:
+            if j is not None:
+                node = new.nodes[j]
+                marked[node] = change
+                node = parents[node]
+            else:
+                key = old.key(i)
+                while True:
+                    key = key.rpartition(b"\0")[0]
+                    j = new.find(key)
+                    if j is not None:
+                        break
+                node = new.nodes[j]
+            while node >= 0 and node not in changed_dirs:
+                changed_dirs.add(node)
+                node = parents[node]
+        self.tree_model.set_changes(marked, changed_dirs)
+        self.tree_view.viewport().update()
+        self.show_diff_dialog(old, new, changes)
+
+    def show_diff_dialog(self, old, new, changes):
+        """显示对比结果；超过 DIFF_MAX_LINES 行时只显示开头，复制和导出包含全部变化。"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("对比快照")
+        layout = QVBoxLayout(dialog)
+        shown = list(itertools.islice(iter_diff_lines(old, new, changes), self.DIFF_MAX_LINES))
+        if len(shown) < len(changes) + 2:  # 标题行 + 每处变化一行 + 汇总行
+            shown.append(f"… 仅显示前 {self.DIFF_MAX_LINES} 行，复制或导出可获得全部 {len(changes)} 处变化")
+        text_edit = QPlainTextEdit("\n".join(shown))
+        text_edit.setReadOnly(True)
+        text_edit.setLineWrapMode(QPlainTextEdit.NoWrap)
+        text_edit.setFont(self.tree_font)
+        layout.addWidget(text_edit)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        copy_button = buttons.addButton("复制到剪贴板", QDialogButtonBox.ActionRole)
+        copy_button.clicked.connect(lambda: self.copy_diff(old, new, changes))
+        export_button = buttons.addButton("导出为文件", QDialogButtonBox.ActionRole)
+        export_button.clicked.connect(lambda: self.export_diff(old, new, changes))
+        buttons.rejected.connect(dialog.close)
+        layout.addWidget(buttons)
+
+        def on_closed():
+            self.diff_dialog = None
+            self.tree_model.set_changes({}, set())
+            self.tree_view.viewport().update()
+            if self.export_task is None:
+                old.close()
+            else:
+                # 导出仍在读取快照，完成后再释放
+                self.export_task.signals.finished.connect(lambda *_: old.close())
+
+        dialog.finished.connect(on_closed)
+        dialog.setAttribute(Qt.WA_DeleteOnClose)
+        dialog.resize(720, 480)
+        self.diff_dialog = dialog
+        dialog.show()
+        self.show_message(f"对比完成，共 {len(changes)} 处变化" if changes else "对比完成，没有变化")
+
+    def copy_diff(self, old, new, changes):
+        """复制全部对比结果。"""
+        pyperclip.copy("\n".join(iter_diff_lines(old, new, changes)))
+        self.show_message("对比结果已复制到剪贴板")
+
+    def export_diff(self, old, new, changes):
+        """把全部对比结果写入文本文件。"""
+        if self.export_task is not None:
+            self.show_message("正在导出，请稍候")
+            return
+        path, _ = QFileDialog.getSaveFileName(self.diff_dialog, "导出对比结果", "对比结果.txt", "文本文件 (*.txt)")
+        if not path:
+            return
 
-                # 设置自定义图标和颜色
-                folder_icon = self.create_custom_icon("folder", self.folder_icon_color)
-                item.setIcon(0, folder_icon)
-                item.setForeground(0, QColor(self.folder_icon_color))
+        def write(path):
+            with open(path, "w", encoding="utf-8", errors="surrogateescape") as f:
+                f.writelines(f"{line}\n" for line in iter_diff_lines(old, new, changes))
 
-                # 设置工具提示显示完整路径
-                item.setToolTip(0, path)
+        self.export_task = ExportTask(path, write)
+        self.export_task.signals.finished.connect(self.on_export_finished)
+        QThreadPool.globalInstance().start(self.export_task)
+        self.status_bar.showMessage(f"正在导出到 {path}…")
 
-                try:
-                    stats = os.stat(path)
-                    item.setText(1, "文件夹")
-
-                    # 完整显示修改时间
-                    mod_time = datetime.datetime.fromtimestamp(stats.st_mtime)
-                    item.setText(2, mod_time.strftime("%Y-%m-%d %H:%M:%S"))
-                    # 设置时间列的工具提示
-                    item.setToolTip(2, mod_time.strftime("%Y-%m-%d %H:%M:%S"))
-
-                    try:
-                        item_count = len(os.listdir(path))
-                        item.setText(3, f"{item_count} 项")
-                    except (PermissionError, FileNotFoundError) as e:
-                        # 使用更友好的错误提示
-                        error_msg = self.format_access_error(e, path)
-                        item.setText(3, error_msg)
-                        item.setToolTip(3, f"错误: {str(e)}")
-                        # 设置警告图标
-                        warning_icon = self.create_custom_icon("warning", self.error_color)
-                        item.setIcon(3, warning_icon)
-
-                    # 递归添加子目录内容
-                    self.add_directory_contents(path, item)
-
-                except (PermissionError, FileNotFoundError) as e:
-                    # 使用更友好的错误提示
-                    error_msg = self.format_access_error(e, path)
-                    item.setText(1, "访问受限")
-                    item.setText(3, error_msg)
-                    item.setToolTip(1, f"错误: {str(e)}")
-                    item.setForeground(0, QColor(self.error_color))
-                    # 设置警告图标
-                    warning_icon = self.create_custom_icon("warning", self.error_color)
-                    item.setIcon(1, warning_icon)
-
-            # 添加文件
-            for name, path in files:
-                item = QTreeWidgetItem(parent_item, [name])
+    def find_duplicate_files(self):
+        """在后台查找当前扫描结果中内容相同的文件；正在查找时再次调用则取消。"""
+        if isinstance(self.export_task, DuplicateTask):
+            self.export_task.cancel()
+            self.status_bar.showMessage("正在取消查找重复文件…")
+            return
+        message = self.snapshot_busy_message()
+        if message:
+            self.show_message(message)
+            return
+        if self.duplicates_dialog is not None:
+            self.duplicates_dialog.close()
+        tree = self.scan_tree
+        self.export_task = DuplicateTask(tree, self.HASH_WORKERS, lambda: tree is not self.scan_tree)
+        self.export_task.signals.progress.connect(self.status_bar.showMessage)
+        self.export_task.signals.finished.connect(self.on_duplicates_finished)
+        QThreadPool.globalInstance().start(self.export_task)
+        self.status_bar.showMessage("正在查找重复文件…")
+
+    def on_duplicates_finished(self, result):
+        """列出查找到的重复文件；被取消或期间打开了其他文件夹时不显示。"""
+        task = self.export_task
+        self.export_task = None
+        if self.dirty_dirs:
+            self.schedule_directory_changes()
+        if result is None or task.tree is not self.scan_tree:
+            self.show_message("已取消查找重复文件")
+            return
+        groups, unreadable = result
+        self.show_duplicates_dialog(task.tree, groups, unreadable)
+
+    def show_duplicates_dialog(self, tree, groups, unreadable):
+        """按组列出重复文件，双击文件在树视图中定位；超过 DUPLICATE_MAX_GROUPS 组时只列出开头。"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("重复文件")
+        layout = QVBoxLayout(dialog)
+        summary = summary_text(groups)
+        if unreadable:
+            summary += f"；{len(unreadable)} 个文件无法读取，复制或导出可查看详情"
+        layout.addWidget(QLabel(summary))
+
+        view = QTreeWidget()
+        view.setFont(self.tree_font)
+        view.setUniformRowHeights(True)
+        view.setHeaderLabels(["重复文件", "可释放"])
+        view.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        view.header().setStretchLastSection(False)
+        root = tree.root_path
+        items = []
+        for number, (size, paths) in enumerate(groups[:self.DUPLICATE_MAX_GROUPS], 1):
+            group = QTreeWidgetItem([f"[{number}] {group_label(size, paths)}",
+                                     format_size(size * (len(paths) - 1))])
+            for path in paths:
+                item = QTreeWidgetItem(group, [os.path.relpath(path, root)])
                 item.setData(0, Qt.UserRole, path)
-
-                # 设置自定义文件图标和颜色
-                file_icon = self.create_custom_icon("file", self.file_icon_color)
-                item.setIcon(0, file_icon)
-                item.setForeground(0, QColor(self.file_icon_color))
-
-                # 设置工具提示显示完整路径
                 item.setToolTip(0, path)
+            items.append(group)
+        view.addTopLevelItems(items)
+        if len(items) <= 200:
+            view.expandAll()
+        view.itemActivated.connect(lambda item, _: self.reveal_duplicate(tree, item.data(0, Qt.UserRole)))
+        layout.addWidget(view)
+        if len(groups) > len(items):
+            layout.addWidget(QLabel(f"仅列出可释放空间最多的前 {len(items)} 组，复制或导出可获得全部 {len(groups)} 组"))
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        copy_button = buttons.addButton("复制到剪贴板", QDialogButtonBox.ActionRole)
+        copy_button.clicked.connect(lambda: self.copy_duplicates(groups, unreadable))
+        export_button = buttons.addButton("导出为文件", QDialogButtonBox.ActionRole)
+        export_button.clicked.connect(lambda: self.export_duplicates(groups, unreadable))
+        buttons.rejected.connect(dialog.close)
+        layout.addWidget(buttons)
+
+        def on_closed():
+            self.duplicates_dialog = None
+
+        dialog.finished.connect(on_closed)
+        dialog.setAttribute(Qt.WA_DeleteOnClose)
+        dialog.resize(720, 480)
+        self.duplicates_dialog = dialog
+        dialog.show()
+        self.show_message(summary_text(groups))
+
+    def reveal_duplicate(self, tree, path):
+        """在树视图中定位重复文件对话框中双击的文件；分组行没有路径，忽略。"""
+        if path is None:
+            return
+        node = find_node(tree, os.path.dirname(path)) if tree is self.scan_tree else None
+        name = os.path.basename(path)
+        if node is not None:
+            node = next((child for child in tree.children(node) if tree.name(child) == name), None)
+        if node is None:
+            self.show_message("该文件已不在当前的扫描结果中")
+            return
+        self.reveal_node(node)
 
-                try:
-                    stats = os.stat(path)
-                    file_type = self.get_file_type(name)
-                    item.setText(1, file_type)
-                    item.setToolTip(1, file_type)
-
-                    # 完整显示修改时间
-                    mod_time = datetime.datetime.fromtimestamp(stats.st_mtime)
-                    mod_time_str = mod_time.strftime("%Y-%m-%d %H:%M:%S")
-                    item.setText(2, mod_time_str)
-                    item.setToolTip(2, mod_time_str)
-
-                    size_str = self.format_size(stats.st_size)
-                    item.setText(3, size_str)
-                    item.setToolTip(3, f"{stats.st_size} 字节 ({size_str})")
-                except (PermissionError, FileNotFoundError) as e:
-                    # 使用更友好的错误提示
-                    error_msg = self.format_access_error(e, path)
-                    item.setText(1, "访问受限")
-                    item.setText(3, error_msg)
-                    item.setToolTip(1, f"错误: {str(e)}")
-                    item.setForeground(0, QColor(self.error_color))
-                    # 设置警告图标
-                    warning_icon = self.create_custom_icon("warning", self.error_color)
-                    item.setIcon(1, warning_icon)
-
-        except (PermissionError, FileNotFoundError) as e:
-            # 使用更友好的错误提示
-            error_msg = self.format_access_error(e, directory_path)
-            error_item = QTreeWidgetItem(parent_item, [f"访问受限"])
-            error_item.setForeground(0, QColor(self.error_color))
-            error_item.setText(1, error_msg)
-            error_item.setToolTip(0, f"错误信息: {str(e)}")
-            # 设置警告图标
-            warning_icon = self.create_custom_icon("warning", self.error_color)
-            error_item.setIcon(0, warning_icon)
-
-    def generate_file_tree_text(self, root_path):
-        """生成文件树的文本输出。"""
-        if not os.path.exists(root_path):
-            self.text_edit.setText("路径不存在")
-            return
-
-        root_name = os.path.basename(root_path)
-        if not root_name:  # 处理根目录情况
-            root_name = root_path
-
-        result = [root_name]
-        self.add_directory_to_result(root_path, result, "")
-        self.text_edit.setText("\n".join(result))
-
-    def add_directory_to_result(self, directory, result, prefix):
-        """递归地将文件夹内容添加到文本输出。"""
-        try:
-            entries = os.listdir(directory)
-
-            # 分离并排序目录和文件
-            directories = [d for d in entries if os.path.isdir(os.path.join(directory, d)) and not d.startswith('.')]
-            files = [f for f in entries if os.path.isfile(os.path.join(directory, f)) and not f.startswith('.')]
-
-            directories.sort(key=str.lower)
-            files.sort(key=str.lower)
-
-            # 添加目录
-            for i, dirname in enumerate(directories):
-                is_last = (i == len(directories) - 1 and not files)
-                result.append(f"{prefix}{'└──' if is_last else '├──'} {dirname}")
-                self.add_directory_to_result(os.path.join(directory, dirname), result,
-                                             prefix + ("    " if is_last else "│   "))
-
-            # 添加文件
-            for i, filename in enumerate(files):
-                result.append(f"{prefix}{'└──' if i == len(files) - 1 else '├──'} {filename}")
+    def copy_duplicates(self, groups, unreadable):
+        """复制全部重复文件的列表。"""
+        pyperclip.copy("\n".join(iter_duplicate_lines(groups, unreadable)))
+        self.show_message("重复文件列表已复制到剪贴板")
 
-        except (PermissionError, FileNotFoundError) as e:
-            # 使用更友好的错误提示
-            error_msg = self.format_access_error(e, directory)
-            result.append(f"{prefix}└── [权限受限: {error_msg}]")
+    def export_duplicates(self, groups, unreadable):
+        """把全部重复文件的列表写入文本文件。"""
+        if self.export_task is not None:
+            self.show_message("正在导出，请稍候")
+            return
+        path, _ = QFileDialog.getSaveFileName(self.duplicates_dialog, "导出重复文件", "重复文件.txt",
+                                              "文本文件 (*.txt)")
+        if not path:
+            return
 
-    def copy_to_clipboard(self):
-        """将文本输出复制到剪贴板。"""
-        text = self.text_edit.toPlainText()
-        if text:
-            pyperclip.copy(text)
-            self.show_message("文件树结构已复制到剪贴板")
-        else:
-            self.show_error("没有可复制的文件树内容")
+        def write(path):
+            with open(path, "w", encoding="utf-8", errors="surrogateescape") as f:
+                f.writelines(f"{line}\n" for line in iter_duplicate_lines(groups, unreadable))
+
+        self.export_task = ExportTask(path, write)
+        self.export_task.signals.finished.connect(self.on_export_finished)
+        QThreadPool.globalInstance().start(self.export_task)
+        self.status_bar.showMessage(f"正在导出到 {path}…")
+
+    def start_diagnostics(self, path):
+        """开启性能诊断时为这次打开文件夹准备统计和 cProfile，未完成的上一次统计直接丢弃。"""
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler = None
+        self.pending_stats = None
+        if not self.diagnostics_enabled:
+            return
+        self.pending_stats = ScanStats(path)
+        self.diagnostics_started = time.perf_counter()
+        if self.profile_enabled:
+            profile_dir = os.path.join(os.path.dirname(default_cache_path()), "profiles")
+            self.profiler = Profiler(os.path.join(profile_dir, time.strftime("scan-%Y%m%d-%H%M%S.prof")))
+            self.profiler.enable()
+
+    def finish_diagnostics(self):
+        """结束统计，保存 cProfile 结果，并在状态栏显示摘要。"""
+        stats = self.pending_stats
+        self.pending_stats = None
+        if self.scan_tree is not None:
+            self.scan_tree.stats = None  # 之后展开或刷新文件夹不再计入
+        stats.add_time("total", time.perf_counter() - self.diagnostics_started)
+        if self.profiler is not None:
+            try:
+                stats.profile_path = self.profiler.save()
+            except OSError as e:
+                self.show_error(f"无法保存 cProfile 结果: {e}")
+            self.profiler = None
+        self.scan_stats = stats
+        self.diagnostics_button.setText(stats.summary())
+        self.diagnostics_button.show()
+
+    def show_diagnostics(self):
+        """显示最近一次打开文件夹的统计，可导出为 JSON。"""
+        stats = self.scan_stats
+        if stats is None:
+            return
+        dialog = QDialog(self)
+        dialog.setWindowTitle("性能诊断")
+        layout = QVBoxLayout(dialog)
+        text_edit = QPlainTextEdit("\n".join(stats.report_lines()))
+        text_edit.setReadOnly(True)
+        layout.addWidget(text_edit)
+        buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        export_button = buttons.addButton("导出 JSON", QDialogButtonBox.ActionRole)
+
+        def export():
+            path, _ = QFileDialog.getSaveFileName(dialog, "导出诊断信息", "scan-stats.json", "JSON (*.json)")
+            if not path:
+                return
+            try:
+                stats.dump(path)
+            except OSError as e:
+                self.show_error(f"导出失败: {e}")
+                return
+            self.show_message(f"已导出到 {path}")
+
+        export_button.clicked.connect(export)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+        dialog.resize(480, 400)
+        dialog.exec()
 
     def copy_item_info(self, text):
         """将项目信息复制到剪贴板。"""
@@ -913,46 +2971,16 @@ class FileExplorerApp(QMainWindow):
 
     def format_size(self, size_bytes):
         """将文件大小格式化为易读的字符串。"""
-        if size_bytes < 1024:
-            return f"{size_bytes} B"
-        elif size_bytes < 1024 * 1024:
-            return f"{size_bytes / 1024:.1f} KB"
-        elif size_bytes < 1024 * 1024 * 1024:
-            return f"{size_bytes / (1024 * 1024):.1f} MB"
-        else:
-            return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
+        return format_size(size_bytes)
 
     def get_file_type(self, filename):
         """获取文件类型描述。"""
-        ext = os.path.splitext(filename)[1].lower()
-        types = {
-            '.txt': "文本文件", '.md': "Markdown文件", '.log': "日志文件",
-            '.py': "Python文件", '.js': "JavaScript文件", '.html': "HTML文件",
-            '.css': "CSS文件", '.java': "Java文件", '.c': "C文件",
-            '.cpp': "C++文件", '.h': "头文件", '.hpp': "C++头文件",
-            '.jpg': "JPEG图像", '.jpeg': "JPEG图像", '.png': "PNG图像",
-            '.gif': "GIF图像", '.bmp': "BMP图像", '.tiff': "TIFF图像",
-            '.svg': "SVG矢量图", '.webp': "WebP图像",
-            '.mp3': "MP3音频", '.wav': "WAV音频", '.ogg': "OGG音频",
-            '.flac': "FLAC音频", '.aac': "AAC音频", '.wma': "WMA音频",
-            '.mp4': "MP4视频", '.avi': "AVI视频", '.mov': "MOV视频",
-            '.mkv': "MKV视频", '.wmv': "WMV视频", '.webm': "WebM视频",
-            '.pdf': "PDF文档", '.doc': "Word文档", '.docx': "Word文档",
-            '.xls': "Excel表格", '.xlsx': "Excel表格", '.csv': "CSV表格",
-            '.ppt': "PowerPoint演示", '.pptx': "PowerPoint演示",
-            '.zip': "ZIP压缩包", '.rar': "RAR压缩包", '.7z': "7Z压缩包",
-            '.tar': "TAR归档", '.gz': "GZ压缩包", '.bz2': "BZ2压缩包",
-            '.exe': "可执行程序", '.msi': "安装程序", '.bat': "批处理脚本",
-            '.sh': "Shell脚本", '.json': "JSON文件", '.xml': "XML文件",
-            '.yaml': "YAML文件", '.sql': "SQL脚本", '.db': "数据库文件",
-            '.ini': "配置文件", '.cfg': "配置文件", '.conf': "配置文件",
-            '.dll': "动态链接库", '.so': "共享库", '.dylib': "动态库"
-        }
-        return types.get(ext, "文件")
+        return file_type(filename)
 
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    use_system_collation()  # 树视图按系统语言的规则排列名称，例如中文按拼音
 
 
     # 确保使用绝对路径或资源路径获取图标
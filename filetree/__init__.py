@@ -0,0 +1 @@
+"""文件树管理器的核心逻辑：目录扫描与文本输出，不依赖任何 GUI 库。"""
@@ -0,0 +1,156 @@
+"""持久化扫描缓存：把每个目录的列表和条目属性保存在 SQLite 中，重新打开时复用。"""
+import marshal
+import os
+import platform
+import sqlite3
+import threading
+import time
+
+
+def default_cache_path():
+    """按操作系统惯例返回用户缓存目录下的缓存文件路径。"""
+    if platform.system() == "Windows":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+        return os.path.join(base, "FileTreeVisualizer", "scan-cache.sqlite3")
+    if platform.system() == "Darwin":
+        return os.path.expanduser("~/Library/Caches/FileTreeVisualizer/scan-cache.sqlite3")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "filetree-visualizer", "scan-cache.sqlite3")
+
+
+class ScanCache:
+    """以目录路径为键的列表缓存。
+
+    只有目录的修改时间（纳秒）、inode 和设备号都与缓存一致时才复用缓存的条目，
+    因此一个未变化的目录只需一次 stat。目录修改时间不会因子文件内容改变而变化，
+    所以缓存中的文件大小和修改时间可能过时，需要准确结果时应跳过缓存重新扫描。
+    缓存总大小超过上限时，按最近使用时间淘汰（跨所有根目录）。
+
+    打开之后读写数据库失败（被锁定、磁盘已满、文件损坏）时把异常记在 error 中，之后
+    lookup 总是返回 None、写入被丢弃，扫描照常直接读取目录。
+    """
+    MAX_BYTES = 256 * 1024 * 1024
+    FLUSH_BATCH = 500  # 累积多少条写入后提交一次
+    RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000  # 刚修改过的目录不缓存，避免同一时间粒度内的变化被漏掉
+    FORMAT = 3  # 条目格式的版本，改变后旧版本写入的缓存整体丢弃
+
+    def __init__(self, path=None, max_bytes=MAX_BYTES):
+        self.path = path or default_cache_path()
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # 扫描线程和界面线程都会访问，由 lock 串行化
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != self.FORMAT:
+            self.conn.execute("DROP TABLE IF EXISTS dirs")
+            self.conn.execute(f"PRAGMA user_version = {self.FORMAT}")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                path BLOB PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                ino INTEGER NOT NULL,
+                dev INTEGER NOT NULL,
+                rows BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS dirs_last_used ON dirs (last_used)")
+        self.conn.commit()
+        self.pending = []  # 待写入的目录
+        self.touched = []  # 命中的目录，提交时更新最近使用时间
+        self.written_since_evict = 0
+        self.error = None  # 读写失败时的 sqlite3.Error，此后不再访问数据库
+
+    def _fail(self, error):
+        """记录读写失败并丢弃未提交的内容（调用方持有 lock）。"""
+        self.error = error
+        self.pending = []
+        self.touched = []
+
+    @staticmethod
+    def _key(directory, variant):
+        """缓存键：目录路径，加上区分不同忽略规则的后缀。"""
+        key = os.fsencode(directory)
+        return key + b"\0" + variant if variant else key
+
+    def lookup(self, directory, stats, variant=b""):
+        """目录未变化时返回缓存的条目列表，否则返回 None。"""
+        key = self._key(directory, variant)
+        with self.lock:
+            if self.error is not None:
+                return None
+            try:
+                row = self.conn.execute(
+                    "SELECT mtime_ns, ino, dev, rows FROM dirs WHERE path = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                self._fail(e)
+                return None
+            if row is None or tuple(row[:3]) != (stats.st_mtime_ns, stats.st_ino, stats.st_dev):
+                return None
+            self.touched.append(key)
+        try:
+            return marshal.loads(row[3])
+        except (ValueError, EOFError, TypeError):
+            return None
+
+    def store(self, directory, stats, rows, variant=b""):
+        """记录目录的最新列表，累积到一定数量后批量提交。"""
+        if self.error is not None or time.time_ns() - stats.st_mtime_ns < self.RACY_WINDOW_NS:
+            return
+        data = marshal.dumps(rows)
+        with self.lock:
+            self.pending.append((self._key(directory, variant), stats.st_mtime_ns, stats.st_ino,
+                                 stats.st_dev, data, len(data), time.time()))
+            if len(self.pending) < self.FLUSH_BATCH:
+                return
+        self.flush()
+
+    def flush(self):
+        """提交累积的写入和使用时间，必要时淘汰旧条目。"""
+        with self.lock:
+            if self.error is not None:
+                return
+            now = time.time()
+            try:
+                if self.pending:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, ?, ?)", self.pending)
+                    self.written_since_evict += sum(entry[5] for entry in self.pending)
+                if self.touched:
+                    self.conn.executemany(
+                        "UPDATE dirs SET last_used = ? WHERE path = ?", [(now, key) for key in self.touched])
+                self.pending = []
+                self.touched = []
+                self.conn.commit()
+                if self.written_since_evict > self.max_bytes // 16:
+                    self._evict()
+            except sqlite3.Error as e:
+                self._fail(e)
+
+    def _evict(self):
+        """按最近使用时间删除旧条目，直到总大小不超过上限（调用方持有 lock）。"""
+        self.written_since_evict = 0
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM dirs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims = []
+        for key, size in self.conn.execute("SELECT path, size FROM dirs ORDER BY last_used"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self.conn.executemany("DELETE FROM dirs WHERE path = ?", victims)
+        self.conn.commit()
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            try:
+                if self.error is None:
+                    self._evict()
+                self.conn.close()
+            except sqlite3.Error as e:
+                self._fail(e)
@@ -0,0 +1,188 @@
+"""命令行模式：不启动界面，直接把目录树输出到标准输出。
+
+只依赖标准库，不导入 PySide6 和 pyperclip，适合在 CI、SSH 会话和脚本中使用。
+文本和路径格式边读取边输出；JSON、NDJSON 和 CSV 格式需要文件夹的汇总大小，
+先扫描成紧凑的快照，再以与界面导出相同的方式流式写出。--snapshot 把扫描结果保存为
+快照文件，--diff 对比两份快照（或快照与当前的文件夹）并逐行输出变化。
+"""
+import argparse
+import os
+import sys
+
+from filetree.ignore import IgnoreRules
+from filetree.scanner import KIND_DIR, KIND_MORE, ScanTree, iter_entries, walk
+from filetree.text_tree import iter_text_lines
+
+# 与 filetree.export.FORMATS 相同。导出和快照模块只在对应的选项中导入，
+# 普通的文本目录树输出不必为它们付出启动时间
+FORMATS = ("json", "ndjson", "csv")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="file-tree-visualizer",
+        description="生成 ├──/└── 风格的文本目录树，不启动图形界面。")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--text", metavar="PATH",
+                        help="要输出的文件夹")
+    target.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"),
+                        help="对比两份快照并逐行输出变化，有变化时退出码为 1；"
+                             "OLD、NEW 也可以是文件夹，按下列选项重新扫描")
+    parser.add_argument("-d", "--max-depth", type=int, default=None, metavar="N",
+                        help="最多展开的层数，默认不限制")
+    parser.add_argument("-l", "--dir-limit", type=int, default=None, metavar="N",
+                        help="每个文件夹最多输出的条目数，其余显示为 \"… 还有 N 项\"")
+    parser.add_argument("-a", "--all", action="store_true", dest="show_hidden",
+                        help="包含以 . 开头的隐藏文件和文件夹")
+    parser.add_argument("-I", "--exclude", action="append", default=[], metavar="PATTERN",
+                        help="排除匹配的文件和文件夹，语法同 .gitignore，可重复使用")
+    parser.add_argument("--gitignore", action="store_true",
+                        help="遵循各级目录中的 .gitignore，并忽略 .git 文件夹")
+    parser.add_argument("-x", "--one-file-system", action="store_true", dest="one_filesystem",
+                        help="不进入其他文件系统的挂载点（如 /proc 和网络磁盘）")
+    parser.add_argument("-j", "--jobs", type=int, default=1, metavar="N",
+                        help="同时读取目录的线程数，网络文件夹上可设为 8 或更高，默认 1")
+    parser.add_argument("-f", "--format", choices=("tree", "paths") + FORMATS, default="tree",
+                        help="输出格式：tree 为文本目录树（默认），paths 为每行一个相对路径，"
+                             "json、ndjson、csv 为包含类型、大小、修改时间和错误信息的结构化数据")
+    parser.add_argument("--snapshot", metavar="FILE",
+                        help="把 --text 的扫描结果保存为快照文件，供 --diff 或界面中的“对比快照”使用，"
+                             "不输出目录树")
+    return parser
+
+
+def iter_path_lines(entries):
+    """每行输出一个相对路径，文件夹以路径分隔符结尾；无法读取的目录提示写到标准错误。"""
+    for _, _, rel_path, kind, _, _, error in entries:
+        if kind is None:
+            print(f"{rel_path or '.'}: {error[0]} ({error[1]})", file=sys.stderr)
+        elif kind == KIND_MORE:
+            continue
+        elif kind == KIND_DIR:
+            yield rel_path + os.sep
+        else:
+            yield rel_path
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.max_depth is not None and args.max_depth < 0:
+        parser.error("--max-depth 不能为负数")
+    if args.dir_limit is not None and args.dir_limit < 1:
+        parser.error("--dir-limit 至少为 1")
+    if args.jobs < 1:
+        parser.error("--jobs 至少为 1")
+
+    try:
+        ignore = IgnoreRules(args.exclude, args.gitignore)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.diff:
+        if args.snapshot:
+            parser.error("--snapshot 只能与 --text 一起使用")
+        for operand in args.diff:
+            if not os.path.exists(operand):
+                parser.error(f"找不到快照或文件夹: {operand}")
+        sys.stdout.reconfigure(errors="replace" if os.name == "nt" else "surrogateescape")
+        return _output(lambda: diff_operands(args.diff, args, ignore or None))
+
+    root_path = os.path.abspath(args.text)
+    if not os.path.isdir(root_path):
+        parser.error(f"不是有效的文件夹: {args.text}")
+
+    # 无法按终端编码输出的文件名原样写出（Windows 控制台上替换为 ?）
+    errors = "replace" if os.name == "nt" else "surrogateescape"
+    if args.snapshot:
+        from filetree.snapshot import Snapshot
+        return _output(lambda: Snapshot.from_tree(scan_tree(root_path, args, ignore or None)).save(args.snapshot))
+    if args.format in FORMATS:
+        # 结构化数据始终以 UTF-8 和 \n 换行输出，不随终端设置变化
+        sys.stdout.reconfigure(encoding="utf-8", errors=errors, newline="")
+        return _output(lambda: export_snapshot(root_path, args, ignore or None))
+    sys.stdout.reconfigure(errors=errors)
+
+    entries = iter_entries(root_path, args.max_depth, args.show_hidden, args.jobs, ignore or None,
+                           args.dir_limit, args.one_filesystem)
+    if args.format == "tree":
+        root_name = os.path.basename(root_path) or root_path
+        lines = iter_text_lines(root_name, entries)
+    else:
+        lines = iter_path_lines(entries)
+
+    def write_lines():
+        write = sys.stdout.write
+        for line in lines:
+            write(line)
+            write("\n")
+
+    return _output(write_lines)
+
+
+def scan_tree(root_path, args, ignore=None):
+    """按命令行选项扫描为快照，无法读取的目录提示写到标准错误。"""
+    tree = ScanTree(root_path)
+    tree.ignore = ignore
+    tree.show_hidden = args.show_hidden
+    tree.max_depth = args.max_depth
+    tree.max_children = args.dir_limit
+    tree.one_filesystem = args.one_filesystem
+    walk(tree, workers=args.jobs)
+    for index, (_, detail) in tree.list_errors.items():
+        print(f"{tree.rel_path(index) or '.'}: {detail}", file=sys.stderr)
+    return tree
+
+
+def export_snapshot(root_path, args, ignore=None):
+    """扫描为快照后按结构化格式写到标准输出。"""
+    from filetree.export import write_export
+    write_export(scan_tree(root_path, args, ignore), sys.stdout, args.format)
+
+
+def diff_operands(operands, args, ignore=None):
+    """对比两个快照文件或文件夹，逐行输出变化；返回退出码：0 无变化，1 有变化，2 无法读取快照。"""
+    from filetree.snapshot import Snapshot, diff_snapshots, iter_diff_lines
+    snapshots = []
+    try:
+        for operand in operands:
+            if os.path.isdir(operand):
+                snapshots.append(Snapshot.from_tree(scan_tree(os.path.abspath(operand), args, ignore)))
+                continue
+            try:
+                snapshots.append(Snapshot.load(operand))
+            except (OSError, ValueError) as e:
+                print(f"{operand}: {e}", file=sys.stderr)
+                return 2
+        old, new = snapshots
+        changes = list(diff_snapshots(old, new))
+        write = sys.stdout.write
+        for line in iter_diff_lines(old, new, changes):
+            write(line)
+            write("\n")
+        return 1 if changes else 0
+    finally:
+        for snapshot in snapshots:
+            snapshot.close()
+
+
+def _output(produce):
+    """运行 produce 向标准输出写入，处理中断和管道被提前关闭的情况，返回退出码。
+
+    produce 返回的整数作为退出码，返回 None 时为 0。
+    """
+    try:
+        status = produce()
+        sys.stdout.flush()
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        # 输出被 head 等命令提前关闭时安静退出
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+    return status or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""树视图按名称排序的规则：自然排序，名称中连续的数字按数值比较（file2 排在 file10 之前）。
+
+文字部分忽略大小写和全角半角的差别。默认按 Unicode 码位比较，汉字因此按部首笔画、
+假名按五十音、谚文按字母顺序排列；调用 use_system_collation() 后改用系统区域设置的
+排序规则，例如简体中文环境下汉字按拼音排列。扫描快照本身仍按小写名称排序，文本输出不受影响。
+"""
+import locale
+import re
+import unicodedata
+from array import array
+
+from filetree.scanner import KIND_DIR
+
+_DIGITS = re.compile(r"(\d+)")
+_transform = None  # 区域设置的文字变换（locale.strxfrm），按码位比较时为 None
+
+
+def use_system_collation():
+    """按用户环境设置 LC_COLLATE，之后的 sort_key 按系统规则比较文字。
+
+    返回生效的区域设置名称；系统不支持时保持按码位比较并返回 None。
+    """
+    global _transform
+    try:
+        name = locale.setlocale(locale.LC_COLLATE, "")
+    except locale.Error:
+        return None
+    _transform = None if name.split(".")[0] in ("C", "POSIX") else locale.strxfrm
+    return name
+
+
+def sort_key(name):
+    """名称的排序键。文字段和数字段交替排列，比较时类型总是对应；规则下相同的名称再按原名称区分。"""
+    text = name.casefold() if name.isascii() else unicodedata.normalize("NFKC", name).casefold()
+    parts = _DIGITS.split(text)
+    if _transform is not None:
+        parts[::2] = map(_transform, parts[::2])
+    if len(parts) > 1:
+        parts[1::2] = map(int, parts[1::2])
+    return tuple(parts), name
+
+
+def natural_order(tree, node):
+    """目录 node 的子节点按 sort_key 排列的 array，文件夹在前；与扫描顺序相同时返回 None。"""
+    children = tree.children(node)
+    first = children.start
+    dir_end = first + dir_count(tree, node)
+    name = tree.name
+    order = array("i")
+    for group in (range(first, dir_end), range(dir_end, children.stop)):
+        keys = [sort_key(name(child)) for child in group]
+        order.extend(sorted(group, key=lambda child: keys[child - group.start]))
+    if order == array("i", children):
+        return None
+    return order
+
+
+def dir_count(tree, node):
+    """目录 node 的子文件夹数。扫描快照中子文件夹总是排在文件之前。"""
+    children = tree.children(node)
+    kinds = tree.kinds
+    end = children.start
+    while end < children.stop and kinds[end] == KIND_DIR:
+        end += 1
+    return end - children.start
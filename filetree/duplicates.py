@@ -0,0 +1,189 @@
+"""查找重复文件：在扫描快照上按大小分组，逐步排除内容不同的文件，只对可能重复的文件计算完整哈希。
+
+分三步进行：
+
+    1. 按快照中记录的大小分组，大小唯一的文件不可能重复，不读取
+    2. 读取同大小文件开头和结尾各 SAMPLE_BYTES 字节计算哈希，不超过两倍的小文件此时已读完
+    3. 对仍然相同的文件计算完整内容的哈希，大文件映射到内存后分段计算
+
+读取在线程池中进行：hashlib 计算较大的数据块时释放 GIL，多个文件可以同时读取和计算。
+同一文件的其他硬链接（ScanTree.shared）不算作重复；无法读取的文件单独列出。
+"""
+import hashlib
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from filetree.formatting import format_size
+from filetree.scanner import KIND_DIR, KIND_FILE
+
+SAMPLE_BYTES = 4096  # 第二步在文件开头和结尾各读取的字节数
+CHUNK_BYTES = 1 << 20  # 普通读取时每次读取的字节数
+MMAP_MIN_BYTES = 16 << 20  # 不小于此大小的文件映射到内存后计算哈希
+MMAP_STEP = 64 << 20  # 映射的文件每次交给哈希函数的字节数，其间检查是否取消
+
+
+class Cancelled(Exception):
+    """查找被中途取消。"""
+
+
+def _hasher():
+    return hashlib.blake2b(digest_size=20)
+
+
+def _sample_digest(path, size):
+    """开头和结尾各 SAMPLE_BYTES 字节的哈希；文件大小与快照不一致时抛出 OSError。"""
+    h = _hasher()
+    with open(path, "rb") as f:
+        if size <= 2 * SAMPLE_BYTES:
+            data = f.read(size + 1)
+            if len(data) != size:
+                raise OSError(f"文件大小已改变: {path}")
+            h.update(data)
+            return h.digest()
+        h.update(f.read(SAMPLE_BYTES))
+        f.seek(size - SAMPLE_BYTES)
+        data = f.read(SAMPLE_BYTES + 1)
+        if len(data) != SAMPLE_BYTES:
+            raise OSError(f"文件大小已改变: {path}")
+        h.update(data)
+    return h.digest()
+
+
+def _full_digest(path, size, is_cancelled=None):
+    """完整内容的哈希；大文件映射到内存，避免逐块复制到 Python 字节串。"""
+    h = _hasher()
+    read = 0
+    with open(path, "rb") as f:
+        if size >= MMAP_MIN_BYTES:
+            if os.fstat(f.fileno()).st_size != size:
+                raise OSError(f"文件大小已改变: {path}")  # 也避免映射已被清空的文件
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m, memoryview(m) as view:
+                read = len(view)
+                for start in range(0, read, MMAP_STEP):
+                    if is_cancelled is not None and is_cancelled():
+                        raise Cancelled
+                    h.update(view[start:start + MMAP_STEP])
+        else:
+            while True:
+                chunk = f.read(CHUNK_BYTES)
+                if not chunk:
+                    break
+                read += len(chunk)
+                h.update(chunk)
+    if read != size:
+        raise OSError(f"文件大小已改变: {path}")
+    return h.digest()
+
+
+def _size_groups(tree, min_size):
+    """按大小把可达的文件分组，只保留至少两个文件的组：{大小: [节点, ...]}。"""
+    groups = {}
+    kinds = tree.kinds
+    sizes = tree.sizes
+    errors = tree.errors
+    shared = tree.shared
+    pending = [0]
+    while pending:
+        for child in tree.children(pending.pop()):
+            if kinds[child] == KIND_DIR:
+                pending.append(child)
+            elif kinds[child] == KIND_FILE and child not in errors and child not in shared:
+                size = sizes[child]
+                if size >= min_size:
+                    groups.setdefault(size, []).append(child)
+    return {size: nodes for size, nodes in groups.items() if len(nodes) > 1}
+
+
+def find_duplicates(tree, min_size=1, workers=4, is_cancelled=None, progress=None):
+    """查找内容相同的文件，返回 (分组, 无法读取的文件)。
+
+    分组为 [(文件大小, [完整路径, ...]), ...]，按可释放的字节数从大到小排列，组内按路径排序；
+    无法读取的文件为 [(完整路径, 错误信息), ...]。结果只包含路径，快照之后发生变化也不受影响。
+    小于 min_size 字节的文件不参与比较。
+    progress(阶段说明, 已完成, 总数) 在调用线程中定期调用；is_cancelled() 返回真时
+    尽快停止并抛出 Cancelled。
+    """
+    def check():
+        if is_cancelled is not None and is_cancelled():
+            raise Cancelled
+
+    unreadable = []
+    candidates = [(size, nodes) for size, nodes in _size_groups(tree, min_size).items()]
+    check()
+
+    def run(pool, label, digest, groups):
+        """在线程池中对 groups 中的每个文件计算 digest，按 (大小, 哈希) 重新分组。"""
+        jobs = [(size, node) for size, nodes in groups for node in nodes]
+
+        def job(item):
+            size, node = item
+            if is_cancelled is not None and is_cancelled():
+                return None
+            try:
+                return digest(tree.path(node), size)
+            except OSError as e:
+                return e
+
+        result = {}
+        for i, ((size, node), value) in enumerate(zip(jobs, pool.map(job, jobs, chunksize=16))):
+            if value is None:
+                raise Cancelled
+            if isinstance(value, OSError):
+                unreadable.append((tree.path(node), str(value)))
+                continue
+            result.setdefault((size, value), []).append(node)
+            if progress is not None and i % 256 == 0:
+                progress(label, i, len(jobs))
+        return [(size, nodes) for (size, _), nodes in result.items() if len(nodes) > 1]
+
+    def full(path, size):
+        return _full_digest(path, size, is_cancelled)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hash") as pool:
+        try:
+            candidates = run(pool, "比较文件开头和结尾", _sample_digest, candidates)
+            # 不超过两倍 SAMPLE_BYTES 的文件在上一步已经完整读取
+            done = [group for group in candidates if group[0] <= 2 * SAMPLE_BYTES]
+            large = [group for group in candidates if group[0] > 2 * SAMPLE_BYTES]
+            done += run(pool, "计算完整内容的哈希", full, large)
+        except Cancelled:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+
+    groups = [(size, sorted(map(tree.path, nodes))) for size, nodes in done]
+    groups.sort(key=lambda group: (-group[0] * (len(group[1]) - 1), group[1][0]))
+    return groups, unreadable
+
+
+def reclaimable_bytes(groups):
+    """每组只保留一个文件时可以释放的字节数。"""
+    return sum(size * (len(paths) - 1) for size, paths in groups)
+
+
+def summary_text(groups):
+    """一行汇总，例如 "12 组重复文件，共 30 个文件，可释放 1.2 GB"。"""
+    if not groups:
+        return "没有找到重复文件"
+    files = sum(len(paths) for _, paths in groups)
+    return f"{len(groups)} 组重复文件，共 {files} 个文件，可释放 {format_size(reclaimable_bytes(groups))}"
+
+
+def group_label(size, paths):
+    """一组重复文件的标题，例如 "3 个文件，每个 1.2 MB"。"""
+    return f"{len(paths)} 个文件，每个 {format_size(size)}"
+
+
+def iter_duplicate_lines(groups, unreadable=()):
+    """逐行生成查找结果的文本：汇总行，每组一个标题和各文件的完整路径，最后是无法读取的文件。"""
+    yield summary_text(groups)
+    for number, (size, paths) in enumerate(groups, 1):
+        yield ""
+        yield f"[{number}] {group_label(size, paths)}，可释放 {format_size(size * (len(paths) - 1))}"
+        for path in paths:
+            yield f"    {path}"
+    if unreadable:
+        yield ""
+        yield f"无法读取的文件: {len(unreadable)} 个"
+        for path, error in unreadable:
+            yield f"    {path}: {error}"
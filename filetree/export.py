@@ -0,0 +1,117 @@
+"""结构化导出：把扫描快照写成嵌套 JSON、NDJSON（每行一个 JSON 对象）或 CSV。
+
+直接遍历快照中的数组，边遍历边写入，不重新访问文件系统，内存占用只与目录深度有关。
+每个条目包含以下字段：
+
+    path    相对于根目录、以 / 分隔的路径，根目录为 "."（嵌套 JSON 中为 name）
+    type    "dir" 或 "file"
+    size    文件大小（字节）；文件夹为其下所有已读取文件的总大小
+    mtime   修改时间，Unix 时间戳（秒）
+    error   无法读取时的错误信息，否则为空
+
+文件夹另有 files（其下的文件总数）、listed（内容是否已读取）和 omitted（因数量上限
+未读取的条目数）。嵌套 JSON 中已读取文件夹的子项放在 children 数组中。
+"""
+import csv
+import json
+
+from filetree.scanner import KIND_DIR
+
+FORMATS = ("json", "ndjson", "csv")
+FIELDS = ("path", "type", "size", "mtime", "error")
+DIR_FIELDS = ("files", "listed", "omitted")
+
+_encode = json.encoder.encode_basestring  # 与 json.dumps(..., ensure_ascii=False) 相同的字符串编码
+
+
+def _json_fields(tree, index):
+    """path/name 之外的字段，直接拼成 JSON 片段，比逐条构造字典再调用 json.dumps 快一倍以上。"""
+    error = tree.errors.get(index) or tree.list_errors.get(index)
+    error = "null" if error is None else _encode(error[1])
+    if tree.kinds[index] != KIND_DIR:
+        return f'"type": "file", "size": {tree.sizes[index]}, "mtime": {tree.mtimes[index]!r}, "error": {error}'
+    listed = "true" if tree.first_child[index] >= 0 else "false"
+    return (f'"type": "dir", "size": {tree.sizes[index]}, "mtime": {tree.mtimes[index]!r}, "error": {error}, '
+            f'"files": {tree.file_counts[index]}, "listed": {listed}, "omitted": {tree.omitted.get(index, 0)}')
+
+
+def iter_nodes(tree):
+    """按深度优先顺序（与文本目录树相同）逐个生成 (节点, 相对路径)，根目录在最前，路径为 "."。"""
+    yield 0, "."
+    stack = [("", iter(tree.children(0)))]
+    while stack:
+        prefix, children = stack[-1]
+        for child in children:
+            path = prefix + tree.name(child)
+            yield child, path
+            if tree.first_child[child] >= 0:
+                stack.append((path + "/", iter(tree.children(child))))
+                break
+        else:
+            stack.pop()
+
+
+def write_ndjson(tree, f):
+    """每行写一个 JSON 对象。"""
+    write = f.write
+    for index, path in iter_nodes(tree):
+        write(f'{{"path": {_encode(path)}, {_json_fields(tree, index)}}}\n')
+
+
+def write_csv(tree, f):
+    """写出带表头的 CSV；文件行的文件夹专用列留空。f 应以 newline="" 打开。"""
+    writer = csv.writer(f, lineterminator="\n")
+    writer.writerow(FIELDS + DIR_FIELDS)
+    errors = tree.errors
+    list_errors = tree.list_errors
+    for index, path in iter_nodes(tree):
+        error = errors.get(index) or list_errors.get(index)
+        row = [path, "file", tree.sizes[index], tree.mtimes[index], error[1] if error is not None else ""]
+        if tree.kinds[index] == KIND_DIR:
+            row[1] = "dir"
+            row += [tree.file_counts[index], "true" if tree.first_child[index] >= 0 else "false",
+                    tree.omitted.get(index, 0)]
+        else:
+            row += ["", "", ""]
+        writer.writerow(row)
+
+
+def write_json(tree, f):
+    """写出一个嵌套的 JSON 对象：根目录为顶层对象，子项位于 children 中。"""
+    write = f.write
+    stack = []  # [子节点迭代器, 是否尚未写出任何子项]
+
+    def begin(index):
+        head = f'{{"name": {_encode(tree.name(index))}, {_json_fields(tree, index)}'
+        if tree.first_child[index] >= 0:
+            # 子项写完后再闭合对象
+            write(head + ', "children": [')
+            stack.append([iter(tree.children(index)), True])
+        else:
+            write(head + "}")
+
+    begin(0)
+    while stack:
+        top = stack[-1]
+        child = next(top[0], None)
+        if child is None:
+            write("]}")
+            stack.pop()
+            continue
+        if not top[1]:
+            write(", ")
+        top[1] = False
+        begin(child)
+    write("\n")
+
+
+def write_export(tree, f, fmt):
+    """按 fmt（FORMATS 之一）把快照写入文本文件对象 f。"""
+    if fmt == "json":
+        write_json(tree, f)
+    elif fmt == "ndjson":
+        write_ndjson(tree, f)
+    elif fmt == "csv":
+        write_csv(tree, f)
+    else:
+        raise ValueError(f"未知的导出格式: {fmt}")
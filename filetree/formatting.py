@@ -0,0 +1,83 @@
+"""树视图各列的显示文本：文件类型、修改时间和大小。
+
+这些函数在绘制每一行时被调用，因此扩展名表只建立一次，类型按扩展名缓存，修改时间
+按分钟缓存日期前缀，避免每行都创建 datetime 对象和查表字典。
+"""
+import math
+import time
+from functools import lru_cache
+
+FILE_TYPES = {
+    '.txt': "文本文件", '.md': "Markdown文件", '.log': "日志文件",
+    '.py': "Python文件", '.js': "JavaScript文件", '.html': "HTML文件",
+    '.css': "CSS文件", '.java': "Java文件", '.c': "C文件",
+    '.cpp': "C++文件", '.h': "头文件", '.hpp': "C++头文件",
+    '.jpg': "JPEG图像", '.jpeg': "JPEG图像", '.png': "PNG图像",
+    '.gif': "GIF图像", '.bmp': "BMP图像", '.tiff': "TIFF图像",
+    '.svg': "SVG矢量图", '.webp': "WebP图像",
+    '.mp3': "MP3音频", '.wav': "WAV音频", '.ogg': "OGG音频",
+    '.flac': "FLAC音频", '.aac': "AAC音频", '.wma': "WMA音频",
+    '.mp4': "MP4视频", '.avi': "AVI视频", '.mov': "MOV视频",
+    '.mkv': "MKV视频", '.wmv': "WMV视频", '.webm': "WebM视频",
+    '.pdf': "PDF文档", '.doc': "Word文档", '.docx': "Word文档",
+    '.xls': "Excel表格", '.xlsx': "Excel表格", '.csv': "CSV表格",
+    '.ppt': "PowerPoint演示", '.pptx': "PowerPoint演示",
+    '.zip': "ZIP压缩包", '.rar': "RAR压缩包", '.7z': "7Z压缩包",
+    '.tar': "TAR归档", '.gz': "GZ压缩包", '.bz2': "BZ2压缩包",
+    '.exe': "可执行程序", '.msi': "安装程序", '.bat': "批处理脚本",
+    '.sh': "Shell脚本", '.json': "JSON文件", '.xml': "XML文件",
+    '.yaml': "YAML文件", '.sql': "SQL脚本", '.db': "数据库文件",
+    '.ini': "配置文件", '.cfg': "配置文件", '.conf': "配置文件",
+    '.dll': "动态链接库", '.so': "共享库", '.dylib': "动态库"
+}
+DEFAULT_FILE_TYPE = "文件"
+
+
+@lru_cache(maxsize=4096)
+def _type_of_extension(ext):
+    return FILE_TYPES.get(ext.lower(), DEFAULT_FILE_TYPE)
+
+
+def file_type(filename):
+    """获取文件类型描述。"""
+    # 与 os.path.splitext 相同：开头的点不算扩展名（如 .bashrc），但省去通用路径处理
+    dot = filename.rfind(".")
+    if dot <= 0 or not filename[:dot].strip("."):
+        return DEFAULT_FILE_TYPE
+    return _type_of_extension(filename[dot:])
+
+
+def format_size(size_bytes):
+    """将文件大小格式化为易读的字符串。"""
+    if size_bytes < 1024:
+        return f"{size_bytes} B"
+    elif size_bytes < 1024 * 1024:
+        return f"{size_bytes / 1024:.1f} KB"
+    elif size_bytes < 1024 * 1024 * 1024:
+        return f"{size_bytes / (1024 * 1024):.1f} MB"
+    else:
+        return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
+
+
+_SECONDS = ["%02d" % second for second in range(60)]
+
+
+@lru_cache(maxsize=65536)
+def _minute_prefix(minute):
+    """某一分钟的本地时间前缀 "YYYY-MM-DD HH:MM:"；时区偏移不是整分钟时返回 None。"""
+    local = time.localtime(minute * 60)
+    if local.tm_sec:
+        return None  # 少数历史时区的偏移带有秒数，改为逐个格式化
+    return "%04d-%02d-%02d %02d:%02d:" % local[:5]
+
+
+def format_mtime(timestamp):
+    """把修改时间格式化为本地时间的 YYYY-MM-DD HH:MM:SS。
+
+    日期到分钟的部分按分钟缓存，同一批写入的文件只需拼接秒数。
+    """
+    minute, second = divmod(math.floor(timestamp), 60)
+    prefix = _minute_prefix(minute)
+    if prefix is None:
+        return "%04d-%02d-%02d %02d:%02d:%02d" % time.localtime(minute * 60 + second)[:6]
+    return prefix + _SECONDS[second]
@@ -0,0 +1,180 @@
+"""忽略规则：用户指定的排除模式和 .gitignore，编译为正则表达式后在扫描时逐项匹配。
+
+模式语法与 .gitignore 相同：* ? [...] 不跨越 /，** 可匹配多层目录，以 / 结尾只匹配文件夹，
+以 ! 开头重新包含，含有 / 的模式相对于规则所在目录匹配，否则匹配任意层级的名称。
+被排除的文件夹不会被读取，其下的整个子树不产生任何系统调用。
+"""
+import hashlib
+import os
+import re
+
+_FLAGS = re.IGNORECASE if os.name == "nt" else 0  # Windows 文件名不区分大小写
+
+
+def _glob_to_regex(pattern):
+    """把一个 gitignore 风格的通配符转换为正则表达式（不含首尾锚点）。"""
+    out = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i):
+                i += 2
+                if i < n and pattern[i] == "/":
+                    out.append("(?:.*/)?")  # **/ 匹配零层或多层目录
+                    i += 1
+                else:
+                    out.append(".*")
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2 if pattern.startswith(("[!", "[^"), i) else i + 1)
+            if end < 0 or end == i + 1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+class RuleSet:
+    """一组按顺序排列的规则，来自用户设置或某个 .gitignore 文件，后出现的规则优先。
+
+    strict 为真时遇到无法解析的模式抛出 ValueError，否则像 git 一样跳过该行。
+    """
+
+    def __init__(self, lines, strict=False):
+        self.rules = []  # (正则表达式, 是否为 ! 规则, 是否只匹配文件夹)
+        for line in lines:
+            line = line.rstrip("\r\n")
+            if line.endswith("\\ "):
+                line = line[:-2].rstrip() + "\\ "
+            else:
+                line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            anchored = "/" in line
+            regex = _glob_to_regex(line.lstrip("/"))
+            if not anchored:
+                regex = "(?:.*/)?" + regex
+            try:
+                re.compile(regex)
+            except re.error as e:
+                if strict:
+                    raise ValueError(f"无效的模式 {line!r}: {e}") from None
+                continue
+            self.rules.append((regex, negate, dir_only))
+
+        self.digest = hashlib.sha1(repr(self.rules).encode("utf-8")).digest()[:8]
+        self.has_negation = any(negate for _, negate, _ in self.rules)
+        if not self.has_negation:
+            # 没有 ! 规则时只需知道是否有任意一条命中，合并为一个正则
+            self.dir_regex = self._combine(self.rules)
+            self.file_regex = self._combine([rule for rule in self.rules if not rule[2]])
+        else:
+            self.compiled = [(re.compile(regex, _FLAGS), negate, dir_only)
+                             for regex, negate, dir_only in reversed(self.rules)]
+
+    @staticmethod
+    def _combine(rules):
+        if not rules:
+            return None
+        return re.compile("|".join(f"(?:{regex})" for regex, _, _ in rules), _FLAGS)
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def match(self, path, is_dir):
+        """判断相对于规则所在目录的路径：排除返回 True，重新包含返回 False，未命中返回 None。"""
+        if not self.has_negation:
+            regex = self.dir_regex if is_dir else self.file_regex
+            return True if regex is not None and regex.fullmatch(path) else None
+        for regex, negate, dir_only in self.compiled:
+            if (is_dir or not dir_only) and regex.fullmatch(path):
+                return not negate
+        return None
+
+
+class IgnoreRules:
+    """扫描使用的忽略规则：用户指定的模式，加上可选的各级 .gitignore。
+
+    用户模式优先于 .gitignore，较深目录中的 .gitignore 优先于上层的。开启 .gitignore
+    时同时忽略 .git 文件夹。各目录的 .gitignore 在读取该目录时加载，可在多个扫描线程中共用。
+    """
+
+    def __init__(self, patterns=(), use_gitignore=False):
+        """patterns 中有无法解析的模式时抛出 ValueError。"""
+        self.patterns = [p for p in patterns if p.strip()]
+        self.use_gitignore = use_gitignore
+        lines = list(self.patterns)
+        if use_gitignore:
+            lines.insert(0, ".git/")
+        self.user_rules = RuleSet(lines, strict=True)
+        self.gitignores = {}  # 相对目录（以 / 分隔，根目录为 ""）-> RuleSet
+
+    def __bool__(self):
+        return bool(self.user_rules) or self.use_gitignore
+
+    def matcher(self, directory, rel_dir):
+        """返回判断 directory 中条目是否被排除的 DirectoryMatcher，没有任何规则时返回 None。
+
+        rel_dir 为该目录相对于扫描根目录的路径，以 / 分隔。
+        """
+        chain = []
+        if self.user_rules:
+            chain.append((self.user_rules, rel_dir + "/" if rel_dir else ""))
+        if self.use_gitignore:
+            self._load_gitignore(directory, rel_dir)
+            parts = rel_dir.split("/") if rel_dir else []
+            for depth in range(len(parts), -1, -1):
+                rules = self.gitignores.get("/".join(parts[:depth]))
+                if rules:
+                    rest = "/".join(parts[depth:])
+                    chain.append((rules, rest + "/" if rest else ""))
+        if not chain:
+            return None
+        return DirectoryMatcher(chain)
+
+    def _load_gitignore(self, directory, rel_dir):
+        try:
+            with open(os.path.join(directory, ".gitignore"), encoding="utf-8",
+                      errors="surrogateescape") as f:
+                self.gitignores[rel_dir] = RuleSet(f)
+        except OSError:
+            self.gitignores.pop(rel_dir, None)
+
+
+class DirectoryMatcher:
+    """某个目录适用的全部规则，按优先级从高到低排列。"""
+
+    def __init__(self, chain):
+        self.chain = chain  # [(RuleSet, 该目录相对于规则所在目录的前缀)]
+        # 用于区分不同规则下的缓存结果
+        self.key = b"".join(rules.digest for rules, _ in chain)
+
+    def __call__(self, name, is_dir):
+        """条目是否被排除。"""
+        for rules, prefix in self.chain:
+            result = rules.match(prefix + name, is_dir)
+            if result is not None:
+                return result
+        return False
@@ -0,0 +1,155 @@
+"""扫描诊断：统计一次打开文件夹过程中各阶段的耗时和系统调用次数，以及可选的 cProfile 分析。
+
+默认关闭。开启后在 ScanTree.stats 上挂一个 ScanStats，扫描线程和界面线程把计数和耗时
+累加到同一个对象上；关闭时各处只多一次 None 判断，不会逐条目计时。
+"""
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+# 计数项 -> 显示名称，按显示顺序排列
+COUNTERS = {
+    "dirs_listed": "读取的目录",
+    "cache_hits": "命中缓存的目录",
+    "stats": "stat 调用",
+    "stat_errors": "无法读取属性的条目",
+    "list_errors": "无法读取的目录",
+    "entries": "创建的条目",
+    "icons": "渲染的图标",
+}
+# 阶段 -> 显示名称。扫描线程中的阶段为各线程耗时之和，多线程扫描时可能超过总耗时
+PHASES = {
+    "total": "总耗时",
+    "scan": "扫描（从开始到结束）",
+    "listdir": "列目录（scandir，累计）",
+    "stat": "读取属性（stat，累计）",
+    "cache": "查询和写入缓存（累计）",
+    "insert": "写入快照（累计）",
+    "index": "建立名称索引",
+    "publish": "向树视图添加行",
+    "text": "生成和排版文本输出",
+    "icons": "渲染图标",
+    "treemap": "布局和绘制占用图",
+}
+
+
+class ScanStats:
+    """一次打开文件夹的计数和各阶段耗时，可以在多个线程中同时累加。"""
+
+    def __init__(self, root_path):
+        self.root_path = root_path
+        self.started = time.time()
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.phases = {}  # 阶段 -> 秒
+        self.profile_path = None  # 保存 cProfile 结果的文件
+        self.lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def add_time(self, name, seconds):
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        """把 with 块的耗时累加到阶段 name。"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                "root": self.root_path,
+                "started": self.started,
+                "counts": dict(self.counts),
+                "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+                "profile": self.profile_path,
+            }
+
+    def dump(self, path):
+        """以 JSON 写入文件。"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+    def summary(self):
+        """状态栏中显示的一行摘要。"""
+        counts = self.counts
+        phases = self.phases
+        return (f"目录 {counts['dirs_listed']} · stat {counts['stats']} · "
+                f"错误 {counts['stat_errors'] + counts['list_errors']} · "
+                f"扫描 {phases.get('scan', 0.0):.2f}s · 总计 {phases.get('total', 0.0):.2f}s")
+
+    def report_lines(self):
+        """逐行生成诊断面板中的文字：先列计数，再列各阶段耗时。"""
+        data = self.as_dict()
+        yield f"文件夹: {data['root']}"
+        for name, label in COUNTERS.items():
+            yield f"{label}: {data['counts'].get(name, 0)}"
+        for name, label in PHASES.items():
+            if name in data["phases"]:
+                yield f"{label}: {data['phases'][name]:.3f} 秒"
+        if data["profile"]:
+            yield f"cProfile 结果: {data['profile']}"
+
+
+class Profiler:
+    """在多个线程中运行 cProfile，结束时合并保存为一个 .prof 文件（可用 pstats 或 snakeviz 查看）。
+
+    Python 3.12 之前 cProfile 只记录调用 enable() 的线程，需要分析的线程各自调用一次
+    enable()，并在线程结束前调用 disable()；3.12 起一个分析器即可覆盖所有线程，之后的
+    enable() 不再重复开启。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.profiles = []  # (线程 id, cProfile.Profile)
+        self.lock = threading.Lock()
+
+    def enable(self):
+        """开始分析当前线程。"""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return  # 已有分析器覆盖所有线程
+        with self.lock:
+            self.profiles.append((threading.get_ident(), profile))
+
+    def disable(self):
+        """停止分析当前线程。"""
+        ident = threading.get_ident()
+        with self.lock:
+            for thread, profile in self.profiles:
+                if thread == ident:
+                    profile.disable()
+
+    def save(self):
+        """停止当前线程的分析，合并所有线程的结果写入文件，返回文件路径；没有记录时返回 None。"""
+        self.disable()
+        with self.lock:
+            profiles = [profile for _, profile in self.profiles]
+            self.profiles = []
+        stats = None
+        for profile in profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                continue  # 该线程没有记录到任何调用
+        if stats is None:
+            return None
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        stats.dump_stats(self.path)
+        return self.path
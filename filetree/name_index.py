@@ -0,0 +1,160 @@
+"""名称索引：扫描时把小写的条目名称按节点顺序拼接成一个字符串，筛选时在其上直接运行正则表达式。
+
+搜索由 re 模块在 C 层扫描连续的字符串完成，Python 代码只处理命中的行，每次按键的开销
+取决于命中数而不是条目总数，也不会访问文件系统。
+"""
+import re
+import threading
+from array import array
+from bisect import bisect_right
+
+MODE_SUBSTRING = "substring"  # 名称包含输入的文字
+MODE_GLOB = "glob"  # 通配符匹配整个名称，* 和 ? 不跨越名称
+MODE_REGEX = "regex"  # 正则表达式，^ 和 $ 对应名称的首尾
+
+# 从名称开头匹配的模式以换行符代替 ^ 开头，re 可以按字面前缀快速跳过不可能匹配的位置
+_LINE_START = "\n"
+
+
+def _glob_to_regex(pattern):
+    """把通配符转换为只在一行之内匹配的正则表达式（不含首尾锚点）。"""
+    out = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            out.append("[^\n]*")
+        elif c == "?":
+            out.append("[^\n]")
+        elif c == "[":
+            end = pattern.find("]", i + 2 if pattern.startswith(("[!", "[^"), i) else i + 1)
+            if end < 0:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body[:1] in ("!", "^"):
+                    body = "^\n" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def compile_query(query, mode=MODE_SUBSTRING):
+    """把筛选框中的文字编译为在索引上搜索用的正则表达式，不区分大小写。
+
+    无法解析的正则表达式抛出 ValueError。
+    """
+    if mode == MODE_REGEX:
+        try:
+            re.compile(query)
+        except re.error as e:
+            raise ValueError(f"无效的正则表达式: {e}") from None
+        if query.startswith("^"):
+            query = _LINE_START + query[1:]
+        return re.compile(query, re.IGNORECASE | re.MULTILINE)
+    query = query.lower()
+    if mode == MODE_SUBSTRING:
+        return re.compile(re.escape(query))
+    # 首尾的 * 可以匹配名称的任意前后缀，去掉后不必逐行回溯
+    head = "" if query.startswith("*") else _LINE_START
+    tail = "" if query.endswith("*") else "$"
+    body = _glob_to_regex(query.strip("*"))
+    try:
+        return re.compile(head + body + tail, re.MULTILINE)
+    except re.error as e:
+        raise ValueError(f"无效的通配符: {e}") from None
+
+
+class NameIndex:
+    """扫描快照的名称索引。
+
+    text 的第 i 行是节点 i 的小写名称，line_starts[i] 为该行的起始偏移，末尾多存一项。
+    快照增长后调用 update() 追加新节点，扫描线程和界面线程都可以调用。
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.line_starts = array('Q', [0])
+        self.chunks = []  # 尚未合并的索引文本片段
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.line_starts) - 1
+
+    def update(self):
+        """为快照中尚未建立索引的节点建立索引。"""
+        tree = self.tree
+        with self.lock:
+            start = len(self)
+            end = len(tree)
+            if end <= start:
+                return
+            # 名称中的换行符会破坏按行对应的关系，替换为空格
+            names = [tree.name(i).lower().replace("\n", " ") for i in range(start, end)]
+            starts = self.line_starts
+            pos = starts[-1]
+            for name in names:
+                pos += len(name) + 1
+                starts.append(pos)
+            names.append("")
+            self.chunks.append("\n".join(names))
+
+    def _text(self):
+        with self.lock:
+            if len(self.chunks) > 1:
+                self.chunks = ["".join(self.chunks)]
+            return self.chunks[0] if self.chunks else ""
+
+    def search(self, pattern, limit=None):
+        """返回名称与 pattern 匹配的节点列表（不含根目录）及是否已列出全部匹配。
+
+        最多返回 limit 个节点；结果中可能包含重新读取目录后已不可达的旧节点，由 filter_mask 排除。
+        """
+        text = self._text()
+        starts = self.line_starts
+        search = pattern.search
+        shift = 1 if pattern.pattern.startswith(_LINE_START) else 0  # 匹配从上一行的换行符开始
+        matches = []
+        pos = starts[1] - shift if len(starts) > 1 else len(text)
+        while True:
+            match = search(text, pos)
+            if match is None:
+                return matches, True
+            line = bisect_right(starts, match.start() + shift) - 1
+            next_line = starts[line + 1]
+            # 跨越行尾的匹配（如 \s 匹配到换行符）需要在本行之内重新确认
+            if match.end() < next_line or search(text, starts[line] - shift, next_line - 1):
+                if limit is not None and len(matches) >= limit:
+                    return matches, False
+                matches.append(line)
+            pos = next_line - shift
+
+
+def filter_mask(tree, matches):
+    """返回筛选后需要显示的节点：匹配的节点及其所有祖先目录，以 bytearray 标记。
+
+    已脱离快照的旧节点及其子树被跳过。
+    """
+    mask = bytearray(len(tree))
+    mask[0] = 1
+    parents = tree.parents
+    first_child = tree.first_child
+    child_count = tree.child_count
+    for node in matches:
+        chain = []
+        while node > 0 and not mask[node]:
+            parent = parents[node]
+            first = first_child[parent]
+            if not first <= node < first + child_count[parent]:
+                chain = None
+                break
+            chain.append(node)
+            node = parent
+        if chain:
+            for node in chain:
+                mask[node] = 1
+    return mask
@@ -0,0 +1,881 @@
+"""目录扫描引擎：基于 os.scandir 单次遍历生成内存快照，树视图与文本输出共用同一份数据。"""
+import os
+import platform
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+from itertools import islice
+
+KIND_DIR = 0
+KIND_FILE = 1
+KIND_MORE = 2  # 只出现在 read_entries 的结果末尾：目录中超出数量上限、未读取的条目数
+
+# 跳过而不读取的文件夹，与无法读取的文件夹一样记录在 errors 和 list_errors 中，以简短提示区分
+SKIP_DUPLICATE = "重复的文件夹"  # 与已读取的文件夹是同一个（符号链接循环、指向同一处的链接或挂载）
+SKIP_MOUNT = "其他文件系统"  # one_filesystem 开启时不进入的挂载点
+SKIP_REASONS = (SKIP_DUPLICATE, SKIP_MOUNT)
+
+_FS_ENCODING = sys.getfilesystemencoding()
+_FS_ERRORS = sys.getfilesystemencodeerrors()
+
+
+class ScanTree:
+    """目录扫描快照。
+
+    所有节点按列存放在紧凑数组中，同一目录的子节点连续排列（先文件夹后文件，各自按名称排序），
+    通过 first_child / child_count 定位。节点 0 为根目录。名称以文件系统编码拼接在
+    name_pool 中，按偏移量取出，每个节点只占几十个字节，不再为每项保留 Python 对象。
+
+    目录的 sizes 为其下所有已读取文件的总字节数，file_counts 为文件总数，max_mtimes 为
+    子树中最新的修改时间。这些汇总在读取目录时沿父节点链向上累加，不需要额外的系统调用；
+    文件的 file_counts 为 1，max_mtimes 即自身的修改时间。
+
+    扫描可以在后台线程中进行：写入由 lock 串行化，目录的子项全部追加完毕后才写入
+    first_child，因此其他线程只要看到 is_listed() 为真，就能安全读取该目录的全部子项。
+
+    文件夹按 (st_dev, st_ino) 登记在 owners 中，符号链接循环和多次链接到的同一个文件夹
+    只读取一次：真实的文件夹在列出父目录时登记，符号链接指向的文件夹留在 unclaimed 中，
+    到读取它时才登记，因此 walk 总是优先读取链接的目标本身。有多个硬链接的文件也登记
+    在 owners 中，之后出现的链接列入 shared，照常显示但不再计入文件夹的汇总大小。
+    """
+
+    def __init__(self, root_path):
+        self.root_path = root_path
+        self.parents = array('i')
+        self.name_pool = bytearray()
+        self.name_offsets = array('Q', [0])  # 第 i 个名称为 name_pool[name_offsets[i]:name_offsets[i + 1]]
+        self.kinds = bytearray()
+        self.sizes = array('q')  # 文件大小；目录为子树汇总
+        self.mtimes = array('d')
+        self.file_counts = array('q')  # 子树中的文件数
+        self.max_mtimes = array('d')  # 子树中最新的修改时间
+        self.first_child = array('i')  # -1 表示尚未列出（文件始终为 -1）
+        self.child_count = array('i')
+        self.errors = {}  # 节点索引 -> (简短提示, 详细信息)，记录 stat 失败
+        self.list_errors = {}  # 目录索引 -> (简短提示, 详细信息)，记录列目录失败
+        self.bytes_scanned = 0  # 已读取文件的字节总数，用于显示扫描进度
+        self.cancelled = False  # 扫描是否被中途取消
+        self.detached = 0  # 重新读取目录后不再可达的旧节点数
+        self.cache = None  # 可选的 ScanCache，目录未变化时直接复用上次的列表
+        self.use_cache = True  # 为 False 时只写入缓存、不读取（用于强制刷新）
+        self.cached_dirs = 0  # 本次从缓存取得的目录数
+        self.ignore = None  # 可选的 IgnoreRules，被排除的条目不会出现在快照中
+        self.show_hidden = False  # 是否包含以 . 开头的隐藏条目
+        self.max_depth = None  # 最多显示的层数（与命令行 --max-depth 相同），None 表示不限制
+        self.max_children = None  # 每个目录最多读取的条目数
+        self.max_entries = None  # 整个快照的条目上限，达到后不再读取新目录
+        self.omitted = {}  # 目录索引 -> 因数量上限未读取的条目数
+        self.full_dirs = set()  # 不受 max_children 限制、读取全部条目的目录
+        self.truncated = False  # 扫描是否因层数或条目上限提前停止，未读取的目录可按需读取
+        self.stats = None  # 可选的 instrumentation.ScanStats，统计系统调用次数和各阶段耗时
+        self.one_filesystem = False  # 是否只读取根目录所在的文件系统，不进入其他挂载点
+        self.root_dev = None  # 根目录的设备号，读取根目录时取得
+        self.owners = {}  # (st_dev, st_ino) -> 第一次出现的节点：文件夹和有多个硬链接的文件
+        self.shared = set()  # 与先出现的节点是同一个文件的硬链接，大小不计入汇总
+        self.unclaimed = {}  # 符号链接指向的文件夹 -> (st_dev, st_ino)，读取时才登记到 owners
+        self.lock = threading.Lock()
+
+        root_name = os.path.basename(root_path)
+        if not root_name:  # 处理根目录情况
+            root_name = root_path
+        self.add_node(-1, root_name, KIND_DIR, 0, 0.0)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def add_node(self, parent, name, kind, size, mtime):
+        """追加一个节点并返回其索引。"""
+        self.parents.append(parent)
+        self.name_pool += name.encode(_FS_ENCODING, _FS_ERRORS)
+        self.name_offsets.append(len(self.name_pool))
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+        self.file_counts.append(0 if kind == KIND_DIR else 1)
+        self.max_mtimes.append(mtime)
+        self.first_child.append(-1)
+        self.child_count.append(0)
+        self.kinds.append(kind)  # 最后写入类型，len(tree) 随之增加
+        return len(self.kinds) - 1
+
+    def name(self, index):
+        """取出节点名称。"""
+        offsets = self.name_offsets
+        return self.name_pool[offsets[index]:offsets[index + 1]].decode(_FS_ENCODING, _FS_ERRORS)
+
+    def entry_count(self):
+        """当前可达的条目数（不含根目录）。"""
+        return len(self) - 1 - self.detached
+
+    def is_dir(self, index):
+        return self.kinds[index] == KIND_DIR
+
+    def depth(self, index):
+        """节点的层数，根目录的子项为 1。"""
+        depth = 0
+        while index > 0:
+            depth += 1
+            index = self.parents[index]
+        return depth
+
+    def is_listed(self, index):
+        """目录内容是否已读取（包括读取失败的情况）。"""
+        return self.first_child[index] >= 0 or index in self.list_errors
+
+    def children(self, index):
+        """返回子节点索引范围。"""
+        first = self.first_child[index]
+        if first < 0:
+            return range(0)
+        return range(first, first + self.child_count[index])
+
+    def path(self, index):
+        """根据父节点链拼出完整路径。"""
+        parts = self._path_parts(index)
+        if not parts:
+            return self.root_path
+        return os.path.join(self.root_path, *parts)
+
+    def rel_path(self, index):
+        """相对于根目录、以 / 分隔的路径，根目录为空字符串。"""
+        return "/".join(self._path_parts(index))
+
+    def _path_parts(self, index):
+        parts = []
+        while index > 0:
+            parts.append(self.name(index))
+            index = self.parents[index]
+        parts.reverse()
+        return parts
+
+
+def format_access_error(error):
+    """格式化访问错误信息，提供更清晰的提示"""
+    if isinstance(error, PermissionError):
+        # 针对权限错误提供更明确的提示
+        if platform.system() == "Windows":
+            return "需要管理员权限访问"
+        else:
+            return "需要权限访问 (sudo)"
+    elif isinstance(error, FileNotFoundError):
+        return "文件或目录不存在"
+    else:
+        # 其他类型的错误保持简洁
+        return f"访问受限: {type(error).__name__}"
+
+
+def read_entries(directory, is_cancelled=None, show_hidden=False, ignored=None, limit=None, stats=None):
+    """读取目录中可见的条目，返回排好序的 (类型, 名称, 大小, 修改时间, 错误, 标识, 是否为链接) 列表。
+
+    每个条目只使用 DirEntry 自带的类型信息和一次 stat，不再额外调用 isdir/isfile。
+    以 . 开头的隐藏条目默认跳过，show_hidden 为真时保留；ignored(名称, 是否为文件夹)
+    返回真的条目在 stat 之前就被丢弃。条目多于 limit 时只保留排在前面的 limit 项，
+    其余不做 stat，列表末尾追加一行 (KIND_MORE, "", 省略的条目数, 0.0, None, None, False)。
+    标识为文件夹和有多个硬链接的文件的 (st_dev, st_ino)，其余条目以及无法取得时为 None。
+    是否为链接只对文件夹有意义：符号链接或目录联接指向的文件夹为真。
+    被取消时返回 None；目录本身无法读取时抛出 OSError。
+    给出 stats（ScanStats）时把列目录和 stat 的耗时及次数累加到其中。
+    """
+    if stats is not None:
+        start = time.perf_counter()
+    dirs = []
+    files = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if is_cancelled is not None and is_cancelled():
+                return None
+            name = entry.name
+            if not show_hidden and name.startswith('.'):
+                continue
+            try:
+                if entry.is_dir():
+                    if ignored is None or not ignored(name, True):
+                        dirs.append(entry)
+                elif entry.is_file():
+                    if ignored is None or not ignored(name, False):
+                        files.append(entry)
+            except OSError:
+                continue
+
+    dirs.sort(key=lambda e: e.name.lower())
+    files.sort(key=lambda e: e.name.lower())
+    omitted = 0
+    if limit is not None and len(dirs) + len(files) > limit:
+        omitted = len(dirs) + len(files) - limit
+        del files[max(0, limit - len(dirs)):]
+        del dirs[limit:]
+
+    if stats is not None:
+        listed = time.perf_counter()
+        stats.add_time("listdir", listed - start)
+    rows = []
+    for kind, group in ((KIND_DIR, dirs), (KIND_FILE, files)):
+        for entry in group:
+            if is_cancelled is not None and is_cancelled():
+                return None
+            try:
+                info = entry.stat()
+                link = kind == KIND_DIR and _is_link(entry)
+                rows.append((kind, entry.name, info.st_size, info.st_mtime, None,
+                             _identity(entry, kind, info, link), link))
+            except OSError as e:
+                rows.append((kind, entry.name, 0, 0.0, (format_access_error(e), str(e)), None, False))
+    if stats is not None:
+        stats.add_time("stat", time.perf_counter() - listed)
+        stats.count("stats", len(rows))
+        stats.count("stat_errors", sum(1 for row in rows if row[4] is not None))
+    if omitted:
+        rows.append((KIND_MORE, "", omitted, 0.0, None, None, False))
+    return rows
+
+
+def _is_link(entry):
+    """条目是否为符号链接或 Windows 目录联接。"""
+    return entry.is_symlink() or getattr(entry, "is_junction", bool)()
+
+
+def _identity(entry, kind, info, link):
+    """条目的 (st_dev, st_ino)，只为文件夹和有多个硬链接的文件取得，其他条目返回 None。
+
+    Windows 上 DirEntry.stat() 不提供 inode 和链接数：只为符号链接和目录联接指向的文件夹
+    另外调用一次 os.stat，普通文件夹不会构成循环，硬链接文件则不去重。
+    """
+    if kind != KIND_DIR and info.st_nlink <= 1:
+        return None
+    if info.st_ino:
+        return info.st_dev, info.st_ino
+    if kind == KIND_DIR and link:
+        info = os.stat(entry.path)
+        return info.st_dev, info.st_ino
+    return None
+
+
+def _read_directory(tree, index, is_cancelled=None):
+    """读取目录条目，应用快照的忽略规则；快照附带缓存且目录未变化时直接使用缓存的结果。"""
+    limit = None if index in tree.full_dirs else tree.max_children
+    return _read_path(tree, tree.path(index), tree.rel_path(index), limit, is_cancelled)
+
+
+def _read_path(tree, directory, rel_path, limit, is_cancelled=None):
+    """_read_directory 的实现，按路径读取，可用于尚未写入快照的目录。"""
+    ignored = tree.ignore.matcher(directory, rel_path) if tree.ignore else None
+    show_hidden = tree.show_hidden
+    cache = tree.cache
+    stats = tree.stats
+    if cache is None:
+        return read_entries(directory, is_cancelled, show_hidden, ignored, limit, stats)
+    # 不同规则和数量上限下的结果分开缓存
+    variant = ignored.key if ignored is not None else b""
+    if limit is not None:
+        variant += b"limit=%d" % limit
+    if show_hidden:
+        variant += b"hidden"
+    if stats is not None:
+        start = time.perf_counter()
+    dir_stat = os.stat(directory)
+    if tree.use_cache:
+        rows = cache.lookup(directory, dir_stat, variant)
+        if rows is not None:
+            with tree.lock:
+                tree.cached_dirs += 1
+            if stats is not None:
+                stats.add_time("cache", time.perf_counter() - start)
+                stats.count("cache_hits")
+            return rows
+    if stats is not None:
+        stats.add_time("cache", time.perf_counter() - start)
+    rows = read_entries(directory, is_cancelled, show_hidden, ignored, limit, stats)
+    if rows is not None:
+        if stats is not None:
+            start = time.perf_counter()
+        cache.store(directory, dir_stat, rows, variant)
+        if stats is not None:
+            stats.add_time("cache", time.perf_counter() - start)
+    return rows
+
+
+def _append_rows(tree, index, rows):
+    """把一个目录的子项作为连续的一段追加到快照（调用方持有 tree.lock）。
+
+    返回 (第一个子节点索引, 新子节点列表, 文件总字节数, 文件数, 最新修改时间)。
+    子目录此时尚未读取，汇总值只包含直接子项；已在别处出现的硬链接文件不计入字节数。
+    """
+    first = len(tree)
+    children = []
+    listed_bytes = 0
+    files = 0
+    newest = 0.0
+    tree.omitted.pop(index, None)
+    for kind, name, size, mtime, error, ident, link in rows:
+        if kind == KIND_MORE:
+            tree.omitted[index] = size
+            continue
+        if mtime > newest:
+            newest = mtime
+        if kind == KIND_DIR:
+            child = tree.add_node(index, name, kind, 0, mtime)
+            if ident is not None and error is None:
+                error = _skip_reason(tree, child, ident, first, link)
+        else:
+            child = tree.add_node(index, name, kind, size, mtime)
+            files += 1
+            if ident is not None and _claim(tree, ident, child, first) is not None:
+                tree.shared.add(child)
+            else:
+                listed_bytes += size
+        children.append(child)
+        if error is not None:
+            tree.errors[child] = error
+            if kind == KIND_DIR:
+                # 无法读取属性的目录不再深入
+                tree.list_errors[child] = error
+    tree.bytes_scanned += listed_bytes
+    return first, children, listed_bytes, files, newest
+
+
+def _skip_reason(tree, child, ident, first, link=False):
+    """子文件夹 child 不应读取时返回 (简短提示, 详细信息)，否则登记它的标识并返回 None。
+
+    符号链接指向的文件夹暂不登记，记入 unclaimed，由 list_directory 在读取它时处理。
+    """
+    if tree.one_filesystem and tree.root_dev is not None and ident[0] != tree.root_dev:
+        return SKIP_MOUNT, f"{tree.path(child)} 位于其他文件系统，按设置不读取"
+    if link:
+        tree.unclaimed[child] = ident
+        return None
+    owner = _claim(tree, ident, child, first)
+    if owner is not None:
+        return SKIP_DUPLICATE, f"与 {tree.path(owner)} 是同一个文件夹，不再重复读取"
+    return None
+
+
+def _claim(tree, ident, node, first):
+    """把标识 ident 登记到 node 名下；已属于另一个仍可达的节点时不登记，返回那个节点。
+
+    first 为本次 _append_rows 追加的第一个节点。重新读取目录时，被替换的旧子项在新的一段
+    公开之前仍处于可达范围内，需要按 first 排除。其他目录中的旧节点可能已被删除而尚未
+    重新读取，它的 inode 又被新建的条目重用，因此还要确认它的路径仍是这个标识。
+    """
+    owner = tree.owners.get(ident)
+    if owner is not None and (owner >= first or (tree.parents[owner] != tree.parents[node]
+                                                 and _is_reachable(tree, owner)
+                                                 and _has_identity(tree, owner, ident))):
+        return owner
+    tree.owners[ident] = node
+    return None
+
+
+def _has_identity(tree, node, ident):
+    """节点的路径现在是否仍指向标识为 ident 的文件或文件夹。"""
+    try:
+        info = os.stat(tree.path(node))
+    except OSError:
+        return False
+    return (info.st_dev, info.st_ino) == ident
+
+
+def _claim_link(tree, index):
+    """登记符号链接指向的文件夹 index；已在别处读取过时记为跳过并返回真（调用方持有 tree.lock）。"""
+    ident = tree.unclaimed.pop(index)
+    owner = tree.owners.get(ident)
+    if (owner is not None and owner != index and _is_reachable(tree, owner)
+            and _has_identity(tree, owner, ident)):
+        tree.list_errors[index] = (SKIP_DUPLICATE, f"与 {tree.path(owner)} 是同一个文件夹，不再重复读取")
+        return True
+    tree.owners[ident] = index
+    return False
+
+
+def _is_reachable(tree, node):
+    """节点是否仍可从根目录到达；重新读取目录后被替换或删除的旧节点不可达。"""
+    parents = tree.parents
+    first_child = tree.first_child
+    child_count = tree.child_count
+    while node > 0:
+        parent = parents[node]
+        first = first_child[parent]
+        if not first <= node < first + child_count[parent]:
+            return False
+        node = parent
+    return True
+
+
+def _stat_root(tree):
+    """读取根目录的修改时间和设备号，并把根目录登记为已访问。失败时抛出 OSError。"""
+    info = os.stat(tree.root_path)
+    tree.mtimes[0] = tree.max_mtimes[0] = info.st_mtime
+    tree.root_dev = info.st_dev
+    if info.st_ino:
+        tree.owners[(info.st_dev, info.st_ino)] = 0
+
+
+def _add_to_ancestors(tree, index, size, files, mtime):
+    """把子树汇总的变化累加到 index 及其所有祖先目录（调用方持有 tree.lock）。"""
+    sizes = tree.sizes
+    file_counts = tree.file_counts
+    max_mtimes = tree.max_mtimes
+    parents = tree.parents
+    while index >= 0:
+        sizes[index] += size
+        file_counts[index] += files
+        if mtime > max_mtimes[index]:
+            max_mtimes[index] = mtime
+        index = parents[index]
+
+
+def list_directory(tree, index, is_cancelled=None, future=None):
+    """读取单个目录，把可见子项作为连续的一段追加到快照中。
+
+    属性在锁外读取，写入快照时持锁一次性追加，因此可以在多个线程中同时调用。
+    future 为线程池中预读该目录的任务（见 _walk_parallel），还没开始执行时改在当前线程读取。
+    符号链接指向的文件夹在这里才登记标识，与已读取的文件夹相同时记为跳过，不再读取。
+    返回尚未读取的子目录索引列表；被取消时不写入任何子项并返回 None。
+    """
+    stats = tree.stats
+    if index in tree.unclaimed:
+        with tree.lock:
+            skipped = index in tree.unclaimed and _claim_link(tree, index)
+        if skipped:
+            if future is not None:
+                future.cancel()
+            return []
+    try:
+        if index == 0 and tree.root_dev is None:
+            _stat_root(tree)  # 按需加载时不经过 walk，直接读取根目录
+        if future is not None:
+            rows = future.result()
+        else:
+            rows = _read_directory(tree, index, is_cancelled)
+    except OSError as e:
+        with tree.lock:
+            tree.list_errors[index] = (format_access_error(e), str(e))
+        if stats is not None:
+            stats.count("list_errors")
+        return []
+    if rows is None:
+        return None
+
+    if stats is not None:
+        start = time.perf_counter()
+    with tree.lock:
+        if tree.is_listed(index):
+            # 其他线程已经读取过该目录
+            return [child for child in tree.children(index)
+                    if tree.is_dir(child) and not tree.is_listed(child)]
+
+        first, children, listed_bytes, files, newest = _append_rows(tree, index, rows)
+        _add_to_ancestors(tree, index, listed_bytes, files, newest)
+        # 子项全部写入后再公开，其他线程不会读到半个目录
+        tree.child_count[index] = len(children)
+        tree.first_child[index] = first
+    if stats is not None:
+        stats.add_time("insert", time.perf_counter() - start)
+        stats.count("dirs_listed")
+        stats.count("entries", len(children))
+    return [child for child in children if tree.is_dir(child) and not tree.is_listed(child)]
+
+
+def relist_directory(tree, index):
+    """重新读取一个已列出的目录，用新的连续段替换它的子项。
+
+    仍然存在的子项换成新的节点编号，但沿用原有的子树（孙节点改挂到新节点下）；
+    已删除的子项留在数组中成为不可达的旧节点。
+    返回 (moved, removed, added_dirs)：moved 为 {旧节点: 新节点}，removed 为被删除的
+    旧节点列表，added_dirs 为需要继续读取的新子目录。
+    """
+    directory = tree.path(index)
+    try:
+        rows = _read_directory(tree, index)
+        mtime = os.stat(directory).st_mtime
+        error = None
+    except OSError as e:
+        rows = []
+        mtime = tree.mtimes[index]
+        error = (format_access_error(e), str(e))
+
+    with tree.lock:
+        old_children = {}
+        for child in tree.children(index):
+            old_children[(tree.name(child), tree.kinds[child])] = child
+            if tree.kinds[child] == KIND_FILE and child not in tree.errors and child not in tree.shared:
+                tree.bytes_scanned -= tree.sizes[child]
+
+        first, children, total_bytes, total_files, newest = _append_rows(tree, index, rows)
+        moved = {}
+        added_dirs = []
+        for child in children:
+            old = old_children.pop((tree.name(child), tree.kinds[child]), None)
+            if old is not None:
+                moved[old] = child
+            if not tree.is_dir(child) or child in tree.errors:
+                continue
+            if old is None or old in tree.list_errors or tree.first_child[old] < 0:
+                # 新出现的目录，或之前没能读取的目录
+                if old is None or old in tree.list_errors:
+                    added_dirs.append(child)
+                continue
+            # 沿用原有子树及其汇总；符号链接指向的文件夹在旧节点读取时已登记过
+            ident = tree.unclaimed.pop(child, None)
+            if ident is not None:
+                tree.owners[ident] = child
+            tree.first_child[child] = tree.first_child[old]
+            tree.child_count[child] = tree.child_count[old]
+            for grandchild in tree.children(child):
+                tree.parents[grandchild] = child
+            tree.sizes[child] = tree.sizes[old]
+            tree.file_counts[child] = tree.file_counts[old]
+            tree.max_mtimes[child] = tree.max_mtimes[old]
+            total_bytes += tree.sizes[old]
+            total_files += tree.file_counts[old]
+            newest = max(newest, tree.max_mtimes[old])
+
+        tree.mtimes[index] = mtime
+        # 子项整体替换：汇总按差值向上修正，本目录的最新修改时间重新计算
+        tree.max_mtimes[index] = max(newest, mtime)
+        _add_to_ancestors(tree, index, total_bytes - tree.sizes[index],
+                          total_files - tree.file_counts[index], tree.max_mtimes[index])
+        if error is None:
+            tree.list_errors.pop(index, None)
+        else:
+            tree.list_errors[index] = error
+        removed = list(old_children.values())
+        tree.detached += len(moved) + len(removed)
+        for node in removed:
+            if tree.kinds[node] == KIND_DIR:
+                _detach_subtree(tree, node)
+
+        tree.child_count[index] = len(children)
+        tree.first_child[index] = first
+    return moved, removed, added_dirs
+
+
+def _detach_subtree(tree, node):
+    """统计被删除目录下的全部节点，从计数中扣除（调用方持有 tree.lock）。"""
+    pending = [node]
+    while pending:
+        for child in tree.children(pending.pop()):
+            tree.detached += 1
+            if tree.kinds[child] == KIND_DIR:
+                pending.append(child)
+            elif child not in tree.errors and child not in tree.shared:
+                tree.bytes_scanned -= tree.sizes[child]
+
+
+def find_node(tree, path):
+    """根据路径查找已读取到的目录节点，找不到时返回 None。"""
+    rel_path = os.path.relpath(path, tree.root_path)
+    if rel_path == os.curdir:
+        return 0
+    node = 0
+    for part in rel_path.split(os.sep):
+        for child in tree.children(node):
+            if tree.kinds[child] == KIND_DIR and tree.name(child) == part:
+                node = child
+                break
+        else:
+            return None
+    return node
+
+
+def walk(tree, on_listed=None, is_cancelled=None, start=0, workers=1):
+    """从 start 目录（默认根目录）开始深度优先扫描，把结果写入已有的快照。
+
+    on_listed(index) 在每个目录读取完毕后调用，总是在调用 walk 的线程中执行，且父目录
+    先于子目录；is_cancelled() 返回真时尽快停止，快照中保留已完整读取的部分，并把
+    tree.cancelled 置为 True。
+
+    同一个文件夹只读取一次：真实的文件夹按深度优先顺序先到先得，符号链接指向的文件夹
+    推迟到其余文件夹读完后再按出现顺序读取，因此链接不会让它的目标本身被跳过。
+
+    workers 大于 1 时用线程池预读即将处理的目录，适合网络文件系统等每次访问都有延迟的
+    场合。写入快照和去重仍在调用线程中按上述顺序进行，生成的快照与单线程扫描完全相同。
+
+    超过 tree.max_depth 的目录不读取；快照条目数达到 tree.max_entries 后不再读取新目录。
+    这两种情况都会把 tree.truncated 置为 True，未读取的目录之后可以单独读取。
+    """
+    if start == 0:
+        try:
+            _stat_root(tree)
+        except OSError as e:
+            tree.list_errors[0] = (format_access_error(e), str(e))
+            if on_listed is not None:
+                on_listed(0)
+            return tree
+
+    if workers > 1:
+        return _walk_parallel(tree, on_listed, is_cancelled, start, workers)
+
+    pending = [start]
+    links = deque()
+    while pending or links:
+        if not pending:
+            pending.append(links.popleft())
+        if _over_budget(tree):
+            break
+        index = pending.pop()
+        sub_dirs = list_directory(tree, index, is_cancelled)
+        if sub_dirs is None:
+            tree.cancelled = True
+            break
+        if on_listed is not None:
+            on_listed(index)
+        _push(tree, pending, links, sub_dirs)
+    return tree
+
+
+def _over_budget(tree):
+    """快照条目数是否已达到上限。"""
+    if tree.max_entries is not None and len(tree) >= tree.max_entries:
+        tree.truncated = True
+        return True
+    return False
+
+
+def _within_depth(tree, sub_dirs):
+    """过滤掉超出层数上限的子目录。"""
+    if tree.max_depth is None or not sub_dirs:
+        return sub_dirs
+    if tree.depth(sub_dirs[0]) < tree.max_depth:
+        return sub_dirs
+    tree.truncated = True
+    return []
+
+
+def _push(tree, pending, links, sub_dirs):
+    """把新列出的子目录放入待读栈；符号链接指向的文件夹排到 links 末尾，最后再读。"""
+    sub_dirs = _within_depth(tree, sub_dirs)
+    unclaimed = tree.unclaimed
+    pending.extend(reversed([index for index in sub_dirs if index not in unclaimed]))
+    links.extend(index for index in sub_dirs if index in unclaimed)
+
+
+def _walk_parallel(tree, on_listed, is_cancelled, start, workers):
+    """walk 的多线程版本：线程池按路径预读目录，写入快照仍按单线程的顺序在调用线程中进行。"""
+    pending = [start]
+    links = deque()
+    unclaimed = tree.unclaimed
+    queued = set()  # 已交给预读的目录索引
+    # 按需导入：concurrent.futures 会连带导入 logging，单线程的命令行输出用不到
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan") as pool:
+        ahead = _Prefetch(tree, pool, workers, is_cancelled)
+        try:
+            while pending or links:
+                if not pending:
+                    pending.append(links.popleft())
+                if _over_budget(tree):
+                    break
+                # 栈顶附近即将处理的目录优先预读；链接要先登记，不预读
+                for index in islice(reversed(pending), workers * 2):
+                    if index not in queued and index not in unclaimed and ahead.submit(
+                            tree.path(index), tree.rel_path(index), tree.depth(index),
+                            None if index in tree.full_dirs else tree.max_children):
+                        queued.add(index)
+                index = pending.pop()
+                queued.discard(index)
+                sub_dirs = list_directory(tree, index, is_cancelled, ahead.take(tree.path(index)))
+                if sub_dirs is None:
+                    tree.cancelled = True
+                    break
+                if on_listed is not None:
+                    on_listed(index)
+                _push(tree, pending, links, sub_dirs)
+        finally:
+            ahead.stop()
+    return tree
+
+
+class _Prefetch:
+    """_walk_parallel 的预读：在线程池中按路径读取目录，读完后接着预读其中的子文件夹。
+
+    子文件夹不必等父目录写入快照就能开始读取。结果按目录路径保存，由调用线程取用；
+    读完待用的目录数有上限，取消时无需等待大量已提交的任务。接着预读的子文件夹只在
+    有空闲线程时提交，调用线程马上要用的目录可以多排一倍，不必排在它们后面。
+    """
+
+    def __init__(self, tree, pool, workers, is_cancelled):
+        self.tree = tree
+        self.pool = pool
+        self.is_cancelled = is_cancelled
+        self.workers = workers
+        self.max_ready = workers * 32
+        self.futures = {}  # 目录路径 -> Future
+        self.started = set()  # 提交过的目录路径，取用后不再重复读取
+        self.waiting = []  # 等待空闲线程的子文件夹，后进先出
+        self.running = 0  # 已提交、尚未读完的目录数
+        self.stopped = False
+        self.lock = threading.Lock()
+
+    def submit(self, directory, rel_path, depth, limit):
+        """排队读取调用线程马上要用的目录，返回目录是否已在预读；线程都忙时不排队。"""
+        with self.lock:
+            if directory in self.started:
+                return True
+            if self.stopped or self.running >= self.workers * 2:
+                return False
+            self._start(directory, rel_path, depth, limit)
+            return True
+
+    def _start(self, directory, rel_path, depth, limit):
+        self.started.add(directory)
+        self.running += 1
+        self.futures[directory] = self.pool.submit(self._read, directory, rel_path, depth, limit)
+
+    def _read(self, directory, rel_path, depth, limit):
+        tree = self.tree
+        rows = None
+        try:
+            rows = _read_path(tree, directory, rel_path, limit, self.is_cancelled)
+            return rows
+        finally:
+            with self.lock:
+                self.running -= 1
+                if rows and (tree.max_depth is None or depth + 1 < tree.max_depth):
+                    for kind, name, _, _, error, ident, link in reversed(rows):
+                        if kind != KIND_DIR or error is not None or link:
+                            continue
+                        if tree.one_filesystem and ident is not None and ident[0] != tree.root_dev:
+                            continue
+                        self.waiting.append((os.path.join(directory, name),
+                                             f"{rel_path}/{name}" if rel_path else name, depth + 1))
+                waiting = self.waiting
+                while (waiting and not self.stopped and self.running < self.workers
+                       and len(self.futures) < self.max_ready):
+                    directory, rel_path, depth = waiting.pop()
+                    if directory not in self.started:
+                        self._start(directory, rel_path, depth, tree.max_children)
+
+    def take(self, directory):
+        """取出目录的预读任务，没有时返回 None，由调用方自己读取。"""
+        with self.lock:
+            return self.futures.pop(directory, None)
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+            futures = list(self.futures.values())
+            self.futures.clear()
+        for future in futures:
+            future.cancel()
+
+
+def scan_directory(root_path, on_listed=None, is_cancelled=None):
+    """完整扫描目录，返回 ScanTree 快照。"""
+    return walk(ScanTree(root_path), on_listed, is_cancelled)
+
+
+def iter_entries(root_path, max_depth=None, show_hidden=False, workers=1, ignore=None, limit=None,
+                 one_filesystem=False):
+    """不建立快照，边读取边按深度优先顺序逐个产出条目，供命令行模式流式输出。
+
+    产出 (深度, 是否为同级最后一项, 相对路径, 类型, 大小, 修改时间, 错误)，根目录的子项深度为 1。
+    目录无法读取时产出一条类型为 None 的记录，相对路径为该目录本身。
+    max_depth 限制最多展开的层数，None 表示不限制。limit 限制每个目录输出的条目数，
+    超出时在该目录末尾产出一条类型为 KIND_MORE 的记录，大小为省略的条目数。
+
+    workers 大于 1 时，每读完一个目录就在线程池中预读它的子目录，输出顺序不变。
+    ignore 为可选的 IgnoreRules，被排除的文件夹不会被读取。同一个文件夹只读取第一次
+    出现的位置：边读边输出，无法像 walk 那样把符号链接推后，链接排在目标之前时读取的是
+    链接；one_filesystem 为真时不进入其他文件系统。跳过的文件夹
+    与无法读取的文件夹一样产出一条类型为 None 的记录，错误信息的简短提示为 SKIP_REASONS 之一。
+    """
+    def read(directory, rel_dir):
+        ignored = ignore.matcher(directory, rel_dir.replace(os.sep, "/")) if ignore else None
+        return read_entries(directory, show_hidden=show_hidden, ignored=ignored, limit=limit)
+
+    root_dev = None
+    visited = {}  # (st_dev, st_ino) -> 相对路径
+    try:
+        info = os.stat(root_path)
+        root_dev = info.st_dev
+        if info.st_ino:
+            visited[(info.st_dev, info.st_ino)] = ""
+    except OSError:
+        pass  # 读取根目录时再报告错误
+
+    def duplicate(ident, rel_path):
+        """文件夹已在别处读取过时返回跳过的原因，否则登记它并返回 None。"""
+        if ident in visited:
+            return SKIP_DUPLICATE, f"与 {os.path.join(root_path, visited[ident])} 是同一个文件夹，不再重复读取"
+        visited[ident] = rel_path
+        return None
+
+    def check(rows, rel_dir):
+        """按 _skip_reason 的规则检查刚读取的子文件夹，跳过的改为带错误信息的条目。
+
+        与 walk 相同，符号链接指向的文件夹到深入读取时才检查是否重复。
+        """
+        for i, (kind, name, size, mtime, error, ident, link) in enumerate(rows):
+            if kind != KIND_DIR or ident is None or error is not None:
+                continue
+            rel_path = os.path.join(rel_dir, name) if rel_dir else name
+            if one_filesystem and root_dev is not None and ident[0] != root_dev:
+                error = (SKIP_MOUNT, f"{os.path.join(root_path, rel_path)} 位于其他文件系统，按设置不读取")
+            elif link:
+                continue
+            else:
+                error = duplicate(ident, rel_path)
+                if error is None:
+                    continue
+            rows[i] = (kind, name, size, mtime, error, None, False)
+        return rows
+
+    pool = None
+    if workers > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan")
+    try:
+        pending = [(root_path, "", 1, None)]
+        stack = []
+        while pending or stack:
+            if pending:
+                directory, rel_dir, depth, future = pending.pop()
+                try:
+                    if future is not None and not future.cancel():
+                        rows = future.result()
+                    else:
+                        # 还没轮到线程池处理的目录直接在当前线程读取，不必排队等待
+                        rows = read(directory, rel_dir)
+                except OSError as e:
+                    yield depth, True, rel_dir, None, 0, 0.0, (format_access_error(e), str(e))
+                else:
+                    rows = check(rows, rel_dir)
+                    ahead = {}
+                    if pool is not None and (max_depth is None or depth < max_depth):
+                        for i, (kind, name, _, _, error, _, link) in enumerate(rows):
+                            if kind == KIND_DIR and error is None and not link:
+                                ahead[i] = pool.submit(read, os.path.join(directory, name),
+                                                       os.path.join(rel_dir, name) if rel_dir else name)
+                    stack.append((directory, rel_dir, depth, len(rows) - 1, iter(enumerate(rows)), ahead))
+
+            if not stack:
+                continue
+            directory, rel_dir, depth, last, rows, ahead = stack[-1]
+            for i, (kind, name, size, mtime, error, ident, link) in rows:
+                if kind == KIND_MORE:
+                    yield depth, True, rel_dir, kind, size, mtime, error
+                    continue
+                rel_path = os.path.join(rel_dir, name) if rel_dir else name
+                yield depth, i == last, rel_path, kind, size, mtime, error
+                if kind != KIND_DIR:
+                    continue
+                if error is not None:
+                    # 无法读取属性或跳过的目录不再深入，与快照一样在层数上限处也给出原因
+                    yield depth + 1, True, rel_path, None, 0, 0.0, error
+                    continue
+                if max_depth is not None and depth >= max_depth:
+                    continue
+                if link and ident is not None:
+                    error = duplicate(ident, rel_path)
+                    if error is not None:
+                        yield depth + 1, True, rel_path, None, 0, 0.0, error
+                        continue
+                pending.append((os.path.join(directory, name), rel_path, depth + 1, ahead.pop(i, None)))
+                break
+            else:
+                stack.pop()
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,308 @@
+"""快照文件：把扫描结果保存为按路径排序的二进制条目表，并对比两份快照的差异。
+
+文件布局（小端序，各段按 8 字节对齐）：
+
+    文件头   MAGIC、版本、根目录路径长度、条目数、路径表字节数、保存时间，随后是根目录路径
+    offsets  (条目数 + 1) 个 uint64，第 i 条的路径为 paths[offsets[i]:offsets[i + 1]]
+    sizes    条目数个 int64，文件大小；文件夹为其下所有文件的总大小
+    mtimes   条目数个 float64，修改时间
+    kinds    条目数个 uint8，KIND_DIR 或 KIND_FILE
+    flags    条目数个 uint8，FLAG_* 的组合
+    paths    路径表
+
+读取时用 mmap 把各段直接映射为数组，不逐条解析。路径为相对于根目录的各级名称
+（文件系统编码），以 \\0 分隔，根目录为空路径；按字节序排列即为逐级按名称排序，父目录
+紧接在其子项之前，因此两份快照可以一次线性归并完成对比。
+"""
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+
+from filetree.formatting import format_mtime
+from filetree.scanner import KIND_DIR, _FS_ENCODING, _FS_ERRORS
+
+MAGIC = b"FTVSNAP\x00"
+VERSION = 1
+SUFFIX = ".ftvsnap"
+
+FLAG_ERROR = 1  # 无法读取属性或目录内容
+FLAG_UNLISTED = 2  # 文件夹的内容未读取
+FLAG_PARTIAL = 4  # 文件夹因数量上限只读取了部分条目
+
+ADDED = "added"
+REMOVED = "removed"
+MODIFIED = "modified"  # 大小相同，修改时间不同
+RESIZED = "resized"  # 大小不同
+CHANGE_LABELS = {ADDED: "新增", REMOVED: "删除", MODIFIED: "修改时间变化", RESIZED: "大小变化"}
+CHANGE_MARKS = {ADDED: "+", REMOVED: "-", MODIFIED: "M", RESIZED: "S"}
+
+_HEADER = struct.Struct("<8sIIQQd")  # MAGIC, 版本, 根目录路径字节数, 条目数, 路径表字节数, 保存时间
+_SEP = b"\x00"
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+class Snapshot:
+    """按路径排序的条目表，可以从扫描快照生成，也可以从快照文件映射而来。
+
+    nodes 只在由扫描快照生成时存在，记录每个条目对应的 ScanTree 节点。
+    """
+
+    def __init__(self, root_path, created, offsets, sizes, mtimes, kinds, flags, paths, base=0,
+                 nodes=None, mapping=None):
+        self.root_path = root_path
+        self.created = created  # 保存（或生成）的时间戳
+        self.offsets = offsets
+        self.sizes = sizes
+        self.mtimes = mtimes
+        self.kinds = kinds
+        self.flags = flags
+        self.paths = paths  # 路径表所在的 bytes 或 mmap
+        self.base = base  # 路径表在 paths 中的起始偏移
+        self.nodes = nodes
+        self._mapping = mapping
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def key(self, i):
+        """第 i 条的原始路径（以 \\0 分隔的 bytes），用于排序和比较。"""
+        base = self.base
+        return self.paths[base + self.offsets[i]:base + self.offsets[i + 1]]
+
+    def path(self, i):
+        """第 i 条以 / 分隔的相对路径。"""
+        return self.key(i).replace(_SEP, b"/").decode(_FS_ENCODING, _FS_ERRORS)
+
+    def find(self, key):
+        """二分查找路径为 key 的条目序号，不存在时返回 None。"""
+        i = bisect_left(range(len(self)), key, key=self.key)
+        return i if i < len(self) and self.key(i) == key else None
+
+    def is_complete(self, i):
+        """文件夹的内容是否已完整读取，只在另一侧出现的子项才能据此判断为新增或删除。"""
+        return not self.flags[i] & (FLAG_UNLISTED | FLAG_PARTIAL)
+
+    @classmethod
+    def from_tree(cls, tree):
+        """从扫描快照中可达的节点生成条目表，根目录为第 0 条。
+
+        名称中不含 \0，因此先序遍历、同级按名称字节排序得到的顺序与整体按路径排序相同，
+        只需对每个文件夹的子项排序。
+        """
+        pool = tree.name_pool
+        name_offsets = tree.name_offsets
+        first_child = tree.first_child
+        child_count = tree.child_count
+        keys = [b""]
+        nodes = array('i', [0])
+        pending = [(b"", 0)]  # 按逆序压栈，弹出顺序即路径顺序
+        while pending:
+            key, node = pending.pop()
+            if node:
+                keys.append(key)
+                nodes.append(node)
+            first = first_child[node]
+            if first < 0:
+                continue
+            prefix = key + _SEP if node else b""
+            children = sorted(
+                (pool[name_offsets[child]:name_offsets[child + 1]], child)
+                for child in range(first, first + child_count[node]))
+            pending.extend((prefix + name, child) for name, child in reversed(children))
+
+        offsets = array('Q', [0])
+        total = 0
+        for key in keys:
+            total += len(key)
+            offsets.append(total)
+        kinds = bytes(tree.kinds[node] for node in nodes)
+        flags = bytearray(len(nodes))
+        errors = tree.errors
+        list_errors = tree.list_errors
+        omitted = tree.omitted
+        for i, node in enumerate(nodes):
+            flag = FLAG_ERROR if node in errors or node in list_errors else 0
+            if kinds[i] == KIND_DIR:
+                if first_child[node] < 0:
+                    flag |= FLAG_UNLISTED
+                elif node in omitted:
+                    flag |= FLAG_PARTIAL
+            flags[i] = flag
+        sizes = array('q', (tree.sizes[node] for node in nodes))
+        mtimes = array('d', (tree.mtimes[node] for node in nodes))
+        return cls(tree.root_path, time.time(), offsets, sizes, mtimes, kinds, bytes(flags), b"".join(keys),
+                   nodes=nodes)
+
+    def save(self, path):
+        """写入快照文件。先写临时文件再替换，中途出错不会留下损坏的快照。"""
+        root = self.root_path.encode("utf-8", "surrogateescape")
+        count = len(self)
+        paths_size = self.offsets[count]
+        sections = [array('Q', self.offsets), array('q', self.sizes), array('d', self.mtimes)]
+        if sys.byteorder != "little":
+            for section in sections:
+                section.byteswap()
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, len(root), count, paths_size, self.created))
+            f.write(root)
+            f.write(bytes(_align(f.tell()) - f.tell()))
+            for section in sections:
+                section.tofile(f)
+            for data in (self.kinds, self.flags):
+                f.write(data)
+            f.write(bytes(_align(f.tell()) - f.tell()))
+            base = self.base
+            f.write(self.paths[base:base + paths_size])
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """映射快照文件。文件格式不正确时抛出 ValueError，用完后应调用 close()。"""
+        with open(path, "rb") as f:
+            try:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError("不是有效的快照文件") from None
+        try:
+            return cls._from_mapping(mapping)
+        except (ValueError, struct.error):
+            mapping.close()
+            raise ValueError("不是有效的快照文件") from None
+
+    @classmethod
+    def _from_mapping(cls, mapping):
+        magic, version, root_size, count, paths_size, created = _HEADER.unpack_from(mapping, 0)
+        if magic != MAGIC:
+            raise ValueError
+        if version != VERSION:
+            raise ValueError
+        pos = _HEADER.size
+        root_path = mapping[pos:pos + root_size].decode("utf-8", "surrogateescape")
+        pos = _align(pos + root_size)
+        end = pos + 8 * (count + 1) + 16 * count
+        flags_end = end + 2 * count
+        paths_base = _align(flags_end)
+        if len(mapping) < paths_base + paths_size:
+            raise ValueError
+
+        view = memoryview(mapping)
+        sections = []
+        for fmt, length in (("Q", count + 1), ("q", count), ("d", count)):
+            section = view[pos:pos + 8 * length].cast(fmt)
+            if sys.byteorder != "little":
+                section = array(fmt, section)
+                section.byteswap()
+            sections.append(section)
+            pos += 8 * length
+        offsets, sizes, mtimes = sections
+        kinds = view[end:end + count]
+        flags = view[end + count:flags_end]
+        if offsets[count] != paths_size:
+            raise ValueError
+        return cls(root_path, created, offsets, sizes, mtimes, kinds, flags, mapping, paths_base,
+                   mapping=mapping)
+
+    def close(self):
+        """释放映射的快照文件。"""
+        if self._mapping is None:
+            return
+        for section in (self.offsets, self.sizes, self.mtimes, self.kinds, self.flags):
+            if isinstance(section, memoryview):
+                section.release()
+        self._mapping.close()
+        self._mapping = None
+
+
+def diff_snapshots(old, new):
+    """线性归并两份快照，按路径顺序产出 (变化类型, 旧条目序号, 新条目序号)，不存在的一侧为 None。
+
+    文件大小不同为 RESIZED，大小相同而修改时间不同为 MODIFIED；文件夹只比较是否存在，
+    类型改变视为删除后新增。任一侧无法读取属性的条目不比较大小和时间；某一侧未读取或
+    只读取了部分内容的文件夹下，只在另一侧出现的条目无法判断是否真的变化，不报告。
+    """
+    old_count = len(old)
+    new_count = len(new)
+    old_key = old.key
+    new_key = new.key
+    i = j = 0
+    # 当前条目的各级上层目录：(子项路径前缀, 只在一侧出现的子项是否可以报告)
+    parents = [(b"", old_count > 0 and new_count > 0 and old.is_complete(0) and new.is_complete(0))]
+    if old_count and new_count:
+        i = j = 1  # 两侧的根目录
+    prefix, known = parents[-1]
+    old_kinds, new_kinds = old.kinds, new.kinds
+    old_flags, new_flags = old.flags, new.flags
+    while i < old_count or j < new_count:
+        a = old_key(i) if i < old_count else None
+        b = new_key(j) if j < new_count else None
+        key = a if b is None or (a is not None and a <= b) else b
+        if not key.startswith(prefix):
+            while len(parents) > 1 and not key.startswith(parents[-1][0]):
+                parents.pop()
+            prefix, known = parents[-1]
+
+        if a == b:
+            old_kind = old_kinds[i]
+            if old_kind != new_kinds[j]:
+                yield REMOVED, i, None
+                yield ADDED, None, j
+                prefix, known = key + _SEP, True
+                parents.append((prefix, known))
+            elif old_kind == KIND_DIR:
+                prefix, known = key + _SEP, old.is_complete(i) and new.is_complete(j)
+                parents.append((prefix, known))
+            elif not (old_flags[i] | new_flags[j]) & FLAG_ERROR:
+                if old.sizes[i] != new.sizes[j]:
+                    yield RESIZED, i, j
+                elif old.mtimes[i] != new.mtimes[j]:
+                    yield MODIFIED, i, j
+            i += 1
+            j += 1
+        elif key is a:
+            if known:
+                yield REMOVED, i, None
+            if old_kinds[i] == KIND_DIR:
+                prefix = key + _SEP
+                parents.append((prefix, known))
+            i += 1
+        else:
+            if known:
+                yield ADDED, None, j
+            if new_kinds[j] == KIND_DIR:
+                prefix = key + _SEP
+                parents.append((prefix, known))
+            j += 1
+
+
+def iter_diff_lines(old, new, changes=None):
+    """逐行生成对比结果的文本：每行一个变化，文件夹以 / 结尾，最后一行为汇总。
+
+    changes 为 diff_snapshots 的结果，省略时重新计算。
+    """
+    yield f"对比: {old.root_path}（{format_mtime(old.created)}） → {new.root_path}（{format_mtime(new.created)}）"
+    counts = dict.fromkeys(CHANGE_LABELS, 0)
+    for change, i, j in (diff_snapshots(old, new) if changes is None else changes):
+        counts[change] += 1
+        snapshot, index = (old, i) if j is None else (new, j)
+        path = snapshot.path(index)
+        if snapshot.kinds[index] == KIND_DIR:
+            path += "/"
+        if change == RESIZED:
+            yield f"S {path}  ({old.sizes[i]} → {new.sizes[j]} 字节)"
+        elif change == MODIFIED:
+            yield f"M {path}  ({format_mtime(old.mtimes[i])} → {format_mtime(new.mtimes[j])})"
+        else:
+            yield f"{CHANGE_MARKS[change]} {path}"
+    total = sum(counts.values())
+    if not total:
+        yield "没有变化"
+    else:
+        yield "共 {} 处变化：{}".format(total, "，".join(f"{CHANGE_LABELS[c]} {n}" for c, n in counts.items()))
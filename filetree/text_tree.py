@@ -0,0 +1,77 @@
+"""根据扫描快照生成 ├──/└── 风格的文本目录树。"""
+import os
+
+from filetree.scanner import KIND_MORE, SKIP_REASONS
+
+
+def more_entries_text(count):
+    """超出数量上限、未读取的条目的提示文字。"""
+    return f"… 还有 {count} 项"
+
+
+def error_text(error):
+    """无法读取或被跳过的文件夹下方的提示文字。"""
+    return f"[{'已跳过' if error[0] in SKIP_REASONS else '权限受限'}: {error[0]}]"
+
+
+def build_text_lines(tree):
+    """返回文本目录树的所有行，第一行为根目录名称。"""
+    return list(iter_tree_lines(tree))
+
+
+def iter_tree_lines(tree, index=0, mark_unlisted=False):
+    """按顺序逐行生成快照中 index 目录的文本目录树，第一行为该目录名称。
+
+    使用显式栈代替递归，调用方可以边生成边输出，内存占用与目录深度而非总行数成正比。
+    因数量上限省略的条目输出为一行提示；mark_unlisted 为真时，尚未读取的目录下
+    也输出一行 "…"，表明内容未展开。
+    """
+    yield tree.name(index)
+    entering = (index, "")
+    stack = []
+    while entering is not None or stack:
+        if entering is not None:
+            index, prefix = entering
+            entering = None
+            error = tree.list_errors.get(index)
+            if error is not None:
+                yield f"{prefix}└── {error_text(error)}"
+            elif not tree.is_listed(index):
+                if mark_unlisted:
+                    yield f"{prefix}└── …"
+            else:
+                children = tree.children(index)
+                omitted = tree.omitted.get(index)
+                last = len(children) - (0 if omitted else 1)
+                stack.append((prefix, last, iter(enumerate(children)), omitted))
+            continue
+
+        prefix, last, children, omitted = stack[-1]
+        for i, child in children:
+            is_last = i == last
+            yield f"{prefix}{'└──' if is_last else '├──'} {tree.name(child)}"
+            if tree.is_dir(child):
+                # 先输出子目录的内容，再回到本目录的剩余子项
+                entering = (child, prefix + ("    " if is_last else "│   "))
+                break
+        else:
+            stack.pop()
+            if omitted:
+                yield f"{prefix}└── {more_entries_text(omitted)}"
+
+
+def iter_text_lines(root_name, entries):
+    """根据 iter_entries 产出的条目逐行生成文本目录树，与 build_text_lines 的输出一致。"""
+    yield root_name
+    branches = []  # 每一层祖先对应的前缀片段
+    for depth, is_last, rel_path, kind, size, _, error in entries:
+        del branches[depth - 1:]
+        prefix = "".join(branches)
+        if kind is None:
+            yield f"{prefix}└── {error_text(error)}"
+            continue
+        if kind == KIND_MORE:
+            yield f"{prefix}└── {more_entries_text(size)}"
+            continue
+        yield f"{prefix}{'└──' if is_last else '├──'} {os.path.basename(rel_path)}"
+        branches.append("    " if is_last else "│   ")
@@ -0,0 +1,179 @@
+"""占用图的布局：把扫描快照中的汇总大小排成嵌套的矩形（squarified treemap），不依赖 GUI 库。
+
+每个文件夹的矩形内留出边距和标题栏，子项按大小从大到小排列，逐行选择使矩形
+最接近正方形的分行方式（Bruls 等人的 squarified 算法）。面积小于 min_area 像素的
+子项合并为一个"其余 N 项"矩形，不再往下展开，因此无论有多少条目，矩形的数量都
+不超过面积除以 min_area，百万级条目也只需计算可见的部分。
+
+布局按 (缩放到的文件夹, 宽, 高) 缓存，各文件夹按大小排好的子项单独缓存，
+缩放到另一层或改变尺寸时沿用；快照内容改变后调用 invalidate()。
+"""
+import bisect
+
+from filetree.scanner import KIND_DIR
+
+TILE_DIR = 0
+TILE_FILE = 1
+TILE_REST = 2  # 合并的小条目，node 为所在的文件夹
+
+MIN_AREA = 12  # 单个矩形的最小面积（像素），更小的子项合并显示
+PADDING = 2  # 文件夹矩形四周的边距
+HEADER = 14  # 文件夹标题栏的高度，矩形放得下时才留出
+
+
+def squarify(areas, x, y, width, height):
+    """把面积从大到小排列的 areas 排进矩形，返回与 areas 一一对应的 (x, y, 宽, 高)。
+
+    面积之和应等于矩形面积；矩形用完后剩余的项宽高为 0。
+    """
+    rects = []
+    i = 0
+    count = len(areas)
+    while i < count:
+        short = min(width, height)
+        if short <= 0:
+            rects.extend((x, y, 0.0, 0.0) for _ in range(count - i))
+            break
+        # 逐个加入当前行，直到最差的长宽比开始变差；areas 有序，行首最大、行尾最小
+        square = short * short
+        largest = areas[i]
+        row = largest
+        worst = max(square / largest, largest / square) if largest > 0 else 0.0
+        j = i + 1
+        while j < count and areas[j] > 0:
+            total = row + areas[j]
+            ratio = max(square * largest / (total * total), total * total / (square * areas[j]))
+            if ratio > worst:
+                break
+            worst = ratio
+            row = total
+            j += 1
+        if width >= height:
+            # 高度是短边：这一行是左侧的一列
+            column = row / height
+            offset = y
+            for k in range(i, j):
+                size = areas[k] / column if column else 0.0
+                rects.append((x, offset, column, size))
+                offset += size
+            x += column
+            width -= column
+        else:
+            line = row / width
+            offset = x
+            for k in range(i, j):
+                size = areas[k] / line if line else 0.0
+                rects.append((offset, y, size, line))
+                offset += size
+            y += line
+            height -= line
+        i = j
+    return rects
+
+
+class TreemapLayout:
+    """在一个扫描快照上计算并缓存占用图的矩形。
+
+    tiles() 返回 (x, y, 宽, 高, 节点, 深度, 类型, 合并的条目数) 的列表，上层文件夹排在
+    其中的子项之前，按顺序绘制即可；深度从缩放到的文件夹起算。
+    """
+
+    def __init__(self, tree, min_area=MIN_AREA, padding=PADDING, header=HEADER):
+        self.tree = tree
+        self.min_area = min_area
+        self.padding = padding
+        self.header = header
+        self._by_size = {}  # 文件夹 -> (大小取负后升序排列的列表, 对应的子节点, 总大小)
+        self._tiles = {}  # (文件夹, 宽, 高) -> 矩形列表
+        self._size = None
+
+    def invalidate(self):
+        """快照内容改变后丢弃所有缓存。"""
+        self._by_size.clear()
+        self._tiles.clear()
+
+    def has_header(self, width, height):
+        """宽 width、高 height 的文件夹矩形是否留出标题栏。"""
+        return height >= 2 * self.header + 2 * self.padding and width >= 2 * self.header
+
+    def rest_size(self, node, count):
+        """文件夹 node 中合并显示的 count 个最小子项的总大小。"""
+        negated = self._children_by_size(node)[0]
+        return -sum(negated[len(negated) - count:])
+
+    def tiles(self, root, width, height):
+        """缩放到文件夹 root、尺寸为 width × height 时的全部矩形。"""
+        if (width, height) != self._size:
+            self._tiles.clear()  # 尺寸变化后旧尺寸的布局不会再用到
+            self._size = (width, height)
+        key = (root, width, height)
+        tiles = self._tiles.get(key)
+        if tiles is None:
+            tiles = self._tiles[key] = self._layout(root, width, height)
+        return tiles
+
+    def _children_by_size(self, node):
+        entry = self._by_size.get(node)
+        if entry is None:
+            tree = self.tree
+            sizes = tree.sizes
+            shared = tree.shared  # 其他硬链接的大小不计入文件夹，这里也不占面积
+            items = sorted((-sizes[child], child) for child in tree.children(node)
+                           if sizes[child] > 0 and child not in shared)
+            negated = [size for size, _ in items]
+            entry = self._by_size[node] = (negated, [child for _, child in items], -sum(negated))
+        return entry
+
+    def _layout(self, root, width, height):
+        tree = self.tree
+        kinds = tree.kinds
+        min_area = self.min_area
+        padding = self.padding
+        tiles = []
+        pending = [(0.0, 0.0, float(width), float(height), root, 0)]
+        while pending:
+            x, y, w, h, node, depth = pending.pop()
+            tiles.append((x, y, w, h, node, depth, TILE_DIR, 0))
+            top = self.header if self.has_header(w, h) else 0
+            x += padding
+            y += padding + top
+            w -= 2 * padding
+            h -= 2 * padding + top
+            if w < 1 or h < 1 or w * h < min_area:
+                continue
+            negated, children, total = self._children_by_size(node)
+            if total <= 0:
+                continue
+            scale = w * h / total
+            # 面积不小于 min_area 的子项单独显示，其余合并；只剩一项时不必合并
+            keep = bisect.bisect_right(negated, -min_area / scale)
+            if keep >= len(children) - 1:
+                keep = len(children)
+            areas = [-size * scale for size in negated[:keep]]
+            rest = -1
+            if keep < len(children):
+                rest_area = w * h - sum(areas)
+                rest = bisect.bisect_right([-area for area in areas], -rest_area)
+                areas.insert(rest, rest_area)
+            rects = squarify(areas, x, y, w, h)
+            for i, (cx, cy, cw, ch) in enumerate(rects):
+                if cw <= 0 or ch <= 0:
+                    continue
+                if i == rest:
+                    tiles.append((cx, cy, cw, ch, node, depth + 1, TILE_REST, len(children) - keep))
+                    continue
+                child = children[i if rest < 0 or i < rest else i - 1]
+                if kinds[child] == KIND_DIR:
+                    pending.append((cx, cy, cw, ch, child, depth + 1))
+                else:
+                    tiles.append((cx, cy, cw, ch, child, depth + 1, TILE_FILE, 0))
+        return tiles
+
+
+def tile_at(tiles, x, y):
+    """包含点 (x, y) 的最内层矩形，没有时返回 None。"""
+    for tile in reversed(tiles):
+        tx, ty, tw, th = tile[:4]
+        if tx <= x < tx + tw and ty <= y < ty + th:
+            return tile
+    return None
@@ -0,0 +1,41 @@
+"""扫描缓存的回归测试。"""
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filetree.cache import ScanCache  # noqa: E402
+from filetree.scanner import ScanTree, walk  # noqa: E402
+from filetree.text_tree import build_text_lines  # noqa: E402
+
+
+class _BrokenConnection:
+    """打开之后每次访问都失败的数据库连接，如被其他进程锁定或磁盘已满。"""
+
+    def execute(self, *args):
+        raise sqlite3.OperationalError("database is locked")
+
+    executemany = execute
+    commit = execute
+
+    def close(self):
+        pass
+
+
+def test_scan_completes_when_cache_fails_after_open(tmp_path):
+    root = tmp_path / "root"
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "a" / "file.txt").write_text("x")
+    cache = ScanCache(str(tmp_path / "cache.sqlite3"))
+    cache.conn.close()
+    cache.conn = _BrokenConnection()
+
+    tree = ScanTree(str(root))
+    tree.cache = cache
+    walk(tree, workers=2)
+    cache.flush()
+    cache.close()
+
+    assert isinstance(cache.error, sqlite3.Error)
+    assert build_text_lines(tree) == build_text_lines(walk(ScanTree(str(root))))
@@ -0,0 +1,70 @@
+"""扫描快照的回归测试。"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filetree.scanner import (SKIP_DUPLICATE, SKIP_MOUNT, ScanTree, find_node, iter_entries,  # noqa: E402
+                               relist_directory, walk)
+from filetree.text_tree import build_text_lines, iter_text_lines  # noqa: E402
+
+
+def test_relist_ignores_stale_owner_after_inode_reuse(tmp_path):
+    (tmp_path / "a" / "b" / "c").mkdir(parents=True)
+    tree = ScanTree(str(tmp_path))
+    walk(tree)
+    old = find_node(tree, str(tmp_path / "a" / "b" / "c"))
+
+    (tmp_path / "a" / "b" / "c").rmdir()
+    (tmp_path / "nd").mkdir()
+    # 模拟 inode 重用：新文件夹的标识仍登记在已删除、但 a/b 尚未重新读取的旧节点名下
+    info = os.stat(tmp_path / "nd")
+    tree.owners = {ident: node for ident, node in tree.owners.items() if node != old}
+    tree.owners[(info.st_dev, info.st_ino)] = old
+
+    relist_directory(tree, 0)
+    new = find_node(tree, str(tmp_path / "nd"))
+    assert new is not None
+    assert new not in tree.errors
+    assert tree.owners[(info.st_dev, info.st_ino)] == new
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="需要符号链接")
+@pytest.mark.parametrize("workers", [1, 4])
+def test_walk_reads_link_target_not_link(tmp_path, workers):
+    for name in ("a", "c", "d"):
+        (tmp_path / "p" / name).mkdir(parents=True)
+    (tmp_path / "p" / "b" / "t" / "inner").mkdir(parents=True)
+    (tmp_path / "p" / "b" / "t" / "file.txt").write_text("x")
+    try:
+        os.symlink(os.path.join("..", "b", "t"), tmp_path / "p" / "a" / "l")
+    except OSError:
+        pytest.skip("无法创建符号链接")
+
+    tree = walk(ScanTree(str(tmp_path)), workers=workers)
+    link = find_node(tree, str(tmp_path / "p" / "a" / "l"))
+    target = find_node(tree, str(tmp_path / "p" / "b" / "t"))
+    assert tree.list_errors[link][0] == SKIP_DUPLICATE
+    assert target not in tree.list_errors and tree.is_listed(target)
+    assert build_text_lines(tree) == build_text_lines(walk(ScanTree(str(tmp_path))))
+
+
+def test_stream_reports_skipped_folder_at_depth_limit(tmp_path):
+    device = os.stat(tmp_path).st_dev
+    other = next((path for path in ("/dev/shm", "/proc", "/dev")
+                  if os.path.isdir(path) and os.stat(path).st_dev != device), None)
+    if other is None:
+        pytest.skip("需要另一个文件系统上的文件夹")
+    (tmp_path / "a").mkdir()
+    os.symlink(other, tmp_path / "a" / "mnt")
+
+    tree = ScanTree(str(tmp_path))
+    tree.one_filesystem = True
+    tree.max_depth = 2
+    walk(tree)
+    streamed = list(iter_text_lines(tree.name(0), iter_entries(str(tmp_path), max_depth=2,
+                                                               one_filesystem=True)))
+    assert streamed == build_text_lines(tree)
+    assert any(SKIP_MOUNT in line for line in streamed)
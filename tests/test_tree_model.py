@@ -0,0 +1,107 @@
+"""树视图模型的分页测试。"""
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+pytest.importorskip("PySide6.QtWidgets")
+
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from filetree.scanner import ScanTree, find_node, walk  # noqa: E402
+
+_spec = importlib.util.spec_from_file_location("file_tree_visualizer", os.path.join(ROOT, "file-tree-visualizer.py"))
+app_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(app_module)
+
+
+@pytest.fixture(scope="module")
+def qapp():
+    return QApplication.instance() or QApplication([])
+
+
+def _make_model(qapp, root, page_rows=2):
+    model = app_module.FileTreeModel(None)
+    model.PAGE_ROWS = page_rows
+    tree = ScanTree(str(root))
+    model.set_tree(tree)
+    return model, tree
+
+
+def _is_hint(index):
+    return index.isValid() and bool(index.internalId() & 1)
+
+
+def test_publish_skips_folders_on_hidden_pages(qapp, tmp_path):
+    for name in ("a", "b", "c"):
+        for i in range(3):
+            (tmp_path / name / f"f{i}").mkdir(parents=True)
+    model, tree = _make_model(qapp, tmp_path)
+    parents = []
+    model.rowsAboutToBeInserted.connect(lambda parent, first, last: parents.append(parent.isValid()))
+
+    walk(tree, model.publish)
+    assert parents and all(parents)
+
+    # 翻到第二页后，第三个文件夹的子项随之可见
+    c = find_node(tree, str(tmp_path / "c"))
+    root = model.index_for_node(0)
+    assert not model.index_for_node(c).isValid()
+    assert model.show_next_page(0) == 3
+    assert model.rowCount(root) == 3
+    assert model.rowCount(model.index_for_node(c)) == 3
+
+
+def test_pages_and_hint_row(qapp, tmp_path):
+    for i in range(5):
+        (tmp_path / f"f{i}.txt").write_text("x")
+    model, tree = _make_model(qapp, tmp_path)
+    walk(tree, model.publish)
+    root = model.index_for_node(0)
+
+    assert model._page_rows(0) == 2
+    assert model._child_rows(0, True) == 3
+    assert model.rowCount(root) == 3
+    hint = model.index(2, 0, root)
+    assert _is_hint(hint) and model.more_node(hint) == 0
+
+    assert model.show_next_page(0) == 4
+    assert model.rowCount(root) == 5
+    assert model.show_next_page(0) == 5
+    assert model.rowCount(root) == 5
+    assert not model.has_next_page(0)
+    assert not _is_hint(model.index(4, 0, root))
+
+
+def test_first_page_boundary(qapp, tmp_path):
+    for i in range(2):
+        (tmp_path / f"f{i}.txt").write_text("x")
+    model, tree = _make_model(qapp, tmp_path)
+    walk(tree, model.publish)
+    assert model._child_rows(0, True) == 2
+    assert not model.has_next_page(0)
+    assert not _is_hint(model.index(1, 0, model.index_for_node(0)))
+
+    (tmp_path / "f2.txt").write_text("x")
+    model, tree = _make_model(qapp, tmp_path)
+    walk(tree, model.publish)
+    assert model._child_rows(0, True) == 3
+    assert model.has_next_page(0)
+
+
+def test_show_node_reveals_page(qapp, tmp_path):
+    for i in range(7):
+        (tmp_path / f"f{i}.txt").write_text("x")
+    model, tree = _make_model(qapp, tmp_path)
+    walk(tree, model.publish)
+    last = tree.children(0)[-1]
+    assert not model.index_for_node(last).isValid()
+
+    model.show_node(last)
+    assert model._page_rows(0) == 7
+    assert model.index_for_node(last).row() == 6
+    assert model.rowCount(model.index_for_node(0)) == 7